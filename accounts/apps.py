@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from common.thumbnails import register_thumbnail_field
+        from .models import User, AuthorityUser
+
+        for model in (User, AuthorityUser):
+            register_thumbnail_field(
+                model, "avatar", "avatar_thumbnail_ready", "avatar_thumbnails"
+            )
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.12 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_passwordresettoken'),
+    ]
+
+    operations = [
+        # existing files keep generating their thumbnails on first access
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnail_ready',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='avatar_thumbnail_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
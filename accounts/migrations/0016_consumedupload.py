@@ -0,0 +1,20 @@
+# Generated by Django 3.2.12 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_user_avatar_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumedUpload',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('consumed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
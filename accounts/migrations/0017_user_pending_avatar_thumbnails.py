@@ -0,0 +1,23 @@
+# Generated by Django 3.2.12 on 2026-10-19 20:00
+
+from django.db import migrations
+
+
+def mark_pending(apps, schema_editor):
+    # rows stored before thumbnail names were kept, their thumbnails are queued
+    # by `manage.py generate_missing_thumbnails`
+    User = apps.get_model("accounts", "User")
+    User.objects.filter(avatar_thumbnail_ready=True, avatar_thumbnails={}).exclude(
+        avatar=""
+    ).update(avatar_thumbnail_ready=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_consumedupload'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_pending, migrations.RunPython.noop),
+    ]
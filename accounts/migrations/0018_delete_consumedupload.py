@@ -0,0 +1,17 @@
+# Generated by Django 3.2.12 on 2026-10-19 21:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_user_pending_avatar_thumbnails'),
+        ('reports', '0026_consumedupload'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ConsumedUpload',
+        ),
+    ]
@@ -3,6 +3,7 @@ from random import randint
 from dateutil.relativedelta import *
 from django.contrib.auth.models import AbstractUser
 from django.contrib.gis.db import models
+from django.db import connection
 from django.utils.timezone import now
 from easy_thumbnails.fields import ThumbnailerImageField
 
@@ -54,6 +55,17 @@ class Authority(BaseModel):
         """find all authority that this one inherits. (include self)"""
         return Authority.objects.raw(f"select * from inherit_authority_up({self.id})")
 
+    @staticmethod
+    def inherits_up_ids(authority_ids):
+        """ids of `authority_ids` and all of the authorities they inherit, distinct."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "select distinct u.id from unnest(%s::bigint[]) as a(id),"
+                " inherit_authority_up(a.id) u",
+                [list(authority_ids)],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
     def all_inherits_down(self):
         """find all child authority that has recursive inherit up to this.(include self)"""
         return Authority.objects.raw(f"select * from inherit_authority_down({self.id})")
@@ -65,6 +77,8 @@ class Authority(BaseModel):
 
 class User(AbstractUser):
     avatar = ThumbnailerImageField(upload_to="avatars", null=True, blank=True)
+    avatar_thumbnail_ready = models.BooleanField(default=False)
+    avatar_thumbnails = models.JSONField(default=dict, blank=True)
     fcm_token = models.CharField(max_length=200, blank=True)
 
     @property
@@ -4,6 +4,8 @@ from accounts.schema.mutations import (
     AuthorityUserRegisterMutation,
     AdminUserChangePasswordMutation,
     AdminUserUploadAvatarMutation,
+    AdminUserAvatarUploadRequestMutation,
+    AdminUserAvatarUploadConfirmMutation,
     AdminAuthorityCreateMutation,
     AdminAuthorityUpdateMutation,
     AdminAuthorityDeleteMutation,
@@ -22,6 +24,8 @@ class Mutation(graphene.ObjectType):
     authority_user_register = AuthorityUserRegisterMutation.Field()
     admin_user_change_password = AdminUserChangePasswordMutation.Field()
     admin_user_upload_avatar = AdminUserUploadAvatarMutation.Field()
+    admin_user_avatar_upload_request = AdminUserAvatarUploadRequestMutation.Field()
+    admin_user_avatar_upload_confirm = AdminUserAvatarUploadConfirmMutation.Field()
     admin_authority_create = AdminAuthorityCreateMutation.Field()
     admin_authority_update = AdminAuthorityUpdateMutation.Field()
     admin_authority_delete = AdminAuthorityDeleteMutation.Field()
@@ -1,7 +1,18 @@
 import graphene
 from graphene_file_upload.scalars import Upload
+from graphql import GraphQLError
 from graphql_jwt.decorators import login_required
 
+from common.direct_upload import InvalidUpload, confirm_upload, issue_upload
+from common.types import DirectUploadType
+
+
+def set_avatar(user, avatar):
+    user.avatar = avatar
+    user.avatar_thumbnail_ready = False
+    user.avatar_thumbnails = {}
+    user.save()
+
 
 class AdminUserUploadAvatarMutation(graphene.Mutation):
     class Arguments:
@@ -11,14 +22,56 @@ class AdminUserUploadAvatarMutation(graphene.Mutation):
 
     success = graphene.Boolean()
     avatar_url = graphene.String()
+    # False while the avatar thumbnail is generated
+    avatar_thumbnail_ready = graphene.Boolean()
 
     @staticmethod
     @login_required
     def mutate(root, info, image):
         user = info.context.user
-        user.avatar = image
-        user.save()
+        set_avatar(user, image)
+        return {
+            "success": True,
+            "avatar_url": user.avatar.url,
+            "avatar_thumbnail_ready": user.avatar_thumbnail_ready,
+        }
+
+
+class AdminUserAvatarUploadRequestMutation(graphene.Mutation):
+    class Arguments:
+        filename = graphene.String(required=True)
+
+    upload = graphene.Field(DirectUploadType)
+
+    @staticmethod
+    @login_required
+    def mutate(root, info, filename):
+        upload = issue_upload(
+            "avatars", filename, user_id=info.context.user.id, avatar=True
+        )
+        return AdminUserAvatarUploadRequestMutation(upload=upload)
+
+
+class AdminUserAvatarUploadConfirmMutation(graphene.Mutation):
+    class Arguments:
+        token = graphene.String(required=True)
+
+    success = graphene.Boolean()
+    avatar_url = graphene.String()
+    # False while the avatar thumbnail is generated
+    avatar_thumbnail_ready = graphene.Boolean()
+
+    @staticmethod
+    @login_required
+    def mutate(root, info, token):
+        user = info.context.user
+        try:
+            name = confirm_upload(token, user_id=user.id, avatar=True)
+        except InvalidUpload as e:
+            raise GraphQLError(str(e))
+        set_avatar(user, name)
         return {
             "success": True,
             "avatar_url": user.avatar.url,
+            "avatar_thumbnail_ready": user.avatar_thumbnail_ready,
         }
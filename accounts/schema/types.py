@@ -1,7 +1,6 @@
 import graphene
 import django_filters
 from django.db.models import Q
-from easy_thumbnails.files import get_thumbnailer
 from graphene_django import DjangoObjectType
 
 from django.contrib.gis.db import models
@@ -9,6 +8,7 @@ from graphene_django.converter import convert_django_field
 
 from accounts.models import Authority, AuthorityUser, InvitationCode, Feature, User
 from common.converter import GeoJSON
+from common.thumbnails import thumbnail_url
 from common.types import AdminValidationProblem
 
 
@@ -149,6 +149,7 @@ class UserType(DjangoObjectType):
             "first_name",
             "last_name",
             "telephone",
+            "avatar_thumbnail_ready",
         )
 
     def resolve_telephone(self, info):
@@ -158,10 +159,7 @@ class UserType(DjangoObjectType):
             return ""
 
     def resolve_avatar_url(self, info):
-        if self.avatar:
-            return get_thumbnailer(self.avatar)["thumbnail"].url
-        else:
-            return None
+        return thumbnail_url(self)
 
 
 class AuthorityUserType(DjangoObjectType):
@@ -188,6 +186,7 @@ class UserProfileType(graphene.ObjectType):
     authority_name = graphene.String(required=False)
     authority_id = graphene.Int(required=False)
     avatar_url = graphene.String(required=False)
+    avatar_thumbnail_ready = graphene.Boolean()
     is_staff = graphene.Boolean()
     is_superuser = graphene.Boolean()
     role = graphene.String()
@@ -209,10 +208,7 @@ class UserProfileType(graphene.ObjectType):
             return ""
 
     def resolve_avatar_url(self, info):
-        if self.avatar:
-            return get_thumbnailer(self.avatar)["thumbnail"].url
-        else:
-            return None
+        return thumbnail_url(self)
 
 
 class CheckInvitationCodeType(DjangoObjectType):
@@ -1,3 +1,5 @@
+from urllib.parse import urlparse
+
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from graphql_jwt.testcases import JSONWebTokenTestCase
@@ -44,3 +46,37 @@ class UserMutationTests(JSONWebTokenTestCase):
         result = self.client.execute(mutation, {"image": self.file})
         self.assertEqual(result.data["adminUserUploadAvatar"]["success"], True)
         self.assertIsNotNone(result.data["adminUserUploadAvatar"]["avatarUrl"])
+
+    def test_direct_avatar_upload(self):
+        result = self.client.execute(
+            """
+            mutation request($filename: String!) {
+                adminUserAvatarUploadRequest(filename: $filename) {
+                    upload { url fields token }
+                }
+            }
+            """,
+            {"filename": "small.gif"},
+        )
+        upload = result.data["adminUserAvatarUploadRequest"]["upload"]
+        response = self.client.post(
+            urlparse(upload["url"]).path, {**upload["fields"], "file": self.file}
+        )
+        self.assertEqual(204, response.status_code)
+
+        confirm = """
+            mutation confirm($token: String!) {
+                adminUserAvatarUploadConfirm(token: $token) {
+                    success
+                    avatarUrl
+                }
+            }
+            """
+        result = self.client.execute(confirm, {"token": upload["token"]})
+        self.assertIsNone(result.errors, msg=result.errors)
+        self.user.refresh_from_db()
+        self.assertEqual(self.small_gif, self.user.avatar.read())
+        self.assertFalse(self.user.avatar_thumbnail_ready)
+
+        result = self.client.execute(confirm, {"token": upload["token"]})
+        self.assertIsNotNone(result.errors)
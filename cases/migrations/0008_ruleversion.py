@@ -0,0 +1,24 @@
+# Generated by Django 3.2.12 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0007_case_thread'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "create sequence if not exists cases_rule_version_seq;",
+            "drop sequence if exists cases_rule_version_seq;",
+        ),
+        migrations.CreateModel(
+            name='RuleVersion',
+            fields=[
+                ('report_type_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
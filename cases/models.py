@@ -2,7 +2,7 @@ import uuid
 from typing import List, Union
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models
 from django.db.models import QuerySet
 from django.template import Template, Context
 from django.template.defaultfilters import striptags
@@ -209,8 +209,10 @@ class NotificationTemplate(BaseModel):
     title_template = models.TextField(blank=True)
     body_template = models.TextField(blank=True)
 
-    def create_message_with_report(self, report: IncidentReport) -> Message:
-        template_context = Context(report.template_context())
+    def create_message_with_report(
+        self, report: IncidentReport, context: dict = None
+    ) -> Message:
+        template_context = Context(context or report.template_context())
         title = ""
         body = ""
         if self.title_template:
@@ -246,3 +248,40 @@ class AuthorityNotification(BaseModel):
     template = models.ForeignKey(NotificationTemplate, on_delete=models.CASCADE)
     authority = models.ForeignKey(Authority, on_delete=models.PROTECT)
     to = models.TextField(blank=True)
+
+
+RULE_VERSION_SEQUENCE = "cases_rule_version_seq"
+
+
+class RuleVersion(models.Model):
+    """
+    version of the rules of a report type (reporter notifications, case definitions
+    and report notification templates), a new number from RULE_VERSION_SEQUENCE on
+    every change to them. Kept in the database so that every web and celery
+    process sees the change. No foreign key: rules deleted along with their report
+    type still bump it.
+    """
+
+    report_type_id = models.UUIDField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    @staticmethod
+    def current(report_type_id) -> int:
+        return (
+            RuleVersion.objects.filter(report_type_id=report_type_id)
+            .values_list("version", flat=True)
+            .first()
+            or 0
+        )
+
+    @staticmethod
+    def bump(report_type_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                insert into cases_ruleversion (report_type_id, version)
+                values (%s, nextval('{RULE_VERSION_SEQUENCE}'))
+                on conflict (report_type_id) do update set version = excluded.version
+                """,
+                [report_type_id],
+            )
@@ -0,0 +1,224 @@
+"""
+Single pass rule engine for everything a new incident report can trigger.
+
+All active rules of a report type (reporter notifications, case definitions
+and report notification templates) are loaded once per rule version,
+their conditions are parsed once, and they are evaluated together against
+one shared template context.
+"""
+
+import ast
+import logging
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Model
+
+from cases.models import (
+    AuthorityNotification,
+    Case,
+    CaseDefinition,
+    NotificationTemplate,
+    RuleVersion,
+)
+from common.eval import build_eval_obj
+from reports.models import IncidentReport, ReporterNotification
+
+
+logger = logging.getLogger(__name__)
+# one record per evaluated report, with the outcome and time of every rule
+stats_logger = logging.getLogger("cases.rule_engine.stats")
+
+REPORTER_NOTIFICATION = "reporter_notification"
+CASE_DEFINITION = "case_definition"
+NOTIFICATION_TEMPLATE = "notification_template"
+
+
+@dataclass
+class Rule:
+    kind: str
+    definition: Model
+    node: Optional[ast.AST]
+
+    @staticmethod
+    def compile(kind: str, definition: Model) -> "Rule":
+        try:
+            node = ast.parse(definition.condition.strip()).body[0]
+        except (SyntaxError, IndexError, AttributeError):
+            node = None
+        return Rule(kind=kind, definition=definition, node=node)
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.kind, self.definition.id
+
+
+@dataclass
+class RuleStat:
+    kind: str
+    definition_id: int
+    hit: bool = False
+    error: bool = False
+    seconds: float = 0.0
+
+
+@dataclass
+class RuleEvaluationResult:
+    reporter_notification: Optional[ReporterNotification] = None
+    case_definition: Optional[CaseDefinition] = None
+    notification_templates: List[NotificationTemplate] = field(default_factory=list)
+    stats: List[RuleStat] = field(default_factory=list)
+
+# compiled rules, keyed by (schema name, report type id) -> (version, rules)
+_compiled_rules: Dict[Tuple[str, str], Tuple[int, List[Rule]]] = {}
+
+
+def invalidate_rules(report_type_id):
+    RuleVersion.bump(report_type_id)
+
+
+def load_rules(report_type_id) -> List[Rule]:
+    """
+    active rules of the report type. Report notification templates are matched
+    on their own report type only, a template no longer fires for the reports
+    of every report type.
+    """
+    rules = []
+    for definition in ReporterNotification.objects.filter(
+        report_type_id=report_type_id, is_active=True
+    ):
+        rules.append(Rule.compile(REPORTER_NOTIFICATION, definition))
+    for definition in CaseDefinition.objects.filter(
+        report_type_id=report_type_id, is_active=True
+    ):
+        rules.append(Rule.compile(CASE_DEFINITION, definition))
+    for template in NotificationTemplate.objects.filter(
+        report_type_id=report_type_id,
+        type=NotificationTemplate.Type.REPORT,
+        condition__isnull=False,
+    ).exclude(condition=""):
+        rules.append(Rule.compile(NOTIFICATION_TEMPLATE, template))
+    return rules
+
+
+def get_rules(report_type_id) -> List[Rule]:
+    key = (connection.schema_name, str(report_type_id))
+    version = RuleVersion.current(report_type_id)
+    cached = _compiled_rules.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    rules = load_rules(report_type_id)
+    _compiled_rules[key] = (version, rules)
+    return rules
+
+
+def evaluate_rules(rules: List[Rule], context: dict) -> RuleEvaluationResult:
+    result = RuleEvaluationResult()
+    evaluator = build_eval_obj(context)
+    for rule in rules:
+        # reporter notification and case definition are "first match wins"
+        if rule.kind == REPORTER_NOTIFICATION and result.reporter_notification:
+            continue
+        if rule.kind == CASE_DEFINITION and result.case_definition:
+            continue
+
+        stat = RuleStat(*rule.key)
+        result.stats.append(stat)
+        start = time.perf_counter()
+        try:
+            # same as SimpleEval.eval() without re-parsing the condition. _eval is
+            # private: simpleeval is pinned in requirements.txt, and
+            # test_rule_engine fails if it changes.
+            evaluator.expr = rule.definition.condition
+            stat.hit = rule.node is not None and bool(evaluator._eval(rule.node))
+        except Exception:
+            stat.error = True
+        stat.seconds = time.perf_counter() - start
+        if not stat.hit:
+            continue
+
+        if rule.kind == REPORTER_NOTIFICATION:
+            result.reporter_notification = rule.definition
+        elif rule.kind == CASE_DEFINITION:
+            result.case_definition = rule.definition
+        else:
+            result.notification_templates.append(rule.definition)
+    return result
+
+
+def dispatch(report: IncidentReport, context: dict, result: RuleEvaluationResult):
+    """run the matched actions, a failing action does not stop the others."""
+    if result.reporter_notification:
+        try:
+            result.reporter_notification.send_message(context, report.reported_by)
+        except Exception:
+            logger.exception(
+                "reporter notification %s failed for report %s",
+                result.reporter_notification.id,
+                report.id,
+            )
+
+    if result.case_definition:
+        try:
+            # a savepoint, so that a failed promotion leaves no partial case
+            with transaction.atomic():
+                Case.promote_from_incident_report(report.id)
+        except Exception:
+            logger.exception("case promotion failed for report %s", report.id)
+
+    if result.notification_templates:
+        notifications = defaultdict(list)
+        for notification in AuthorityNotification.objects.filter(
+            template__in=result.notification_templates,
+            authority__in=report.relevant_authorities.all(),
+        ):
+            notifications[notification.template_id].append(notification)
+        for template in result.notification_templates:
+            if template.id not in notifications:
+                continue
+            try:
+                message = template.create_message_with_report(report, context)
+            except Exception:
+                logger.exception(
+                    "notification template %s failed for report %s",
+                    template.id,
+                    report.id,
+                )
+                continue
+            for notification in notifications[template.id]:
+                try:
+                    message.send(notification.to)
+                except Exception:
+                    logger.exception(
+                        "authority notification %s failed for report %s",
+                        notification.id,
+                        report.id,
+                    )
+
+
+def evaluate_report(report_id) -> RuleEvaluationResult:
+    start = time.perf_counter()
+    report = IncidentReport.objects.select_related(
+        "report_type", "report_type__category", "reported_by"
+    ).get(pk=report_id)
+    rules = get_rules(report.report_type_id)
+    context = report.template_context()
+    result = evaluate_rules(rules, context)
+    dispatch(report, context, result)
+    seconds = time.perf_counter() - start
+    stats_logger.info(
+        "evaluated %d rules for report %s in %.2fms",
+        len(rules),
+        report_id,
+        seconds * 1000,
+        extra={
+            "report_id": str(report_id),
+            "report_type_id": str(report.report_type_id),
+            "seconds": seconds,
+            "rules": [asdict(stat) for stat in result.stats],
+        },
+    )
+    return result
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from cases.models import CaseDefinition, NotificationTemplate
+from cases.rule_engine import invalidate_rules
+from reports.models import ReporterNotification
+
+
+def on_rule_changed(sender, instance, **kwargs):
+    if instance.report_type_id:
+        invalidate_rules(instance.report_type_id)
+
+
+def on_rule_report_type_changed(sender, instance, **kwargs):
+    # a rule moved to another report type leaves the rules of the previous one
+    if instance.pk is None:
+        return
+    previous = (
+        sender._base_manager.filter(pk=instance.pk)
+        .values_list("report_type_id", flat=True)
+        .first()
+    )
+    if previous and previous != instance.report_type_id:
+        invalidate_rules(previous)
+
+
+for rule_model in (ReporterNotification, CaseDefinition, NotificationTemplate):
+    for signal in (post_save, post_delete):
+        signal.connect(
+            on_rule_changed,
+            sender=rule_model,
+            dispatch_uid=f"rules_changed_{rule_model.__name__}_{id(signal)}",
+        )
+    pre_save.connect(
+        on_rule_report_type_changed,
+        sender=rule_model,
+        dispatch_uid=f"rules_moved_{rule_model.__name__}",
+    )
@@ -1,7 +1,7 @@
 from podd_api.celery import app
 
 from cases.models import CaseDefinition, Case
-from cases.tasks import evaluate_case_definition
+from cases.tasks import evaluate_report_rules
 from cases.tests.base_testcase import BaseTestCase
 
 
@@ -17,7 +17,7 @@ class CaseDefinitionTestCase(BaseTestCase):
         app.conf.update(CELERY_ALWAYS_EAGER=True)
 
     def test_condition_evaluation_success(self):
-        evaluate_case_definition(self.mers_report.id)
+        evaluate_report_rules(self.mers_report.id)
         self.assertTrue(Case.objects.filter(report_id=self.mers_report.id).exists())
 
     def test_condition_evaluation_not_success(self):
@@ -25,5 +25,5 @@ class CaseDefinitionTestCase(BaseTestCase):
             "data.symptom == 'sore throat' and data.traveling is True"
         )
         self.mers_definition.save()
-        evaluate_case_definition(self.mers_report.id)
+        evaluate_report_rules(self.mers_report.id)
         self.assertFalse(Case.objects.filter(report_id=self.mers_report.id).exists())
@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from simpleeval import SimpleEval
+
+from cases.models import (
+    AuthorityNotification,
+    Case,
+    CaseDefinition,
+    NotificationTemplate,
+    RuleVersion,
+)
+from cases.rule_engine import Rule, evaluate_report, evaluate_rules, get_rules
+from cases.tests.base_testcase import BaseTestCase
+from notifications.models import Message
+from reports.models import ReporterNotification
+
+
+class RuleEngineTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mers_definition = CaseDefinition.objects.create(
+            report_type=self.mers_report_type,
+            description="mers definition",
+            condition="data.symptom == 'fever' and data.traveling is True",
+        )
+        self.reporter_notification = ReporterNotification.objects.create(
+            report_type=self.mers_report_type,
+            condition="data.symptom == 'fever'",
+            template="thank you {{ data.name }}",
+        )
+        self.notification_template = NotificationTemplate.objects.create(
+            name="mers report",
+            type=NotificationTemplate.Type.REPORT,
+            condition="data.traveling",
+            report_type=self.mers_report_type,
+            title_template="mers",
+            body_template="patient: {{ data.name }}",
+        )
+        AuthorityNotification.objects.create(
+            authority=self.user.authority,
+            template=self.notification_template,
+            to="email:test@opensur.test",
+        )
+
+    def test_evaluate_all_rules_in_one_pass(self):
+        with patch.object(Message, "send") as mock_send, self.assertLogs(
+            "cases.rule_engine.stats"
+        ) as logs:
+            result = evaluate_report(self.mers_report.id)
+            mock_send.assert_called_once_with("email:test@opensur.test")
+
+        self.assertEqual(result.case_definition, self.mers_definition)
+        self.assertEqual(result.reporter_notification, self.reporter_notification)
+        self.assertEqual(result.notification_templates, [self.notification_template])
+        self.assertTrue(Case.objects.filter(report_id=self.mers_report.id).exists())
+        self.assertTrue(Message.objects.filter(body="thank you John Doe").exists())
+        [record] = logs.records
+        self.assertIn(
+            {
+                "kind": "case_definition",
+                "definition_id": self.mers_definition.id,
+                "hit": True,
+                "error": False,
+            },
+            [
+                {key: value for key, value in rule.items() if key != "seconds"}
+                for rule in record.rules
+            ],
+        )
+
+    def test_rules_are_cached_until_changed(self):
+        rules = get_rules(self.mers_report_type.id)
+        self.assertIs(rules, get_rules(self.mers_report_type.id))
+
+        self.mers_definition.is_active = False
+        self.mers_definition.save()
+        rules = get_rules(self.mers_report_type.id)
+        self.assertEqual(2, len(rules))
+
+    def test_invalid_condition_does_not_match(self):
+        self.mers_definition.condition = "data.symptom =="
+        self.mers_definition.save()
+        with patch.object(Message, "send"):
+            result = evaluate_report(self.mers_report.id)
+        self.assertIsNone(result.case_definition)
+        self.assertFalse(Case.objects.filter(report_id=self.mers_report.id).exists())
+
+    def test_rule_version_is_bumped_in_the_database(self):
+        version = RuleVersion.current(self.mers_report_type.id)
+        self.reporter_notification.delete()
+        self.assertGreater(RuleVersion.current(self.mers_report_type.id), version)
+        self.assertEqual(2, len(get_rules(self.mers_report_type.id)))
+
+    def test_failing_action_does_not_stop_the_others(self):
+        with patch.object(
+            ReporterNotification, "send_message", side_effect=RuntimeError
+        ), patch.object(Message, "send") as mock_send:
+            evaluate_report(self.mers_report.id)
+            mock_send.assert_called_once_with("email:test@opensur.test")
+        self.assertTrue(Case.objects.filter(report_id=self.mers_report.id).exists())
+
+    def test_template_of_other_report_type_does_not_fire(self):
+        self.notification_template.report_type = self.dengue_report_type
+        self.notification_template.save()
+        with patch.object(Message, "send") as mock_send:
+            result = evaluate_report(self.mers_report.id)
+            mock_send.assert_not_called()
+        self.assertEqual([], result.notification_templates)
+
+
+class SimpleEvalApiTestCase(SimpleTestCase):
+    """the rule engine relies on SimpleEval._eval, a private api of simpleeval."""
+
+    def test_pre_parsed_condition(self):
+        definition = CaseDefinition(id=1, condition="data['n'] > 1 and name == 'a'")
+        rule = Rule.compile("case_definition", definition)
+        context = {"data": {"n": 2}, "name": "a"}
+        self.assertTrue(
+            SimpleEval(names=context)._eval(rule.node),
+            "SimpleEval._eval changed, check cases.rule_engine.evaluate_rules",
+        )
+        result = evaluate_rules([rule], context)
+        self.assertEqual(definition, result.case_definition)
+        self.assertFalse(result.stats[0].error)
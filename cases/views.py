@@ -1,3 +1,15 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from cases.models import Case
+from common.utils import jwt_login_required
+from reports.views import images_zip_response, visible_incident_reports
+
+
+@require_GET
+@jwt_login_required
+def case_images_export(request, case_id):
+    """stream a ZIP of the images of the report of a case and of its followups."""
+    case = get_object_or_404(Case, pk=case_id, report__isnull=False)
+    incidents = visible_incident_reports(request.user).filter(pk=case.report_id)
+    return images_zip_response(incidents, f"case-{case_id}-images.zip")
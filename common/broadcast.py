@@ -0,0 +1,83 @@
+"""
+Coalescing of websocket broadcasts.
+
+Changes of the same key (a thread, ...) made within a short window are merged
+and broadcast once, with every id that changed. Call `add` after commit, so
+that rolled back changes are never broadcast.
+
+Pending changes live in the memory of the process until their window ends.
+They are flushed when the process exits normally (`atexit`, and the
+worker_process_shutdown signal of celery). A process killed within the window
+(SIGKILL, out of memory) loses them: the clients only see those changes at
+their next query.
+"""
+
+import atexit
+import logging
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set
+
+
+logger = logging.getLogger(__name__)
+
+_coalescers = weakref.WeakSet()
+
+
+@dataclass
+class PendingBroadcast:
+    changed_ids: Set = field(default_factory=set)
+    created_ids: Set = field(default_factory=set)
+    timer: Optional[threading.Timer] = None
+
+
+class BroadcastCoalescer:
+    """
+    The first change of a key starts a timer of `delay()` seconds, the changes
+    made until it fires are merged into one `send(key, changed_ids, created_ids)`.
+    The window is not extended by later changes, so a steady stream of changes
+    is still sent every `delay()` seconds. A delay of 0 sends each change now.
+    """
+
+    def __init__(self, send: Callable, delay: Callable[[], float]):
+        self.send = send
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.pending: Dict[Hashable, PendingBroadcast] = {}
+        _coalescers.add(self)
+
+    def add(self, key: Hashable, changed_ids: Iterable, created_ids: Iterable = ()):
+        delay = self.delay()
+        if delay <= 0:
+            self.send(key, set(changed_ids), set(created_ids))
+            return
+
+        with self.lock:
+            pending = self.pending.get(key)
+            if pending is None:
+                pending = self.pending[key] = PendingBroadcast()
+                pending.timer = threading.Timer(delay, self.flush, [key])
+                pending.timer.daemon = True
+                pending.timer.start()
+            pending.changed_ids.update(changed_ids)
+            pending.created_ids.update(created_ids)
+
+    def flush(self, key: Hashable = None):
+        """send the changes of `key` now, or of every key when `key` is None."""
+        with self.lock:
+            keys = list(self.pending) if key is None else [key]
+            flushed = [(k, self.pending.pop(k)) for k in keys if k in self.pending]
+        for k, pending in flushed:
+            pending.timer.cancel()
+            self.send(k, pending.changed_ids, pending.created_ids)
+
+
+@atexit.register
+def flush_all():
+    """send the pending changes of every coalescer, before the process exits."""
+    for coalescer in list(_coalescers):
+        try:
+            coalescer.flush()
+        except Exception:
+            logger.exception("could not flush pending broadcasts")
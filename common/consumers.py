@@ -1,14 +1,192 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
 from channels.db import database_sync_to_async
+from channels.exceptions import AcceptConnection, DenyConnection
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+from common.metrics import websocket_metrics
+from common.utils import extract_jwt_payload_from_asgi_scope
+from tenants.models import Client, Domain
+
+logger = logging.getLogger(__name__)
+
+# host name -> (expires at, tenant or None when the domain does not exist),
+# shared by every consumer of the process
+_tenants: Dict[str, Tuple[float, Optional[Client]]] = {}
+# host name -> lookup in progress, concurrent connects wait for the same query
+_lookups: Dict[str, asyncio.Future] = {}
+
+
+def invalidate_tenant_cache(**kwargs):
+    _tenants.clear()
+
+
+def _query_tenant(host_name) -> Optional[Client]:
+    domain = Domain.objects.select_related("tenant").filter(domain=host_name).first()
+    return domain.tenant if domain else None
+
+
+def in_schema(tenant, function, *args):
+    """call `function` in the schema of `tenant`, with database_sync_to_async."""
+    connection.set_tenant(tenant)
+    return function(*args)
+
+
+async def _lookup_tenant(host_name):
+    tenant = await database_sync_to_async(_query_tenant)(host_name)
+    _tenants[host_name] = (time.monotonic() + settings.TENANT_CACHE_TTL, tenant)
+    return tenant
+
+
+DROP_OLDEST = "drop_oldest"
+RESYNC = "resync"
+DISCONNECT = "disconnect"
+
+# close code sent to a client disconnected because it does not read its events
+OVERFLOW_CLOSE_CODE = 1013
+
+
+@dataclass
+class SendQueueStats:
+    queued: int = 0
+    max_depth: int = 0
+    dropped: int = 0
+    resyncs: int = 0
+    disconnects: int = 0
+
 
-from tenants.models import Domain
+# per process statistics of the send queues of every connection
+send_queue_stats = SendQueueStats()
 
 
 class TenantConsumers(AsyncWebsocketConsumer):
+    """
+    Events are sent through `send_event`, which queues them for a writer task of
+    the connection. A client that does not read them stalls the writer only,
+    the consumer keeps reading the channel layer. When the queue holds
+    WEBSOCKET_SEND_QUEUE_SIZE events, WEBSOCKET_SEND_QUEUE_OVERFLOW applies:
+    drop the oldest event, replace the queue with `resync_message` (the client
+    has to reload its data) or disconnect the client.
+    """
+
+    resync_message = json.dumps({"type": "resync"})
+
     def __init__(self, *args, **kwargs):
         self.tenant = None
+        self.send_queue = deque()
+        self.send_ready = asyncio.Event()
+        self.writer = None
+        self.overflowed = False
+        self.route = type(self).__name__
+        self.metrics_key = None
         super().__init__(*args, **kwargs)
 
+    async def websocket_connect(self, message):
+        try:
+            await self.connect()
+        except AcceptConnection:
+            await self.accept()
+        except DenyConnection as error:
+            websocket_metrics.denies[(self.route, str(error) or "denied")] += 1
+            await self.close()
+
+    async def accept(self, subprotocol=None):
+        await super().accept(subprotocol)
+        schema_name = self.tenant.schema_name if self.tenant else "unknown"
+        self.metrics_key = (schema_name, self.route)
+        websocket_metrics.connects[self.metrics_key] += 1
+        websocket_metrics.connections[self.metrics_key] += 1
+        self.writer = asyncio.ensure_future(self.write_events())
+
+    async def websocket_disconnect(self, message):
+        if self.metrics_key:
+            websocket_metrics.connections[self.metrics_key] -= 1
+            self.metrics_key = None
+        self.stop_writer()
+        await super().websocket_disconnect(message)
+
+    async def group_add(self, group_name):
+        await self.call_channel_layer("group_add", group_name, self.channel_name)
+
+    async def group_discard(self, group_name):
+        await self.call_channel_layer("group_discard", group_name, self.channel_name)
+
+    async def call_channel_layer(self, operation, *args):
+        try:
+            await getattr(self.channel_layer, operation)(*args)
+        except Exception:
+            websocket_metrics.channel_layer_errors[operation] += 1
+            raise
+
+    def stop_writer(self):
+        if self.writer:
+            self.writer.cancel()
+            self.writer = None
+        send_queue_stats.queued -= len(self.send_queue)
+        self.send_queue.clear()
+
+    async def write_events(self):
+        while True:
+            await self.send_ready.wait()
+            self.send_ready.clear()
+            while self.send_queue:
+                text_data = self.send_queue.popleft()
+                send_queue_stats.queued -= 1
+                start = time.perf_counter()
+                await self.send(text_data=text_data)
+                websocket_metrics.send_seconds[self.route].observe(
+                    time.perf_counter() - start
+                )
+
+    async def send_event(self, text_data):
+        if self.overflowed:
+            send_queue_stats.dropped += 1
+            return
+        if len(self.send_queue) >= settings.WEBSOCKET_SEND_QUEUE_SIZE:
+            if not await self.overflow():
+                return
+        self.send_queue.append(text_data)
+        send_queue_stats.queued += 1
+        send_queue_stats.max_depth = max(
+            send_queue_stats.max_depth, len(self.send_queue)
+        )
+        self.send_ready.set()
+
+    async def overflow(self) -> bool:
+        """apply the overflow policy, returns whether the new event is queued."""
+        policy = settings.WEBSOCKET_SEND_QUEUE_OVERFLOW
+        if policy == DROP_OLDEST:
+            self.send_queue.popleft()
+            send_queue_stats.queued -= 1
+            send_queue_stats.dropped += 1
+            return True
+
+        send_queue_stats.dropped += len(self.send_queue) + 1
+        if policy == RESYNC and self.resync_message:
+            send_queue_stats.resyncs += 1
+            send_queue_stats.queued -= len(self.send_queue) - 1
+            self.send_queue.clear()
+            self.send_queue.append(self.resync_message)
+            return False
+
+        send_queue_stats.disconnects += 1
+        logger.warning("disconnect a websocket client that does not read its events")
+        self.overflowed = True
+        self.stop_writer()
+        await self.close(OVERFLOW_CLOSE_CODE)
+        return False
+
     async def get_tenant(self):
         if "headers" not in self.scope:
             raise ValueError("this method should use only in asgi scope")
@@ -21,10 +199,209 @@ class TenantConsumers(AsyncWebsocketConsumer):
             raise ValueError("The headers key in the scope is invalid.")
         self.tenant = await self.get_tenant_model(host_name)
 
-    @database_sync_to_async
-    def get_tenant_model(self, host_name):
-        try:
-            domain = Domain.objects.get(domain=host_name)
-        except Domain.DoesNotExist:
+    @staticmethod
+    def get_user(username):
+        from accounts.models import User
+
+        return User.objects.filter(username=username, is_active=True).first()
+
+    def query_param(self, name) -> Optional[str]:
+        query = parse_qs(self.scope.get("query_string", b"").decode("latin1"))
+        return query[name][0] if name in query else None
+
+    async def get_tenant_model(self, host_name):
+        cached = _tenants.get(host_name)
+        if cached and cached[0] > time.monotonic():
+            tenant = cached[1]
+        else:
+            lookup = _lookups.get(host_name)
+            if lookup is None:
+                lookup = _lookups[host_name] = asyncio.ensure_future(
+                    _lookup_tenant(host_name)
+                )
+                lookup.add_done_callback(lambda _: _lookups.pop(host_name, None))
+            tenant = await asyncio.shield(lookup)
+        if tenant is None:
             raise ValueError("domain not found")
-        return domain.tenant
+        return tenant
+
+
+@dataclass
+class Stream:
+    """
+    a kind of event a `MultiplexConsumer` client can subscribe to.
+    `authorize(user, stream_id)` tells whether the user may follow `stream_id`,
+    it runs in the tenant schema before joining the group or replaying.
+    `dedupe_field` names a message field identifying the same event sent to
+    several groups of the stream, it is forwarded only once per connection.
+    `replay(stream_id, last_event_id)` returns the events missed since
+    `last_event_id` as (dedupe value, text), or None when the client has to
+    reload its data. It runs in the tenant schema.
+    `targets(message)` returns the stream ids an event is for, when several ids
+    share a group. Events for none of the subscribed ids are not forwarded.
+    """
+
+    name: str
+    event_type: str
+    group_name: Callable[[str, str], str]
+    authorize: Callable[[Any, str], bool]
+    dedupe_field: Optional[str] = None
+    replay: Optional[Callable[[str, int], Optional[List[Tuple[str, str]]]]] = None
+    targets: Optional[Callable[[dict], Iterable]] = None
+
+
+streams: Dict[str, Stream] = {}
+
+
+def register_stream(stream: Stream):
+    streams[stream.name] = stream
+
+
+DEDUPE_WINDOW = 256
+
+
+class MultiplexConsumer(TenantConsumers):
+    """
+    One websocket for every feed of a dashboard. The client sends
+    {"action": "subscribe" | "unsubscribe", "stream": <name>, "id": <id>}
+    and receives {"stream": <name>, "data": <event>} for each event.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.user = None
+        self.subscriptions: Set[Tuple[str, str]] = set()
+        self.recent_events = deque(maxlen=DEDUPE_WINDOW)
+        self.event_types = {stream.event_type: stream for stream in streams.values()}
+        super().__init__(*args, **kwargs)
+
+    async def connect(self):
+        payload = extract_jwt_payload_from_asgi_scope(self.scope)
+        if not payload["username"]:
+            raise DenyConnection("invalid token")
+        try:
+            await self.get_tenant()
+        except ValueError:
+            raise DenyConnection("domain not found")
+        self.user = await database_sync_to_async(in_schema)(
+            self.tenant, self.get_user, payload["username"]
+        )
+        if self.user is None:
+            raise DenyConnection("invalid token")
+        await self.accept()
+
+    async def disconnect(self, code):
+        for stream_name, stream_id in list(self.subscriptions):
+            await self.unsubscribe(streams[stream_name], stream_id)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            request = json.loads(text_data or "")
+            action = request["action"]
+            stream = streams[request["stream"]]
+            stream_id = str(request["id"])
+            if not re.fullmatch(r"\w{1,64}", stream_id):
+                raise ValueError(stream_id)
+            last_event_id = request.get("last_event_id")
+            if last_event_id is not None:
+                last_event_id = int(last_event_id)
+        except (ValueError, KeyError, TypeError):
+            await self.send_json({"error": "invalid request"})
+            return
+
+        if action == "subscribe":
+            key = (stream.name, stream_id)
+            if (
+                key not in self.subscriptions
+                and len(self.subscriptions) >= settings.WEBSOCKET_MAX_SUBSCRIPTIONS
+            ):
+                await self.send_json(
+                    {"error": "too many subscriptions", **self.reply(stream, stream_id)}
+                )
+                return
+            if not await self.authorize(stream, stream_id):
+                await self.send_json(
+                    {"error": "permission denied", **self.reply(stream, stream_id)}
+                )
+                return
+            await self.subscribe(stream, stream_id)
+            await self.send_json(
+                {"action": "subscribed", **self.reply(stream, stream_id)}
+            )
+            if last_event_id is not None and stream.replay:
+                await self.replay(stream, stream_id, last_event_id)
+        elif action == "unsubscribe":
+            await self.unsubscribe(stream, stream_id)
+            await self.send_json(
+                {"action": "unsubscribed", **self.reply(stream, stream_id)}
+            )
+        else:
+            await self.send_json({"error": "invalid action"})
+
+    async def authorize(self, stream: Stream, stream_id: str) -> bool:
+        try:
+            return await database_sync_to_async(in_schema)(
+                self.tenant, stream.authorize, self.user, stream_id
+            )
+        except (ValueError, ValidationError):
+            return False
+
+    async def subscribe(self, stream: Stream, stream_id: str):
+        self.subscriptions.add((stream.name, stream_id))
+        await self.group_add(stream.group_name(self.tenant.schema_name, stream_id))
+
+    async def replay(self, stream: Stream, stream_id: str, last_event_id: int):
+        events = await database_sync_to_async(in_schema)(
+            self.tenant, stream.replay, stream_id, last_event_id
+        )
+        if events is None:
+            await self.send_event(
+                json.dumps({"action": "resync", **self.reply(stream, stream_id)})
+            )
+            return
+        for key, text in events:
+            if (stream.name, key) in self.recent_events:
+                continue
+            self.recent_events.append((stream.name, key))
+            await self.send_event(self.stream_event(stream, text))
+
+    async def unsubscribe(self, stream: Stream, stream_id: str):
+        self.subscriptions.discard((stream.name, stream_id))
+        group_name = stream.group_name(self.tenant.schema_name, stream_id)
+        # another subscription may share the group
+        if not any(
+            stream.group_name(self.tenant.schema_name, other_id) == group_name
+            for name, other_id in self.subscriptions
+            if name == stream.name
+        ):
+            await self.group_discard(group_name)
+
+    async def dispatch(self, message):
+        stream = self.event_types.get(message["type"])
+        if stream is None:
+            return await super().dispatch(message)
+
+        if stream.targets:
+            targets = {str(target) for target in stream.targets(message)}
+            if not any(
+                name == stream.name and stream_id in targets
+                for name, stream_id in self.subscriptions
+            ):
+                return
+        if stream.dedupe_field and message.get(stream.dedupe_field):
+            key = (stream.name, message[stream.dedupe_field])
+            if key in self.recent_events:
+                return
+            self.recent_events.append(key)
+        await self.send_event(self.stream_event(stream, message["text"]))
+
+    @staticmethod
+    def stream_event(stream: Stream, text: str) -> str:
+        # the event text is already JSON, embed it without decoding it
+        return f'{{"stream": {json.dumps(stream.name)}, "data": {text}}}'
+
+    @staticmethod
+    def reply(stream, stream_id):
+        return {"stream": stream.name, "id": stream_id}
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content))
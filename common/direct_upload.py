@@ -0,0 +1,84 @@
+"""
+Direct-to-storage uploads.
+
+Instead of posting a file through the API, the client asks for an upload
+target (`issue_upload`), posts the file straight to the storage with the
+returned url and form fields, then confirms the upload with the returned
+token. The token is signed and carries the storage name and the claims given
+when it was issued, so a client can only register files it was allowed to
+upload. A confirmed name is recorded in `ConsumedUpload`, a token cannot be
+replayed to register the same file twice.
+
+`default_storage` must implement `presigned_upload(name, max_size, expires)`,
+see `common.storage`.
+"""
+
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.utils.timezone import now
+
+from reports.models import ConsumedUpload
+
+
+TOKEN_SALT = "common.direct_upload"
+
+
+def token_max_age() -> int:
+    # an upload started just before the url expired can still be confirmed
+    return settings.DIRECT_UPLOAD_EXPIRES * 2
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+@dataclass
+class DirectUpload:
+    url: str
+    fields: Dict[str, str]
+    token: str
+
+
+def issue_upload(upload_to: str, filename: str, **claims) -> DirectUpload:
+    _, ext = os.path.splitext(filename or "")
+    name = f"{upload_to}/{uuid.uuid4()}{ext.lower()}"
+    url, fields = default_storage.presigned_upload(
+        name, settings.DIRECT_UPLOAD_MAX_SIZE, settings.DIRECT_UPLOAD_EXPIRES
+    )
+    token = signing.dumps({**claims, "name": name}, salt=TOKEN_SALT)
+    return DirectUpload(url=url, fields=fields, token=token)
+
+
+def confirm_upload(token: str, **claims) -> str:
+    """
+    returns the storage name of an uploaded file. `claims` must match the ones
+    given to `issue_upload`.
+    """
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=token_max_age())
+    except signing.BadSignature:
+        raise InvalidUpload("invalid upload token")
+    for key, value in claims.items():
+        if payload.get(key) != value:
+            raise InvalidUpload("upload token does not match")
+    name = payload["name"]
+    if not default_storage.exists(name):
+        raise InvalidUpload("file has not been uploaded")
+    _, created = ConsumedUpload.objects.get_or_create(name=name)
+    if not created:
+        raise InvalidUpload("upload token has already been used")
+    return name
+
+
+def expire_consumed_uploads() -> int:
+    """forget the names of tokens that have expired anyway."""
+    cutoff = now() - timedelta(seconds=token_max_age())
+    count, _ = ConsumedUpload.objects.filter(consumed_at__lt=cutoff).delete()
+    return count
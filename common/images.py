@@ -0,0 +1,96 @@
+"""
+Ingest time normalization of uploaded photos.
+
+Originals from phone cameras (12MP and more) are downscaled to
+IMAGE_NORMALIZE_MAX_DIMENSION before they are stored, so neither the storage
+nor the thumbnail tasks have to deal with the full size bitmap again.
+
+Memory stays bounded by the target size: JPEG files are decoded straight at
+1/2, 1/4 or 1/8 scale with `draft`, and other formats go through the integer
+`reduce` of `thumbnail(reducing_gap=...)` before the final resample. A 12MP
+(4032x3024) photo is only decoded at half size when the max dimension is at
+most 2016.
+"""
+
+import io
+import math
+import os
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+REDUCING_GAP = 3.0
+
+
+def normalize_image(
+    file,
+    max_dimension: Optional[int] = None,
+    image_format: Optional[str] = None,
+    quality: Optional[int] = None,
+) -> Optional[ContentFile]:
+    """
+    returns `file` downscaled to fit in `max_dimension` and re-encoded, or None
+    when it is not an image, is animated or is already small enough.
+    """
+    max_dimension = max_dimension or settings.IMAGE_NORMALIZE_MAX_DIMENSION
+    image_format = image_format or settings.IMAGE_NORMALIZE_FORMAT
+    quality = quality or settings.IMAGE_NORMALIZE_QUALITY
+    if not max_dimension:
+        return None
+
+    try:
+        source = PILImage.open(file)
+    except (UnidentifiedImageError, OSError):
+        file.seek(0)
+        return None
+
+    try:
+        if getattr(source, "is_animated", False) or max(source.size) <= max_dimension:
+            return None
+
+        scale = max_dimension / max(source.size)
+        source.draft(
+            "RGB", (math.ceil(source.width * scale), math.ceil(source.height * scale))
+        )
+        source.thumbnail(
+            (max_dimension, max_dimension),
+            PILImage.LANCZOS,
+            reducing_gap=REDUCING_GAP,
+        )
+        # rotate after the resize, on the small bitmap
+        img = _convert_mode(ImageOps.exif_transpose(source), image_format)
+
+        buffer = io.BytesIO()
+        if image_format == "JPEG":
+            img.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+        else:
+            img.save(buffer, image_format, quality=quality)
+    finally:
+        source.close()
+        file.seek(0)
+
+    stem, _ = os.path.splitext(os.path.basename(file.name or "image"))
+    extension = FORMAT_EXTENSIONS.get(image_format, f".{image_format.lower()}")
+    return ContentFile(buffer.getvalue(), name=f"{stem}{extension}")
+
+
+def _convert_mode(img, image_format):
+    has_alpha = img.mode in ("RGBA", "LA") or (
+        img.mode == "P" and "transparency" in img.info
+    )
+    if has_alpha and image_format != "JPEG":
+        return img.convert("RGBA")
+    if has_alpha:
+        # JPEG has no alpha channel, flatten on white
+        rgba = img.convert("RGBA")
+        background = PILImage.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if img.mode != "RGB":
+        return img.convert("RGB")
+    return img
@@ -0,0 +1,117 @@
+"""
+Garbage collection of the files behind soft deleted rows.
+
+`BaseModel.delete` only sets `deleted_at`. Once a row has been deleted for
+longer than MEDIA_GC_RETENTION_DAYS, `collect_media` removes its file and the
+thumbnails of that file from the storage, then deletes the row for good.
+
+Work is done in batches of rows ordered by primary key, and a row is only
+deleted after its files, so an interrupted run just starts again with the rows
+that are left. A file shared by several rows (deduplicated images) is kept
+until the last row using it is collected.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from easy_thumbnails.models import Source, Thumbnail
+from easy_thumbnails.storage import thumbnail_default_storage
+
+from common.thumbnails import get_thumbnail_field
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MediaOwner:
+    model: type
+    field_name: str
+    expired: Callable[[datetime], QuerySet]
+
+
+media_owners: List[MediaOwner] = []
+
+
+def register_media_owner(model, field_name="file", expired=None):
+    """`expired(cutoff)` returns the rows whose media can be removed."""
+    if expired is None:
+
+        def expired(cutoff):
+            return model._base_manager.filter(deleted_at__lt=cutoff)
+
+    media_owners.append(MediaOwner(model, field_name, expired))
+
+
+def delete_files(storage, names: Iterable[str]):
+    names = [name for name in names if name]
+    if not names:
+        return
+    if hasattr(storage, "delete_many"):
+        storage.delete_many(names)
+    else:
+        for name in names:
+            storage.delete(name)
+
+
+def collect_media_batch(owner: MediaOwner, cutoff: datetime, batch_size: int) -> int:
+    """collect one batch of expired rows, returns the number of deleted rows."""
+    model = owner.model
+    names_field = get_thumbnail_field(model).names_field
+    rows = list(
+        owner.expired(cutoff)
+        .order_by("pk")
+        .values_list("pk", owner.field_name, names_field)[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    pks = [pk for pk, _, _ in rows]
+    names = {name for _, name, _ in rows if name}
+    shared = set(
+        model._base_manager.filter(**{f"{owner.field_name}__in": names})
+        .exclude(pk__in=pks)
+        .values_list(owner.field_name, flat=True)
+    )
+    names -= shared
+
+    thumbnail_names = set(
+        Thumbnail.objects.filter(source__name__in=names).values_list("name", flat=True)
+    )
+    for _, name, thumbnails in rows:
+        if name in names:
+            thumbnail_names.update((thumbnails or {}).values())
+
+    delete_files(thumbnail_default_storage, thumbnail_names)
+    delete_files(model._meta.get_field(owner.field_name).storage, names)
+    with transaction.atomic():
+        Source.objects.filter(name__in=names).delete()
+        model._base_manager.filter(pk__in=pks).delete()
+
+    logger.info(
+        "collected %d %s rows, %d files, %d thumbnails",
+        len(pks),
+        model._meta.label,
+        len(names),
+        len(thumbnail_names),
+    )
+    return len(pks)
+
+
+def collect_media(
+    cutoff: datetime, batch_size: int = 500, max_batches: Optional[int] = None
+) -> int:
+    total = 0
+    batches = 0
+    for owner in media_owners:
+        while max_batches is None or batches < max_batches:
+            collected = collect_media_batch(owner, cutoff, batch_size)
+            if not collected:
+                break
+            total += collected
+            batches += 1
+    return total
@@ -0,0 +1,193 @@
+"""
+Websocket metrics of the process, exported in the Prometheus text format.
+
+The numbers are kept per process: scrape every ASGI worker.
+Connections are labeled with the tenant schema and the consumer class (the
+route), broadcasts with the channel layer event type.
+
+A broadcast is counted by the process that sends it, which is the one saving
+the report or comment: an ASGI or WSGI worker, or a celery worker. Celery
+workers cannot be scraped, so the totals of the scrape miss their broadcasts.
+The "common.metrics.broadcasts" log records (one per broadcast, with the event
+type, group count and duration) cover every process.
+"""
+
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+
+broadcast_logger = logging.getLogger("common.metrics.broadcasts")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+@dataclass
+class Histogram:
+    counts: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    sum: float = 0.0
+    count: int = 0
+
+    def observe(self, value: float):
+        index = bisect_left(LATENCY_BUCKETS, value)
+        if index < len(LATENCY_BUCKETS):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+@dataclass
+class WebsocketMetrics:
+    # (tenant, route) -> open connections
+    connections: Dict[Tuple[str, str], int] = field(
+        default_factory=lambda: defaultdict(int)
+    )
+    # (tenant, route) -> accepted connections
+    connects: Dict[Tuple[str, str], int] = field(
+        default_factory=lambda: defaultdict(int)
+    )
+    # (route, reason) -> denied connections
+    denies: Dict[Tuple[str, str], int] = field(default_factory=lambda: defaultdict(int))
+    # event type -> broadcasts, and the groups they were sent to
+    broadcasts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    broadcast_groups: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    # event type -> seconds to send a broadcast to all of its groups
+    broadcast_seconds: Dict[str, Histogram] = field(
+        default_factory=lambda: defaultdict(Histogram)
+    )
+    # route -> seconds to write an event to a client
+    send_seconds: Dict[str, Histogram] = field(
+        default_factory=lambda: defaultdict(Histogram)
+    )
+    # operation (group_send, group_add, ...) -> failed channel layer calls
+    channel_layer_errors: Dict[str, int] = field(
+        default_factory=lambda: defaultdict(int)
+    )
+
+
+websocket_metrics = WebsocketMetrics()
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def _samples(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+
+def _histograms(lines, name, help_text, histograms, label_name):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+            cumulative += count
+            labels = _labels(**{label_name: key, "le": bound})
+            lines.append(f"{name}_bucket{{{labels}}} {cumulative}")
+        labels = _labels(**{label_name: key, "le": "+Inf"})
+        lines.append(f"{name}_bucket{{{labels}}} {histogram.count}")
+        labels = _labels(**{label_name: key})
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+def render_prometheus() -> str:
+    from common.consumers import send_queue_stats
+
+    metrics = websocket_metrics
+    lines = []
+    _samples(
+        lines,
+        "podd_websocket_connections",
+        "gauge",
+        "open websocket connections",
+        [
+            (_labels(tenant=tenant, route=route), value)
+            for (tenant, route), value in sorted(metrics.connections.items())
+        ],
+    )
+    _samples(
+        lines,
+        "podd_websocket_connects_total",
+        "counter",
+        "accepted websocket connections",
+        [
+            (_labels(tenant=tenant, route=route), value)
+            for (tenant, route), value in sorted(metrics.connects.items())
+        ],
+    )
+    _samples(
+        lines,
+        "podd_websocket_denies_total",
+        "counter",
+        "denied websocket connections",
+        [
+            (_labels(route=route, reason=reason), value)
+            for (route, reason), value in sorted(metrics.denies.items())
+        ],
+    )
+    _samples(
+        lines,
+        "podd_broadcasts_total",
+        "counter",
+        "events broadcast to websocket groups",
+        [(_labels(event=event), n) for event, n in sorted(metrics.broadcasts.items())],
+    )
+    _samples(
+        lines,
+        "podd_broadcast_groups_total",
+        "counter",
+        "group sends of the broadcast events (fan-out)",
+        [
+            (_labels(event=event), n)
+            for event, n in sorted(metrics.broadcast_groups.items())
+        ],
+    )
+    _histograms(
+        lines,
+        "podd_broadcast_seconds",
+        "time to send an event to all of its groups",
+        metrics.broadcast_seconds,
+        "event",
+    )
+    _histograms(
+        lines,
+        "podd_websocket_send_seconds",
+        "time to write an event to a websocket client",
+        metrics.send_seconds,
+        "route",
+    )
+    _samples(
+        lines,
+        "podd_channel_layer_errors_total",
+        "counter",
+        "failed channel layer calls",
+        [
+            (_labels(operation=operation), n)
+            for operation, n in sorted(metrics.channel_layer_errors.items())
+        ],
+    )
+    for name, kind, help_text, value in (
+        ("queued", "gauge", "events waiting in the send queues", "queued"),
+        ("max_depth", "gauge", "deepest send queue seen", "max_depth"),
+        ("dropped_total", "counter", "events dropped by the send queues", "dropped"),
+        ("resyncs_total", "counter", "send queues replaced by a resync", "resyncs"),
+        ("disconnects_total", "counter", "clients disconnected", "disconnects"),
+    ):
+        _samples(
+            lines,
+            f"podd_websocket_send_queue_{name}",
+            kind,
+            help_text,
+            [("", getattr(send_queue_stats, value))],
+        )
+    return "\n".join(lines) + "\n"
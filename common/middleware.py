@@ -0,0 +1,14 @@
+from channels.middleware import BaseMiddleware
+
+from common.utils import decode_jwt_payload_from_asgi_scope
+
+
+class JWTPayloadMiddleware(BaseMiddleware):
+    """
+    verify the JWT cookie once per websocket connection and keep its payload in
+    scope["jwt_payload"], for `extract_jwt_payload_from_asgi_scope`.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope, jwt_payload=decode_jwt_payload_from_asgi_scope(scope))
+        return await super().__call__(scope, receive, send)
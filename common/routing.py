@@ -0,0 +1,8 @@
+from django.urls import re_path
+
+from . import consumers, subscriptions
+
+websocket_urlpatterns = [
+    re_path(r"ws/events/$", consumers.MultiplexConsumer.as_asgi()),
+    re_path(r"ws/graphql/$", subscriptions.GraphQLSubscriptionConsumer.as_asgi()),
+]
@@ -1,14 +1,51 @@
+from django.core import signing
 from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
 
 from podd_api import settings
 
+DIRECT_UPLOAD_SALT = "common.storage.direct_upload"
+
 
 class S3MediaStorage(S3Boto3Storage):
     bucket_name = settings.MEDIA_BUCKET_NAME
     location = "media"
 
+    def presigned_upload(self, name, max_size, expires):
+        """returns (url, fields) of a presigned POST that stores one file at `name`."""
+        post = self.bucket.meta.client.generate_presigned_post(
+            self.bucket.name,
+            self._normalize_name(clean_name(name)),
+            Conditions=[["content-length-range", 1, max_size]],
+            ExpiresIn=expires,
+        )
+        return post["url"], post["fields"]
+
+    def delete_many(self, names):
+        """delete in batches of 1000 keys, the limit of a DeleteObjects request."""
+        keys = [self._normalize_name(clean_name(name)) for name in names]
+        for start in range(0, len(keys), 1000):
+            self.bucket.delete_objects(
+                Delete={
+                    "Objects": [{"Key": key} for key in keys[start : start + 1000]],
+                    "Quiet": True,
+                }
+            )
+
 
 class SimpleFileMediaStorage(FileSystemStorage):
     def url(self, name):
         return f"https://{settings.MEDIA_DOMAIN}{settings.MEDIA_URL}{name}"
+
+    def presigned_upload(self, name, max_size, expires):
+        """
+        local stand-in for the S3 presigned POST, the file is posted to
+        `common.views.direct_upload` with the same multipart form.
+        """
+        token = signing.dumps(
+            {"name": name, "max_size": max_size}, salt=DIRECT_UPLOAD_SALT
+        )
+        path = reverse("direct_upload", args=[token])
+        return f"https://{settings.MEDIA_DOMAIN}{path}", {}
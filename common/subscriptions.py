@@ -0,0 +1,355 @@
+"""
+GraphQL subscriptions over websocket (graphql-transport-ws protocol).
+
+Each subscription field listens to a channel layer event. The root object of an
+event is loaded once per process, then every subscriber executes its own
+selection against it, so clients receive the data they asked for without
+querying it again. Identical subscriptions share their execution result too.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from channels.db import database_sync_to_async
+from channels.exceptions import DenyConnection
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpRequest
+from graphql import (
+    ExecutionResult,
+    FieldNode,
+    GraphQLError,
+    OperationType,
+    execute,
+    parse,
+    validate,
+)
+from graphql.execution.values import get_argument_values, get_variable_values
+from graphql.utilities import get_operation_ast
+
+from common.consumers import DEDUPE_WINDOW, TenantConsumers, in_schema
+from common.utils import extract_jwt_payload_from_asgi_scope
+
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL = "graphql-transport-ws"
+
+# seconds an event root and its results stay shared between subscribers
+EVENT_CACHE_SECONDS = 5
+
+
+@dataclass
+class SubscriptionField:
+    """
+    `field_name` is the graphql name of a field of the Subscription type and
+    `argument` the python name of its argument selecting the group to join.
+    `targets` returns the argument values an event is sent for, `event_key`
+    identifies an event and `load` returns its root values (one "next" each),
+    it runs in the tenant schema. `authorize(user, target)` tells whether the
+    user may follow `target`, it runs in the tenant schema before joining.
+    """
+
+    field_name: str
+    argument: str
+    event_type: str
+    group_name: Callable[[str, str], str]
+    targets: Callable[[dict], Iterable[Any]]
+    event_key: Callable[[dict], str]
+    load: Callable[[dict], List[Any]]
+    authorize: Callable[[Any, str], bool]
+
+
+subscription_fields: Dict[str, SubscriptionField] = {}
+
+
+def register_subscription(field: SubscriptionField):
+    subscription_fields[field.field_name] = field
+
+
+@dataclass
+class Subscription:
+    field: SubscriptionField
+    group_name: str
+    target: str
+    document: Any
+    operation_name: Optional[str]
+    variables: dict
+    # identical subscriptions (user, query, variables, host) share their results
+    cache_key: Tuple
+
+
+class SubscriptionError(Exception):
+    def __init__(self, *errors: GraphQLError):
+        super().__init__(*errors)
+        self.errors = errors
+
+
+# (schema, event type, event key) -> roots being loaded or loaded
+_roots: Dict[Tuple, asyncio.Future] = {}
+# (schema, event type, event key, subscription cache key, root index) -> result
+_results: Dict[Tuple, asyncio.Future] = {}
+
+
+def _share(cache: Dict[Tuple, asyncio.Future], key: Tuple, load):
+    """run `load()` once for concurrent callers of `key`, kept for a few seconds."""
+    future = cache.get(key)
+    if future is None:
+        future = cache[key] = asyncio.ensure_future(load())
+        asyncio.get_running_loop().call_later(
+            EVENT_CACHE_SECONDS, cache.pop, key, None
+        )
+    return asyncio.shield(future)
+
+
+class SubscriptionContext(HttpRequest):
+    """the `info.context` of subscription resolvers, built from the asgi scope."""
+
+    def __init__(self, scope, user):
+        super().__init__()
+        self.user = user
+        self.path = scope.get("path", "")
+        self.secure = scope.get("scheme") == "wss"
+        for name, value in scope.get("headers", []):
+            key = "HTTP_" + name.decode("latin1").upper().replace("-", "_")
+            self.META[key] = value.decode("latin1")
+
+    def _get_scheme(self):
+        return "https" if self.secure else "http"
+
+
+class GraphQLSubscriptionConsumer(TenantConsumers):
+    # the protocol has no resync message, the "resync" policy disconnects
+    resync_message = None
+
+    def __init__(self, *args, **kwargs):
+        self.user = None
+        self.context = None
+        self.initialized = False
+        self.subscriptions: Dict[str, Subscription] = {}
+        self.recent_events = deque(maxlen=DEDUPE_WINDOW)
+        self.event_types = {
+            field.event_type: field for field in subscription_fields.values()
+        }
+        super().__init__(*args, **kwargs)
+
+    async def connect(self):
+        payload = extract_jwt_payload_from_asgi_scope(self.scope)
+        if not payload["username"]:
+            raise DenyConnection("invalid token")
+        try:
+            await self.get_tenant()
+        except ValueError:
+            raise DenyConnection("domain not found")
+        self.user = await database_sync_to_async(in_schema)(
+            self.tenant, self.get_user, payload["username"]
+        )
+        if self.user is None:
+            raise DenyConnection("invalid token")
+        self.context = SubscriptionContext(self.scope, self.user)
+        subprotocols = self.scope.get("subprotocols", ())
+        subprotocol = PROTOCOL if PROTOCOL in subprotocols else None
+        await self.accept(subprotocol)
+
+    async def disconnect(self, code):
+        for subscription_id in list(self.subscriptions):
+            await self.complete(subscription_id)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data or "")
+            message_type = message["type"]
+        except (ValueError, KeyError, TypeError):
+            await self.close(4400)
+            return
+
+        if message_type == "connection_init":
+            if self.initialized:
+                await self.close(4429)
+                return
+            self.initialized = True
+            await self.send_json({"type": "connection_ack"})
+        elif message_type == "ping":
+            await self.send_json({"type": "pong"})
+        elif message_type == "pong":
+            pass
+        elif not self.initialized:
+            await self.close(4401)
+        elif message_type == "subscribe":
+            subscription_id = message.get("id")
+            if not isinstance(subscription_id, str):
+                await self.close(4400)
+            elif subscription_id in self.subscriptions:
+                await self.close(4409)
+            else:
+                await self.subscribe(subscription_id, message.get("payload") or {})
+        elif message_type == "complete":
+            await self.complete(message.get("id"))
+        else:
+            await self.close(4400)
+
+    async def subscribe(self, subscription_id, payload):
+        if len(self.subscriptions) >= settings.WEBSOCKET_MAX_SUBSCRIPTIONS:
+            await self.send_errors(
+                subscription_id, [GraphQLError("too many subscriptions")]
+            )
+            return
+        try:
+            subscription = await database_sync_to_async(in_schema)(
+                self.tenant, self.prepare, payload
+            )
+        except GraphQLError as error:
+            await self.send_errors(subscription_id, [error])
+            return
+        except SubscriptionError as error:
+            await self.send_errors(subscription_id, error.errors)
+            return
+
+        self.subscriptions[subscription_id] = subscription
+        await self.group_add(subscription.group_name)
+
+    def prepare(self, payload) -> Subscription:
+        from podd_api.schema import schema
+
+        query = payload.get("query")
+        if not isinstance(query, str):
+            raise GraphQLError("query is required")
+        document = parse(query)
+        errors = validate(schema.graphql_schema, document)
+        if errors:
+            raise SubscriptionError(*errors)
+        operation_name = payload.get("operationName")
+        operation = get_operation_ast(document, operation_name)
+        if operation is None or operation.operation != OperationType.SUBSCRIPTION:
+            raise GraphQLError("a subscription operation is required")
+
+        node = operation.selection_set.selections[0]
+        field = isinstance(node, FieldNode) and subscription_fields.get(node.name.value)
+        if not field:
+            raise GraphQLError("unknown subscription")
+        variables = get_variable_values(
+            schema.graphql_schema,
+            operation.variable_definitions or [],
+            payload.get("variables") or {},
+        )
+        if isinstance(variables, list):
+            raise SubscriptionError(*variables)
+        field_def = schema.graphql_schema.subscription_type.fields[node.name.value]
+        target = str(get_argument_values(field_def, node, variables)[field.argument])
+        try:
+            allowed = field.authorize(self.user, target)
+        except (ValueError, ValidationError):
+            allowed = False
+        if not allowed:
+            raise GraphQLError("Permission denied.")
+
+        return Subscription(
+            field=field,
+            group_name=field.group_name(self.tenant.schema_name, target),
+            target=target,
+            document=document,
+            operation_name=operation_name,
+            variables=variables,
+            cache_key=(
+                self.user.id,
+                query,
+                operation_name,
+                json.dumps(variables, sort_keys=True, default=str),
+                self.context.get_host(),
+            ),
+        )
+
+    async def complete(self, subscription_id):
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return
+        # another subscription of the connection may use the same group
+        if not any(
+            other.group_name == subscription.group_name
+            for other in self.subscriptions.values()
+        ):
+            await self.group_discard(subscription.group_name)
+
+    async def dispatch(self, message):
+        field = self.event_types.get(message["type"])
+        if field is None:
+            return await super().dispatch(message)
+
+        targets = {str(target) for target in field.targets(message)}
+        event_key = field.event_key(message)
+        for subscription_id, subscription in list(self.subscriptions.items()):
+            if subscription.field is not field or subscription.target not in targets:
+                continue
+            # an event is sent to every group it concerns, deliver it once
+            if (subscription_id, event_key) in self.recent_events:
+                continue
+            self.recent_events.append((subscription_id, event_key))
+            try:
+                results = await self.resolve(subscription, message)
+            except Exception:
+                logger.exception("could not resolve %s %s", field.event_type, event_key)
+                continue
+            for result in results:
+                if subscription_id in self.subscriptions:
+                    await self.send_event(
+                        json.dumps(
+                            {"id": subscription_id, "type": "next", "payload": result},
+                            default=str,
+                        )
+                    )
+
+    async def resolve(self, subscription: Subscription, message) -> List[dict]:
+        field = subscription.field
+        event = (self.tenant.schema_name, field.event_type, field.event_key(message))
+        roots = await _share(
+            _roots,
+            event,
+            lambda: database_sync_to_async(in_schema)(
+                self.tenant, field.load, message
+            ),
+        )
+        results = []
+        for index, root in enumerate(roots):
+            key = (*event, subscription.cache_key, index)
+            results.append(
+                await _share(
+                    _results,
+                    key,
+                    lambda: database_sync_to_async(in_schema)(
+                        self.tenant, self.execute, subscription, root
+                    ),
+                )
+            )
+        return results
+
+    def execute(self, subscription: Subscription, root) -> dict:
+        from podd_api.schema import schema
+
+        result: ExecutionResult = execute(
+            schema.graphql_schema,
+            subscription.document,
+            root_value=root,
+            context_value=self.context,
+            variable_values=subscription.variables,
+            operation_name=subscription.operation_name,
+        )
+        payload = {"data": result.data}
+        if result.errors:
+            payload["errors"] = [error.formatted for error in result.errors]
+        return payload
+
+    async def send_errors(self, subscription_id, errors):
+        await self.send_json(
+            {
+                "id": subscription_id,
+                "type": "error",
+                "payload": [error.formatted for error in errors],
+            }
+        )
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content, default=str))
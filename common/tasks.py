@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.utils.timezone import now
+from django_tenants.utils import get_public_schema_name
+
+from podd_api.celery import app
+
+
+@app.task
+def generate_thumbnails(model_label, pk, field_name, ready_field, names_field):
+    """build every thumbnail alias of a file field, then flag it as ready."""
+    from common.thumbnails import build_thumbnails
+
+    model = apps.get_model(model_label)
+    instance = model._base_manager.get(pk=pk)
+    field_file = getattr(instance, field_name)
+    names = build_thumbnails(field_file) if field_file else {}
+    model._base_manager.filter(pk=pk).update(
+        **{ready_field: True, names_field: names}
+    )
+
+
+@app.task
+def collect_media_garbage(batch_size=500, max_batches=None):
+    """remove the files of rows soft deleted more than MEDIA_GC_RETENTION_DAYS ago."""
+    from common.media_gc import collect_media
+
+    cutoff = now() - timedelta(days=settings.MEDIA_GC_RETENTION_DAYS)
+    return collect_media(cutoff, batch_size, max_batches)
+
+
+@app.task
+def expire_consumed_uploads():
+    from common.direct_upload import expire_consumed_uploads
+
+    return expire_consumed_uploads()
+
+
+@app.task
+def run_for_each_tenant(task_name, **kwargs):
+    """
+    send `task_name` once in every tenant schema. Celery beat runs its entries in
+    the public schema, tenant maintenance tasks are scheduled through this one.
+    tenant_schemas_celery reads the schema of a task from its headers only.
+    """
+    from tenants.models import Client
+
+    for schema_name in Client.objects.exclude(
+        schema_name=get_public_schema_name()
+    ).values_list("schema_name", flat=True):
+        app.send_task(task_name, kwargs=kwargs, headers={"_schema_name": schema_name})
@@ -0,0 +1,51 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from common.broadcast import BroadcastCoalescer, flush_all
+
+
+class BroadcastCoalescerTests(SimpleTestCase):
+    def setUp(self):
+        self.sent = []
+        self.delay = 60
+
+    def coalescer(self):
+        def send(key, changed_ids, created_ids):
+            self.sent.append((key, changed_ids, created_ids))
+
+        return BroadcastCoalescer(send, lambda: self.delay)
+
+    def test_changes_of_a_key_are_merged(self):
+        coalescer = self.coalescer()
+        coalescer.add("t1", [1], [1])
+        coalescer.add("t1", [2, 1])
+        coalescer.add("t2", [3])
+        self.assertEqual([], self.sent)
+
+        coalescer.flush("t1")
+        self.assertEqual([("t1", {1, 2}, {1})], self.sent)
+        coalescer.flush()
+        self.assertEqual([("t1", {1, 2}, {1}), ("t2", {3}, set())], self.sent)
+        coalescer.flush()
+        self.assertEqual(2, len(self.sent))
+
+    def test_sent_when_the_window_ends(self):
+        self.delay = 0.01
+        done = threading.Event()
+        coalescer = BroadcastCoalescer(lambda *args: done.set(), lambda: self.delay)
+        coalescer.add("t1", [1])
+        self.assertTrue(done.wait(5))
+        self.assertEqual({}, coalescer.pending)
+
+    def test_no_delay(self):
+        self.delay = 0
+        self.coalescer().add("t1", [1], [1])
+        self.assertEqual([("t1", {1}, {1})], self.sent)
+
+    def test_flush_all_on_exit(self):
+        coalescer = self.coalescer()
+        coalescer.add("t1", [1])
+        flush_all()
+        self.assertEqual([("t1", {1}, set())], self.sent)
+        self.assertEqual({}, coalescer.pending)
@@ -0,0 +1,146 @@
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from graphql_jwt.utils import jwt_encode
+
+from common import consumers
+from common.consumers import TenantConsumers, invalidate_tenant_cache
+from common.middleware import JWTPayloadMiddleware
+from tenants.models import Client
+
+
+class TenantCacheTests(SimpleTestCase):
+    def setUp(self):
+        invalidate_tenant_cache()
+        self.tenant = Client(schema_name="tenant1", name="tenant1")
+        patcher = patch.object(consumers, "_query_tenant")
+        self.query_tenant = patcher.start()
+        self.query_tenant.side_effect = lambda host: (
+            self.tenant if host == "tenant1.test" else None
+        )
+        self.addCleanup(patcher.stop)
+        self.addCleanup(invalidate_tenant_cache)
+
+    def get_tenant_model(self, host_name, count=1):
+        async def connect_all():
+            return await asyncio.gather(
+                *(TenantConsumers().get_tenant_model(host_name) for _ in range(count))
+            )
+
+        return async_to_sync(connect_all)()
+
+    def test_concurrent_connects_share_one_query(self):
+        tenants = self.get_tenant_model("tenant1.test", count=50)
+        self.assertTrue(all(tenant is self.tenant for tenant in tenants))
+        self.assertEqual(1, self.query_tenant.call_count)
+
+        self.get_tenant_model("tenant1.test")
+        self.assertEqual(1, self.query_tenant.call_count)
+
+    def test_unknown_domain_is_cached(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.get_tenant_model("unknown.test")
+        self.assertEqual(1, self.query_tenant.call_count)
+
+    def test_invalidate(self):
+        self.get_tenant_model("tenant1.test")
+        invalidate_tenant_cache()
+        self.get_tenant_model("tenant1.test")
+        self.assertEqual(2, self.query_tenant.call_count)
+
+    @override_settings(TENANT_CACHE_TTL=0)
+    def test_expired(self):
+        self.get_tenant_model("tenant1.test")
+        self.get_tenant_model("tenant1.test")
+        self.assertEqual(2, self.query_tenant.call_count)
+
+
+class JWTPayloadMiddlewareTests(SimpleTestCase):
+    def run_middleware(self, cookie):
+        scopes = []
+
+        async def inner(scope, receive, send):
+            scopes.append(scope)
+
+        middleware = JWTPayloadMiddleware(inner)
+        scope = {"type": "websocket", "headers": [(b"cookie", cookie.encode())]}
+        async_to_sync(middleware)(scope, None, None)
+        return scopes[0]["jwt_payload"]
+
+    def test_valid_token(self):
+        token = jwt_encode({"username": "somchai", "authority_id": 1, "exp": 2**40})
+        payload = self.run_middleware(f"JWT={token}")
+        self.assertEqual("somchai", payload["username"])
+        self.assertEqual(1, payload["authority_id"])
+
+    def test_invalid_token(self):
+        payload = self.run_middleware("JWT=not-a-token")
+        self.assertIsNone(payload["username"])
+
+    def test_missing_token(self):
+        payload = self.run_middleware("csrftoken=abc")
+        self.assertIsNone(payload["username"])
+
+
+@override_settings(WEBSOCKET_SEND_QUEUE_SIZE=2)
+class SendQueueTests(SimpleTestCase):
+    def run_consumer(self, scenario):
+        """`scenario` runs while the client does not read the first event."""
+
+        async def run():
+            consumer = TenantConsumers()
+            sent = []
+            release = asyncio.Event()
+
+            async def base_send(message):
+                sent.append(message)
+                if message["type"] == "websocket.send":
+                    await release.wait()
+
+            consumer.base_send = base_send
+            await consumer.accept()
+            await consumer.send_event("e1")
+            await asyncio.sleep(0)
+            await scenario(consumer)
+            release.set()
+            await asyncio.sleep(0.01)
+            consumer.stop_writer()
+            return [message.get("text", message.get("code")) for message in sent[1:]]
+
+        return async_to_sync(run)()
+
+    async def send_events(self, consumer, count):
+        for i in range(count):
+            await consumer.send_event(f"e{i + 2}")
+
+    @override_settings(WEBSOCKET_SEND_QUEUE_OVERFLOW=consumers.DROP_OLDEST)
+    def test_drop_oldest(self):
+        dropped = consumers.send_queue_stats.dropped
+
+        async def scenario(consumer):
+            await self.send_events(consumer, 3)
+            self.assertEqual(["e3", "e4"], list(consumer.send_queue))
+
+        self.assertEqual(["e1", "e3", "e4"], self.run_consumer(scenario))
+        self.assertEqual(dropped + 1, consumers.send_queue_stats.dropped)
+
+    @override_settings(WEBSOCKET_SEND_QUEUE_OVERFLOW=consumers.RESYNC)
+    def test_resync(self):
+        async def scenario(consumer):
+            await self.send_events(consumer, 4)
+
+        self.assertEqual(
+            ["e1", TenantConsumers.resync_message, "e5"], self.run_consumer(scenario)
+        )
+
+    @override_settings(WEBSOCKET_SEND_QUEUE_OVERFLOW=consumers.DISCONNECT)
+    def test_disconnect(self):
+        async def scenario(consumer):
+            await self.send_events(consumer, 4)
+
+        self.assertEqual(
+            ["e1", consumers.OVERFLOW_CLOSE_CODE], self.run_consumer(scenario)
+        )
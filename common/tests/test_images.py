@@ -0,0 +1,57 @@
+import io
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image as PILImage
+
+from common.images import normalize_image
+
+
+def make_image(size, image_format="JPEG", mode="RGB", exif=None):
+    buffer = io.BytesIO()
+    img = PILImage.new(mode, size)
+    if exif is not None:
+        img.save(buffer, image_format, exif=exif.tobytes())
+    else:
+        img.save(buffer, image_format)
+    return ContentFile(buffer.getvalue(), name=f"photo.{image_format.lower()}")
+
+
+@override_settings(
+    IMAGE_NORMALIZE_MAX_DIMENSION=400,
+    IMAGE_NORMALIZE_FORMAT="JPEG",
+    IMAGE_NORMALIZE_QUALITY=80,
+)
+class TestNormalizeImage(SimpleTestCase):
+    def test_large_image_is_downscaled(self):
+        normalized = normalize_image(make_image((1600, 1200)))
+        self.assertEqual("photo.jpg", normalized.name)
+        self.assertEqual((400, 300), PILImage.open(normalized).size)
+
+    def test_small_image_is_kept(self):
+        self.assertIsNone(normalize_image(make_image((400, 300))))
+
+    def test_not_an_image(self):
+        file = ContentFile(b"not an image", name="note.txt")
+        self.assertIsNone(normalize_image(file))
+        self.assertEqual(0, file.tell())
+
+    def test_exif_orientation_is_applied(self):
+        exif = PILImage.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees
+        normalized = normalize_image(make_image((1600, 800), exif=exif))
+        self.assertEqual((200, 400), PILImage.open(normalized).size)
+
+    def test_transparent_png_to_webp(self):
+        file = make_image((800, 800), image_format="PNG", mode="RGBA")
+        normalized = normalize_image(file, image_format="WEBP")
+        self.assertEqual("photo.webp", normalized.name)
+        img = PILImage.open(normalized)
+        self.assertEqual("WEBP", img.format)
+        self.assertEqual("RGBA", img.mode)
+
+    def test_transparent_png_to_jpeg(self):
+        file = make_image((800, 800), image_format="PNG", mode="RGBA")
+        img = PILImage.open(normalize_image(file))
+        self.assertEqual("RGB", img.mode)
+        self.assertEqual((255, 255, 255), img.getpixel((0, 0)))
@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from graphql_jwt.utils import jwt_encode
+
+import common.routing
+from common import consumers
+from common.consumers import MultiplexConsumer, invalidate_tenant_cache
+from common.metrics import render_prometheus, websocket_metrics
+from common.middleware import JWTPayloadMiddleware
+from common.utils import group_send_many
+from common.views import websocket_metrics as websocket_metrics_view
+from tenants.models import Client
+
+application = JWTPayloadMiddleware(URLRouter(common.routing.websocket_urlpatterns))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class WebsocketMetricsTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+            patch.object(
+                consumers, "_query_tenant", return_value=Client(schema_name="t1")
+            ),
+            patch.object(
+                MultiplexConsumer,
+                "get_user",
+                return_value=SimpleNamespace(username="somchai"),
+            ),
+            patch("common.consumers.connection"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(invalidate_tenant_cache)
+
+    def connect(self, headers):
+        async def run():
+            communicator = WebsocketCommunicator(
+                application, "/ws/events/", headers=headers
+            )
+            connected, _ = await communicator.connect()
+            open_connections = dict(websocket_metrics.connections)
+            await communicator.disconnect()
+            return connected, open_connections
+
+        return async_to_sync(run)()
+
+    def test_connections(self):
+        key = ("t1", "MultiplexConsumer")
+        connects = websocket_metrics.connects[key]
+        token = jwt_encode({"username": "somchai", "authority_id": 1, "exp": 2**40})
+
+        connected, open_connections = self.connect(
+            [(b"host", b"t1.test"), (b"cookie", f"JWT={token}".encode())]
+        )
+        self.assertTrue(connected)
+        self.assertEqual(1, open_connections[key])
+        self.assertEqual(0, websocket_metrics.connections[key])
+        self.assertEqual(connects + 1, websocket_metrics.connects[key])
+
+    def test_denies(self):
+        key = ("MultiplexConsumer", "invalid token")
+        denies = websocket_metrics.denies[key]
+        connected, _ = self.connect([(b"host", b"t1.test")])
+        self.assertFalse(connected)
+        self.assertEqual(denies + 1, websocket_metrics.denies[key])
+        self.assertIn(
+            'podd_websocket_denies_total{route="MultiplexConsumer",'
+            f'reason="invalid token"}} {denies + 1}',
+            render_prometheus(),
+        )
+
+    def test_broadcasts(self):
+        channel_layer = AsyncMock()
+        channel_layer.group_send.side_effect = [None, OSError("redis is down")]
+        broadcasts = websocket_metrics.broadcasts["test.event"]
+        errors = websocket_metrics.channel_layer_errors["group_send"]
+
+        with self.assertLogs("common.metrics.broadcasts") as logs:
+            with self.assertRaises(OSError):
+                async_to_sync(group_send_many)(
+                    channel_layer, ["g1", "g2"], {"type": "test.event"}
+                )
+        [record] = logs.records
+        self.assertEqual(("test.event", 2), (record.event, record.groups))
+        self.assertEqual(broadcasts + 1, websocket_metrics.broadcasts["test.event"])
+        self.assertEqual(2, websocket_metrics.broadcast_groups["test.event"])
+        self.assertEqual(
+            errors + 1, websocket_metrics.channel_layer_errors["group_send"]
+        )
+        self.assertIn(
+            'podd_broadcast_seconds_count{event="test.event"}', render_prometheus()
+        )
+
+    def test_view(self):
+        factory = RequestFactory()
+        with override_settings(METRICS_TOKEN=""):
+            with self.assertRaises(Http404):
+                websocket_metrics_view(factory.get("/"))
+        with override_settings(METRICS_TOKEN="secret"):
+            response = websocket_metrics_view(
+                factory.get("/", HTTP_AUTHORIZATION="Bearer wrong")
+            )
+            self.assertEqual(401, response.status_code)
+            response = websocket_metrics_view(
+                factory.get("/", HTTP_AUTHORIZATION="Bearer secret")
+            )
+            self.assertEqual(200, response.status_code)
+            self.assertIn(b"podd_websocket_connections", response.content)
@@ -0,0 +1,251 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+from graphql_jwt.utils import jwt_encode
+
+import common.routing
+import reports.consumers  # noqa: F401 registers the "reports" stream
+import threads.consumers  # noqa: F401 registers the "comments" stream
+from common import consumers
+from common.consumers import MultiplexConsumer, invalidate_tenant_cache
+from common.middleware import JWTPayloadMiddleware
+from tenants.models import Client
+
+application = JWTPayloadMiddleware(URLRouter(common.routing.websocket_urlpatterns))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    WEBSOCKET_MAX_SUBSCRIPTIONS=2,
+)
+class MultiplexConsumerTests(SimpleTestCase):
+    def setUp(self):
+        self.user = SimpleNamespace(username="somchai", is_authority_user=False)
+        for patcher in (
+            patch.object(
+                consumers, "_query_tenant", return_value=Client(schema_name="t1")
+            ),
+            patch.object(
+                MultiplexConsumer, "get_user", side_effect=lambda _: self.user
+            ),
+            patch("common.consumers.connection"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(invalidate_tenant_cache)
+        token = jwt_encode({"username": "somchai", "authority_id": 1, "exp": 2**40})
+        self.headers = [(b"host", b"t1.test"), (b"cookie", f"JWT={token}".encode())]
+
+    def run_client(self, scenario, headers=None):
+        async def run():
+            communicator = WebsocketCommunicator(
+                application, "/ws/events/", headers=headers or self.headers
+            )
+            connected, _ = await communicator.connect()
+            if connected:
+                await scenario(communicator)
+                await communicator.disconnect()
+            return connected
+
+        return async_to_sync(run)()
+
+    def test_subscribe_and_receive_events(self):
+        async def scenario(communicator):
+            for stream, stream_id in (("reports", 1), ("comments", 7)):
+                await communicator.send_json_to(
+                    {"action": "subscribe", "stream": stream, "id": stream_id}
+                )
+                response = await communicator.receive_json_from()
+                self.assertEqual("subscribed", response["action"])
+
+            layer = get_channel_layer()
+            report = {
+                "type": "new.report",
+                "report_id": "r1",
+                "authority_ids": [1, 3],
+                "text": '{"a": 1}',
+            }
+            await layer.group_send("rp_t1_1", report)
+            await layer.group_send("rp_t1_1", report)
+            await layer.group_send(
+                "cm_t1_7", {"type": "update.comment", "text": '{"thread_id": 7}'}
+            )
+            self.assertEqual(
+                {"stream": "reports", "data": {"a": 1}},
+                await communicator.receive_json_from(),
+            )
+            self.assertEqual(
+                {"stream": "comments", "data": {"thread_id": 7}},
+                await communicator.receive_json_from(),
+            )
+
+            await communicator.send_json_to(
+                {"action": "unsubscribe", "stream": "comments", "id": 7}
+            )
+            response = await communicator.receive_json_from()
+            self.assertEqual("unsubscribed", response["action"])
+            await layer.group_send(
+                "cm_t1_7", {"type": "update.comment", "text": '{"thread_id": 7}'}
+            )
+            self.assertTrue(await communicator.receive_nothing())
+
+        self.assertTrue(self.run_client(scenario))
+
+    def test_subscription_limit(self):
+        async def scenario(communicator):
+            for thread_id in range(3):
+                await communicator.send_json_to(
+                    {"action": "subscribe", "stream": "comments", "id": thread_id}
+                )
+                response = await communicator.receive_json_from()
+            self.assertEqual("too many subscriptions", response["error"])
+
+        self.run_client(scenario)
+
+    def test_invalid_request(self):
+        async def scenario(communicator):
+            for request in (
+                {"action": "subscribe", "stream": "unknown", "id": 1},
+                {"action": "subscribe", "stream": "reports", "id": "a b"},
+                "not json",
+            ):
+                await communicator.send_to(text_data=json.dumps(request))
+                response = await communicator.receive_json_from()
+                self.assertEqual("invalid request", response["error"])
+
+        self.run_client(scenario)
+
+    def test_deny_without_token(self):
+        self.assertFalse(self.run_client(None, headers=[(b"host", b"t1.test")]))
+
+    def test_replay_missed_events(self):
+        replay = patch.object(
+            consumers.streams["reports"],
+            "replay",
+            side_effect=lambda stream_id, last_event_id: (
+                [("r1", '{"a": 1}')] if last_event_id == 10 else None
+            ),
+        )
+
+        async def scenario(communicator):
+            layer = get_channel_layer()
+            request = {"action": "subscribe", "stream": "reports", "id": 1}
+            await communicator.send_json_to(dict(request, last_event_id=10))
+            response = await communicator.receive_json_from()
+            self.assertEqual("subscribed", response["action"])
+            self.assertEqual(
+                {"stream": "reports", "data": {"a": 1}},
+                await communicator.receive_json_from(),
+            )
+            # already replayed
+            await layer.group_send(
+                "rp_t1_1",
+                {
+                    "type": "new.report",
+                    "report_id": "r1",
+                    "authority_ids": [1],
+                    "text": "{}",
+                },
+            )
+            self.assertTrue(await communicator.receive_nothing())
+
+            await communicator.send_json_to(dict(request, id=2, last_event_id=1))
+            await communicator.receive_json_from()
+            self.assertEqual(
+                {"action": "resync", "stream": "reports", "id": "2"},
+                await communicator.receive_json_from(),
+            )
+
+        with replay:
+            self.assertTrue(self.run_client(scenario))
+
+    def test_deny_authority_stream_outside_the_user_authority(self):
+        # a user of authority 3, which has no child authority
+        self.user = SimpleNamespace(
+            username="somchai",
+            is_authority_user=True,
+            authorityuser=SimpleNamespace(
+                authority=SimpleNamespace(
+                    all_inherits_down=lambda: [SimpleNamespace(id=3)]
+                )
+            ),
+        )
+        replay = patch.object(consumers.streams["reports"], "replay", return_value=[])
+
+        async def scenario(communicator):
+            for stream_id in (1, "x"):
+                await communicator.send_json_to(
+                    {
+                        "action": "subscribe",
+                        "stream": "reports",
+                        "id": stream_id,
+                        "last_event_id": 0,
+                    }
+                )
+                response = await communicator.receive_json_from()
+                self.assertEqual("permission denied", response["error"])
+            await get_channel_layer().group_send(
+                "rp_t1_1",
+                {
+                    "type": "new.report",
+                    "report_id": "r1",
+                    "authority_ids": [1],
+                    "text": "{}",
+                },
+            )
+            self.assertTrue(await communicator.receive_nothing())
+
+            await communicator.send_json_to(
+                {"action": "subscribe", "stream": "reports", "id": 3}
+            )
+            response = await communicator.receive_json_from()
+            self.assertEqual("subscribed", response["action"])
+
+        with replay as mock_replay:
+            self.assertTrue(self.run_client(scenario))
+        mock_replay.assert_not_called()
+
+    @override_settings(REPORT_BROADCAST_MODE="tenant")
+    def test_tenant_broadcast(self):
+        def report(report_id, authority_ids):
+            return {
+                "type": "new.report",
+                "report_id": report_id,
+                "authority_ids": authority_ids,
+                "text": json.dumps({"id": report_id}),
+            }
+
+        async def scenario(communicator):
+            layer = get_channel_layer()
+            for authority_id in (1, 2):
+                await communicator.send_json_to(
+                    {"action": "subscribe", "stream": "reports", "id": authority_id}
+                )
+                await communicator.receive_json_from()
+
+            await layer.group_send("rp_t1", report("r1", [2, 5]))
+            await layer.group_send("rp_t1", report("r2", [7]))
+            self.assertEqual(
+                {"stream": "reports", "data": {"id": "r1"}},
+                await communicator.receive_json_from(),
+            )
+            self.assertTrue(await communicator.receive_nothing())
+
+            # the tenant group is kept for the other subscription
+            await communicator.send_json_to(
+                {"action": "unsubscribe", "stream": "reports", "id": 1}
+            )
+            await communicator.receive_json_from()
+            await layer.group_send("rp_t1", report("r3", [2]))
+            self.assertEqual(
+                {"stream": "reports", "data": {"id": "r3"}},
+                await communicator.receive_json_from(),
+            )
+
+        self.assertTrue(self.run_client(scenario))
@@ -0,0 +1,208 @@
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+from graphql_jwt.utils import jwt_encode
+
+import common.routing
+import threads.consumers  # noqa: F401 registers the commentAdded subscription
+from accounts.models import User
+from common import consumers, subscriptions
+from common.consumers import invalidate_tenant_cache
+from common.middleware import JWTPayloadMiddleware
+from common.subscriptions import GraphQLSubscriptionConsumer, subscription_fields
+from tenants.models import Client
+from threads.models import Comment
+
+application = JWTPayloadMiddleware(URLRouter(common.routing.websocket_urlpatterns))
+
+COMMENT_ADDED = """
+subscription onComment($threadId: ID!) {
+  commentAdded(threadId: $threadId) { id body }
+}
+"""
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    ALLOWED_HOSTS=["t1.test"],
+)
+class GraphQLSubscriptionTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+            patch.object(
+                consumers, "_query_tenant", return_value=Client(schema_name="t1")
+            ),
+            patch.object(
+                GraphQLSubscriptionConsumer,
+                "get_user",
+                return_value=User(id=1, username="somchai"),
+            ),
+            patch.object(
+                subscription_fields["commentAdded"],
+                "load",
+                return_value=[Comment(id=5, body="hello", thread_id=7)],
+            ),
+            patch.object(
+                subscription_fields["commentAdded"], "authorize", return_value=True
+            ),
+            patch("common.consumers.connection"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.load = subscription_fields["commentAdded"].load
+        self.authorize = subscription_fields["commentAdded"].authorize
+        self.addCleanup(invalidate_tenant_cache)
+        # shared results are bound to the event loop of the test
+        self.addCleanup(subscriptions._roots.clear)
+        self.addCleanup(subscriptions._results.clear)
+        token = jwt_encode({"username": "somchai", "authority_id": 1, "exp": 2**40})
+        self.headers = [(b"host", b"t1.test"), (b"cookie", f"JWT={token}".encode())]
+
+    def communicator(self):
+        return WebsocketCommunicator(
+            application,
+            "/ws/graphql/",
+            headers=self.headers,
+            subprotocols=["graphql-transport-ws"],
+        )
+
+    async def start(self, communicator, thread_id=7):
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual("graphql-transport-ws", subprotocol)
+        await communicator.send_json_to({"type": "connection_init"})
+        self.assertEqual(
+            {"type": "connection_ack"}, await communicator.receive_json_from()
+        )
+        variables = {"threadId": thread_id}
+        await communicator.send_json_to(
+            {
+                "id": "1",
+                "type": "subscribe",
+                "payload": {"query": COMMENT_ADDED, "variables": variables},
+            }
+        )
+        # the subscription is prepared in a database thread
+        await communicator.receive_nothing()
+
+    @staticmethod
+    async def comment_event(thread_id, event_id="e1"):
+        await get_channel_layer().group_send(
+            f"cm_t1_{thread_id}",
+            {
+                "type": "update.comment",
+                "event_id": event_id,
+                "thread_id": thread_id,
+                "comment_ids": [5],
+                "created_ids": [5],
+                "text": "{}",
+            },
+        )
+
+    def test_event_is_resolved_once_for_every_subscriber(self):
+        async def run():
+            first, second, other = (self.communicator() for _ in range(3))
+            await self.start(first)
+            await self.start(second)
+            await self.start(other, thread_id=8)
+            await self.comment_event(7)
+
+            for communicator in (first, second):
+                self.assertEqual(
+                    {
+                        "id": "1",
+                        "type": "next",
+                        "payload": {
+                            "data": {"commentAdded": {"id": "5", "body": "hello"}}
+                        },
+                    },
+                    await communicator.receive_json_from(),
+                )
+            self.assertTrue(await other.receive_nothing())
+            for communicator in (first, second, other):
+                await communicator.disconnect()
+
+        async_to_sync(run)()
+        self.load.assert_called_once()
+
+    def test_results_are_not_shared_between_users(self):
+        users = [User(id=1, username="somchai"), User(id=2, username="somsri")]
+
+        async def run():
+            first, second = self.communicator(), self.communicator()
+            await self.start(first)
+            await self.start(second)
+            await self.comment_event(7)
+            for communicator in (first, second):
+                response = await communicator.receive_json_from()
+                self.assertEqual("next", response["type"])
+                await communicator.disconnect()
+
+        execute = patch.object(subscriptions, "execute", wraps=subscriptions.execute)
+        with patch.object(
+            GraphQLSubscriptionConsumer, "get_user", side_effect=users
+        ), execute as execute:
+            async_to_sync(run)()
+        self.assertEqual(2, execute.call_count)
+        self.load.assert_called_once()
+
+    def test_permission_denied(self):
+        self.authorize.return_value = False
+
+        async def run():
+            communicator = self.communicator()
+            await self.start(communicator)
+            response = await communicator.receive_json_from()
+            self.assertEqual("error", response["type"])
+            await self.comment_event(7)
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+        self.assertEqual("7", self.authorize.call_args.args[1])
+        self.load.assert_not_called()
+
+    def test_complete(self):
+        async def run():
+            communicator = self.communicator()
+            await self.start(communicator)
+            await communicator.send_json_to({"id": "1", "type": "complete"})
+            await self.comment_event(7, event_id="e2")
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_invalid_subscription(self):
+        async def run():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.send_json_to({"type": "connection_init"})
+            await communicator.receive_json_from()
+            for query in ("{ healthCheck }", "subscription { unknown }"):
+                await communicator.send_json_to(
+                    {"id": "1", "type": "subscribe", "payload": {"query": query}}
+                )
+                response = await communicator.receive_json_from()
+                self.assertEqual("error", response["type"])
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_subscribe_before_init(self):
+        async def run():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.send_json_to(
+                {"id": "1", "type": "subscribe", "payload": {"query": COMMENT_ADDED}}
+            )
+            self.assertEqual(
+                {"type": "websocket.close", "code": 4401},
+                await communicator.receive_output(),
+            )
+
+        async_to_sync(run)()
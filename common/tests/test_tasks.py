@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from tenant_schemas_celery.app import get_schema_name_from_task
+
+from common.tasks import run_for_each_tenant
+from podd_api.celery import app
+
+
+class RunForEachTenantTests(SimpleTestCase):
+    def test_task_is_sent_in_every_tenant_schema(self):
+        with patch("tenants.models.Client.objects") as clients, patch.object(
+            app.amqp, "send_task_message"
+        ) as send_task_message:
+            clients.exclude.return_value.values_list.return_value = ["t1", "t2"]
+            run_for_each_tenant("reports.tasks.trim_report_events", batch_size=10)
+
+        self.assertEqual(2, send_task_message.call_count)
+        for call, schema_name in zip(send_task_message.call_args_list, ["t1", "t2"]):
+            message = call.args[2]
+            self.assertEqual({"batch_size": 10}, message.body[1])
+            # the headers of the sent message, as the worker reads them to
+            # switch to the tenant schema
+            headers = {**message.headers, **call.kwargs["headers"]}
+            task = SimpleNamespace(
+                request=SimpleNamespace(headers=headers, get=lambda key: None)
+            )
+            self.assertEqual(schema_name, get_schema_name_from_task(task, {}))
@@ -0,0 +1,27 @@
+import io
+import zipfile
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+from django.test import SimpleTestCase
+
+from common.zipstream import read_chunks, stream_zip
+
+
+class StreamZipTests(SimpleTestCase):
+    def test_unreadable_entries_are_skipped(self):
+        missing = MagicMock()
+        missing.open.side_effect = ClientError(
+            {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+        )
+        written = set()
+        data = b"".join(
+            stream_zip(
+                [("a.txt", [b"hello"]), ("b.txt", read_chunks(missing))], written
+            )
+        )
+
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        self.assertEqual(["a.txt"], archive.namelist())
+        self.assertEqual(b"hello", archive.read("a.txt"))
+        self.assertEqual({"a.txt"}, written)
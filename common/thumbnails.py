@@ -0,0 +1,95 @@
+"""
+Thumbnails are built by a celery task instead of the request thread. Until the
+task has run, `<ready_field>` is False and the url is None. The flag is in the
+graphql types and upload payloads (thumbnailReady, avatarThumbnailReady), so
+clients can tell a pending thumbnail, for which they show a placeholder, from a
+missing one.
+
+The task stores the generated thumbnail names in `<names_field>` ({alias: name}),
+so resolving a thumbnail url is a local call to the thumbnail storage, without
+easy-thumbnails checking the storage or its cache tables on every row. Resolvers
+never render nor write: rows stored before the names were kept are pending
+until `manage.py generate_missing_thumbnails` has queued their task.
+"""
+
+from dataclasses import dataclass
+from typing import Dict
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
+
+from common.tasks import generate_thumbnails
+
+
+@dataclass
+class ThumbnailField:
+    field_name: str
+    ready_field: str
+    names_field: str
+
+
+thumbnail_fields: Dict[type, ThumbnailField] = {}
+
+
+def get_thumbnail_field(model) -> ThumbnailField:
+    for cls in model.__mro__:
+        if cls in thumbnail_fields:
+            return thumbnail_fields[cls]
+    raise KeyError(f"{model.__name__} has no registered thumbnail field")
+
+
+def build_thumbnails(field_file) -> Dict[str, str]:
+    """generate (or find) every alias of `field_file`, returns {alias: name}"""
+    thumbnailer = get_thumbnailer(field_file)
+    return {
+        alias: thumbnailer[alias].name
+        for alias in aliases.all(thumbnailer.alias_target)
+    }
+
+
+def schedule_thumbnails(instance):
+    """generate thumbnails of `instance` in background, after commit."""
+    spec = get_thumbnail_field(type(instance))
+    model_label = instance._meta.label
+    pk = str(instance.pk)
+    transaction.on_commit(
+        lambda: generate_thumbnails.delay(
+            model_label, pk, spec.field_name, spec.ready_field, spec.names_field
+        )
+    )
+
+
+def register_thumbnail_field(
+    model,
+    field_name="file",
+    ready_field="thumbnail_ready",
+    names_field="thumbnails",
+):
+    """schedule thumbnail generation each time a file that is not ready is saved."""
+    thumbnail_fields[model] = ThumbnailField(field_name, ready_field, names_field)
+
+    def on_saved(sender, instance, update_fields=None, **kwargs):
+        if update_fields is not None and field_name not in update_fields:
+            return
+        if getattr(instance, field_name) and not getattr(instance, ready_field):
+            schedule_thumbnails(instance)
+
+    post_save.connect(
+        on_saved,
+        sender=model,
+        weak=False,
+        dispatch_uid=f"thumbnails_{model._meta.label}_{field_name}",
+    )
+
+
+def thumbnail_url(instance, alias="thumbnail"):
+    spec = get_thumbnail_field(type(instance))
+    field_file = getattr(instance, spec.field_name)
+    if not field_file:
+        return None
+    if not getattr(instance, spec.ready_field):
+        return None
+    name = getattr(instance, spec.names_field).get(alias)
+    return field_file.thumbnail_storage.url(name) if name else None
@@ -1,4 +1,5 @@
 import graphene
+from graphene.types.generic import GenericScalar
 
 
 class AdminFieldValidationProblem(graphene.ObjectType):
@@ -11,3 +12,11 @@ class AdminValidationProblem(graphene.ObjectType):
         graphene.NonNull(AdminFieldValidationProblem), required=False
     )
     message = graphene.String(required=False)
+
+
+class DirectUploadType(graphene.ObjectType):
+    """post `fields` and the file (as "file") to `url`, then confirm `token`."""
+
+    url = graphene.String(required=True)
+    fields = GenericScalar(required=True)
+    token = graphene.String(required=True)
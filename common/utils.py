@@ -1,8 +1,14 @@
+import asyncio
+import time
+from functools import wraps
 from typing import Union
+from django.contrib.auth import authenticate
 from django.db import models
-from django.http import parse_cookie
+from django.http import JsonResponse, parse_cookie
 from graphql_jwt.utils import jwt_decode
+from jwt import InvalidTokenError
 
+from common.metrics import broadcast_logger, websocket_metrics
 from common.types import AdminFieldValidationProblem
 
 
@@ -46,17 +52,69 @@ def camel(snake_str):
     return "".join([first.lower(), *map(str.title, others)])
 
 
-def extract_jwt_payload_from_asgi_scope(scope):
+def decode_jwt_payload_from_asgi_scope(scope):
     username = None
     authority_id = None
     for name, value in scope.get("headers", []):
         if name == b"cookie":
             cookies = parse_cookie(value.decode("latin1"))
-            token = cookies["JWT"]
-            payload = jwt_decode(token)
-            username = payload["username"]
-            authority_id = payload["authority_id"]
+            token = cookies.get("JWT")
+            if not token:
+                continue
+            try:
+                payload = jwt_decode(token)
+            except InvalidTokenError:
+                continue
+            username = payload.get("username")
+            authority_id = payload.get("authority_id")
     return {
         "username": username,
         "authority_id": authority_id,
     }
+
+
+def extract_jwt_payload_from_asgi_scope(scope):
+    """the payload decoded by `JWTPayloadMiddleware`, or decoded now without it."""
+    if "jwt_payload" in scope:
+        return scope["jwt_payload"]
+    return decode_jwt_payload_from_asgi_scope(scope)
+
+
+def jwt_login_required(view):
+    """authenticate a plain django view with the graphql JWT (header or cookie)."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user = authenticate(request=request)
+        if user is None:
+            return JsonResponse({"error": "authentication required"}, status=401)
+        request.user = user
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def group_send_many(channel_layer, group_names, message):
+    """send `message` to every group concurrently, recorded in the metrics."""
+    group_names = list(group_names)
+    event = message["type"]
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(channel_layer.group_send(name, message) for name in group_names),
+        return_exceptions=True,
+    )
+    seconds = time.perf_counter() - start
+    websocket_metrics.broadcasts[event] += 1
+    websocket_metrics.broadcast_groups[event] += len(group_names)
+    websocket_metrics.broadcast_seconds[event].observe(seconds)
+    broadcast_logger.info(
+        "broadcast %s to %d groups in %.3fs",
+        event,
+        len(group_names),
+        seconds,
+        extra={"event": event, "groups": len(group_names), "seconds": seconds},
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        websocket_metrics.channel_layer_errors["group_send"] += len(errors)
+        raise errors[0]
@@ -0,0 +1,195 @@
+"""
+On demand size variants of uploaded images.
+
+`variant_url(instance, size)` returns a signed, never expiring url for any
+size of IMAGE_VARIANT_SIZES, served to logged in users only. The variant is built the first time it is
+requested, then served from a local disk cache (IMAGE_VARIANT_CACHE_DIR). The
+cache is keyed by the storage name of the original, so deduplicated images
+share their variants, and it is trimmed to IMAGE_VARIANT_CACHE_MAX_SIZE by
+evicting the least recently served files (the mtime is touched on every hit).
+Eviction walks the whole cache, so it only runs when the size estimated by
+`variant_cache_usage` goes over the limit, or every EVICTION_SCAN_INTERVAL to
+account for the variants written by other processes.
+"""
+
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.urls import reverse
+
+from common.images import FORMAT_EXTENSIONS, normalize_image
+
+
+SIGNATURE_SALT = "common.variants"
+EVICTION_SCAN_INTERVAL = 10 * 60
+
+
+@dataclass
+class VariantModel:
+    model: type
+    field_name: str
+
+
+variant_models: Dict[str, VariantModel] = {}
+
+
+def register_variant_model(model, kind: str, field_name="file"):
+    variant_models[kind] = VariantModel(model, field_name)
+
+
+def get_variant_kind(model) -> str:
+    for kind, spec in variant_models.items():
+        if issubclass(model, spec.model):
+            return kind
+    raise KeyError(f"{model.__name__} has no registered variant kind")
+
+
+def _signed_value(kind, pk, size):
+    return f"{connection.schema_name}:{kind}:{pk}:{size}"
+
+
+def sign_variant(kind, pk, size) -> str:
+    return signing.Signer(salt=SIGNATURE_SALT).signature(_signed_value(kind, pk, size))
+
+
+def verify_variant(kind, pk, size, signature) -> bool:
+    try:
+        signing.Signer(salt=SIGNATURE_SALT).unsign(
+            f"{_signed_value(kind, pk, size)}:{signature}"
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def variant_url(instance, size: int) -> Optional[str]:
+    if size not in settings.IMAGE_VARIANT_SIZES:
+        return None
+    kind = get_variant_kind(type(instance))
+    if not getattr(instance, variant_models[kind].field_name):
+        return None
+    signature = sign_variant(kind, instance.pk, size)
+    return reverse("image_variant", args=[kind, str(instance.pk), size, signature])
+
+
+def get_variant_source(kind, pk):
+    """returns the original file of a variant, None when there is none."""
+    spec = variant_models[kind]
+    instance = spec.model.objects.filter(pk=pk).first()
+    field_file = getattr(instance, spec.field_name) if instance else None
+    return field_file or None
+
+
+class VariantCacheUsage:
+    """per process estimate of the variant cache size: last scan + own writes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache_dir = None
+        self.size = 0
+        self.scanned_at = None
+
+    def add(self, written: int):
+        with self.lock:
+            cache_dir = str(settings.IMAGE_VARIANT_CACHE_DIR)
+            if cache_dir != self.cache_dir:
+                self.cache_dir, self.scanned_at = cache_dir, None
+            self.size += written
+            due = (
+                self.scanned_at is None
+                or self.size > settings.IMAGE_VARIANT_CACHE_MAX_SIZE
+                or time.monotonic() - self.scanned_at > EVICTION_SCAN_INTERVAL
+            )
+            if due:
+                self.size = evict_variants()
+                self.scanned_at = time.monotonic()
+
+
+variant_cache_usage = VariantCacheUsage()
+
+
+def get_variant(field_file, size, webp=False) -> Optional[Path]:
+    """
+    returns the cached variant file, building it when needed. None means the
+    original is not larger than `size` and should be served as is.
+    """
+    image_format = "WEBP" if webp else "JPEG"
+    key = hashlib.sha1(f"{connection.schema_name}:{field_file.name}".encode())
+    key = key.hexdigest()
+    path = (
+        Path(settings.IMAGE_VARIANT_CACHE_DIR)
+        / key[:2]
+        / f"{key}_{size}{FORMAT_EXTENSIONS[image_format]}"
+    )
+    # empty marker for originals that are already small enough
+    original_marker = path.with_name(f"{key}_{size}.original")
+    if path.exists():
+        os.utime(path)
+        return path
+    if original_marker.exists():
+        os.utime(original_marker)
+        return None
+
+    os.makedirs(path.parent, exist_ok=True)
+    with field_file.open("rb") as original:
+        variant = normalize_image(
+            original, max_dimension=size, image_format=image_format
+        )
+    if variant is None:
+        original_marker.touch()
+        return None
+
+    partial = path.with_name(f"{path.name}.{uuid.uuid4()}.part")
+    with open(partial, "wb") as f:
+        for chunk in variant.chunks():
+            f.write(chunk)
+    os.replace(partial, path)
+    variant_cache_usage.add(path.stat().st_size)
+    return path
+
+
+def content_type(path: Path) -> str:
+    return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+def evict_variants(max_size: Optional[int] = None) -> int:
+    """
+    remove the least recently served variants until the cache fits `max_size`.
+    Returns the size of the cache left.
+    """
+    max_size = max_size or settings.IMAGE_VARIANT_CACHE_MAX_SIZE
+    files = []
+    total = 0
+    for root, _, names in os.walk(settings.IMAGE_VARIANT_CACHE_DIR):
+        for name in names:
+            if name.endswith(".part"):
+                continue
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+            total += stat.st_size
+    if total <= max_size:
+        return total
+
+    files.sort()
+    for _, size, name in files:
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= max_size:
+            return total
+    return total
@@ -0,0 +1,95 @@
+import hmac
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+)
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from common.metrics import render_prometheus
+from common.storage import DIRECT_UPLOAD_SALT
+from common.utils import jwt_login_required
+from common.variants import (
+    content_type,
+    get_variant,
+    get_variant_source,
+    variant_models,
+    verify_variant,
+)
+
+# the bytes of a variant url never change, but only logged in users may see them
+VARIANT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+@csrf_exempt
+@require_POST
+def direct_upload(request, token):
+    """receives the files posted to a `SimpleFileMediaStorage.presigned_upload` url."""
+    # the signed token is the authorization, like a presigned S3 POST
+    try:
+        target = signing.loads(
+            token, salt=DIRECT_UPLOAD_SALT, max_age=settings.DIRECT_UPLOAD_EXPIRES
+        )
+    except signing.BadSignature:
+        return JsonResponse({"error": "invalid or expired upload url"}, status=403)
+
+    file = request.FILES.get("file")
+    if file is None:
+        return JsonResponse({"error": "file is required"}, status=400)
+    if file.size > target["max_size"]:
+        return JsonResponse({"error": "file too large"}, status=413)
+    if default_storage.exists(target["name"]):
+        return JsonResponse({"error": "already uploaded"}, status=409)
+    default_storage.save(target["name"], file)
+    return HttpResponse(status=204)
+
+
+@require_GET
+@jwt_login_required
+def image_variant(request, kind, pk, size, signature):
+    """
+    serves a size variant of an image, see `common.variants.variant_url`. The
+    original is served as is when it needs no variant.
+    """
+    if (
+        kind not in variant_models
+        or size not in settings.IMAGE_VARIANT_SIZES
+        or not verify_variant(kind, pk, size, signature)
+    ):
+        raise Http404()
+    field_file = get_variant_source(kind, pk)
+    if field_file is None:
+        raise Http404()
+
+    webp = "image/webp" in request.headers.get("Accept", "")
+    path = get_variant(field_file, size, webp=webp)
+    if path is None:
+        response = FileResponse(
+            field_file.open("rb"), content_type=content_type(Path(field_file.name))
+        )
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type(path))
+    response["Cache-Control"] = VARIANT_CACHE_CONTROL
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+@require_GET
+def websocket_metrics(request):
+    """websocket metrics of this process, for a Prometheus scrape with METRICS_TOKEN."""
+    if not settings.METRICS_TOKEN:
+        raise Http404()
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+        return HttpResponse(status=401)
+    return HttpResponse(
+        render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,76 @@
+"""
+Streaming ZIP archives.
+
+`ZipFile` writes to `_ZipStream`, a write only file object without `tell` or
+`seek`, so it falls back to data descriptors and never goes back in the
+output. What has been written is handed over to the response after each chunk,
+which keeps memory use at about one chunk whatever the archive size.
+"""
+
+import logging
+import zipfile
+from typing import Iterable, Iterator, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStream:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def read_chunks(field_file) -> Iterator[bytes]:
+    """chunks of a stored file, storage errors are raised as OSError."""
+    try:
+        with field_file.open("rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+    except ClientError as e:
+        raise OSError(f"{field_file.name} can not be read") from e
+
+
+def stream_zip(
+    entries: Iterable[Tuple[str, Iterable[bytes]]], written: Optional[Set[str]] = None
+) -> Iterator[bytes]:
+    """
+    yields a ZIP archive of `entries`, (name, chunks) pairs. An entry whose
+    content can not be read (e.g. a missing file) is skipped, the names of the
+    entries written are added to `written`.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, chunks in entries:
+            chunks = iter(chunks)
+            try:
+                first = next(chunks, b"")
+            except OSError:
+                logger.warning("skip %s in zip, it can not be read", name)
+                continue
+            with archive.open(name, "w", force_zip64=True) as entry:
+                entry.write(first)
+                for chunk in chunks:
+                    entry.write(chunk)
+                    if data := stream.drain():
+                        yield data
+            if written is not None:
+                written.add(name)
+            if data := stream.drain():
+                yield data
+    yield stream.drain()
@@ -20,6 +20,8 @@ django_asgi_app = get_asgi_application()
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 
+from common.middleware import JWTPayloadMiddleware
+import common.routing
 import reports.routing
 import threads.routing
 
@@ -28,9 +30,12 @@ application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
         "websocket": AuthMiddlewareStack(
-            URLRouter(
-                reports.routing.websocket_urlpatterns
-                + threads.routing.websocket_urlpatterns
+            JWTPayloadMiddleware(
+                URLRouter(
+                    reports.routing.websocket_urlpatterns
+                    + threads.routing.websocket_urlpatterns
+                    + common.routing.websocket_urlpatterns
+                )
             )
         ),
     }
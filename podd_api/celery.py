@@ -1,5 +1,6 @@
 import os
 
+from celery.signals import worker_process_shutdown
 from django.conf import settings
 from tenant_schemas_celery.app import CeleryApp as TenantAwareCeleryApp
 
@@ -10,4 +11,12 @@ app = TenantAwareCeleryApp("podd-api")
 
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
-app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+app.autodiscover_tasks(lambda: [*settings.INSTALLED_APPS, "common"])
+
+
+@worker_process_shutdown.connect
+def flush_broadcasts(**kwargs):
+    # pool processes exit without running atexit
+    from common.broadcast import flush_all
+
+    flush_all()
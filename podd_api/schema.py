@@ -4,8 +4,10 @@ from accounts.schema import Query as AccountsQuery
 from accounts.schema import Mutation as AccountsMutation
 from threads.schema import Query as ThreadQuery
 from threads.schema import Mutation as ThreadMutation
+from threads.schema import Subscription as ThreadSubscription
 from reports.schema import Query as ReportsQuery
 from reports.schema import Mutation as ReportsMutation
+from reports.schema import Subscription as ReportsSubscription
 from cases.schema import Query as CasesQuery
 from cases.schema import Mutation as CasesMutation
 from notifications.schema import Query as NotificationsQuery
@@ -41,4 +43,8 @@ class Mutation(
     delete_refresh_token_cookie = graphql_jwt.DeleteRefreshTokenCookie.Field()
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+class Subscription(ReportsSubscription, ThreadSubscription, graphene.ObjectType):
+    pass
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
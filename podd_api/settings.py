@@ -128,6 +128,44 @@ CHANNEL_LAYERS = {
     },
 }
 
+# seconds a websocket worker keeps a host -> tenant lookup. Domain changes clear
+# it at once in the process that makes them, other workers see them after this.
+TENANT_CACHE_TTL = 60
+
+# feeds one connection of ws/events/ or ws/graphql/ can subscribe to
+WEBSOCKET_MAX_SUBSCRIPTIONS = 100
+
+# events queued for a websocket client before WEBSOCKET_SEND_QUEUE_OVERFLOW applies:
+# "drop_oldest", "resync" (replace the queue with a resync message) or "disconnect"
+WEBSOCKET_SEND_QUEUE_SIZE = 100
+WEBSOCKET_SEND_QUEUE_OVERFLOW = "drop_oldest"
+
+# bearer token of the Prometheus scrape of api/metrics/websockets/, disabled when
+# empty. Metrics are kept per process, scrape every ASGI and WSGI worker (celery
+# workers serve no http, see common.metrics for their broadcasts). The url is in
+# ROOT_URLCONF, used for the tenants and the public schema alike: a scrape by pod
+# address falls back to the public schema (SHOW_PUBLIC_IF_NO_TENANT_FOUND), the
+# address has to be in ALLOWED_HOSTS. The numbers are the same whatever the host.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# "authority" sends a new report to the group of each authority that can see it,
+# "tenant" sends it once to every report client of the tenant, which keep the
+# reports of their authority (fewer group sends, more messages per client)
+REPORT_BROADCAST_MODE = "authority"
+
+# new report events kept for reconnecting websocket clients (per tenant, and at
+# least that many per authority), and the most events replayed to one client
+# before it is asked to reload instead
+REPORT_EVENT_LOG_SIZE = 10000
+REPORT_EVENT_AUTHORITY_LOG_SIZE = 100
+REPORT_EVENT_REPLAY_LIMIT = 100
+# the log is also trimmed when recording every this many events (0 disables it)
+REPORT_EVENT_TRIM_EVERY = 100
+
+# seconds the changes of a thread's comments are merged into one broadcast,
+# 0 sends every change on its own
+COMMENT_BROADCAST_DELAY = 0.25
+
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
@@ -221,10 +259,67 @@ SHOW_PUBLIC_IF_NO_TENANT_FOUND = True
 
 MEDIA_ROOT = BASE_DIR / "medias"
 
+# chunks of resumable image uploads (reports.ImageUpload), in the media storage
+IMAGE_UPLOAD_CHUNK_DIR = "image-uploads"
+IMAGE_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+# unfinished uploads not updated for this many seconds are removed
+IMAGE_UPLOAD_EXPIRES = 24 * 60 * 60
+
+# presigned uploads straight to the media storage, see common/direct_upload.py
+DIRECT_UPLOAD_MAX_SIZE = IMAGE_UPLOAD_MAX_SIZE
+DIRECT_UPLOAD_EXPIRES = 15 * 60
+
+# uploaded report images larger than this are downscaled and re-encoded before
+# they are stored, see common/images.py. None keeps the originals.
+IMAGE_NORMALIZE_MAX_DIMENSION = 1920
+IMAGE_NORMALIZE_FORMAT = "JPEG"  # or "WEBP"
+IMAGE_NORMALIZE_QUALITY = 85
+
+# sizes (longest side) served by the image variant endpoint, see common/variants.py
+IMAGE_VARIANT_SIZES = [160, 320, 640, 1280]
+IMAGE_VARIANT_CACHE_DIR = BASE_DIR / "variants"
+IMAGE_VARIANT_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# parallel storage writes of the files attached to a new comment
+COMMENT_ATTACHMENT_UPLOAD_WORKERS = 4
+
+# files of soft deleted images and attachments are removed after this delay, by
+# the daily collect-media-garbage of CELERY_BEAT_SCHEDULE
+MEDIA_GC_RETENTION_DAYS = 30
+
 FIXTURE_DIRS = ["account/fixtures"]
 
 CELERY_TASK_ALWAYS_EAGER = True
 
+# periodic maintenance, run by `celery beat`
+CELERY_BEAT_SCHEDULE = {
+    "expire-image-uploads": {
+        "task": "common.tasks.run_for_each_tenant",
+        "schedule": 60 * 60,
+        "args": ("reports.tasks.expire_image_uploads",),
+    },
+    "expire-consumed-uploads": {
+        "task": "common.tasks.run_for_each_tenant",
+        "schedule": 60 * 60,
+        "args": ("common.tasks.expire_consumed_uploads",),
+    },
+    "flush-zero-reports": {
+        "task": "common.tasks.run_for_each_tenant",
+        "schedule": 10 * 60,
+        "args": ("reports.tasks.flush_zero_reports",),
+    },
+    "trim-report-events": {
+        "task": "common.tasks.run_for_each_tenant",
+        "schedule": 5 * 60,
+        "args": ("reports.tasks.trim_report_events",),
+    },
+    "collect-media-garbage": {
+        "task": "common.tasks.run_for_each_tenant",
+        "schedule": 24 * 60 * 60,
+        "args": ("common.tasks.collect_media_garbage",),
+    },
+}
+
 # begin ----override this firebase setup in local.py
 credentials_config = {}
 if credentials_config:
@@ -236,7 +331,7 @@ USE_S3 = os.getenv("USE_S3") == "TRUE"
 if USE_S3:
     MEDIA_BUCKET_NAME = "ohtk-media-bucket"
     DEFAULT_FILE_STORAGE = "common.storage.S3MediaStorage"
-    THUMBNAIL_DEFAULT_STORAGE = "common.storage.MediaStorage"
+    THUMBNAIL_DEFAULT_STORAGE = "common.storage.S3MediaStorage"
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
     AWS_STORAGE_BUCKET_NAME = (
@@ -270,6 +365,11 @@ DASHBOARD_URL = "http://localhost:3000"
 
 FCM_DRY_RUN = True
 
+# "row" stores one ZeroReport per submission, "counter" only increments the
+# daily ZeroReportDailyCount of the reporter. The rows are folded into the
+# counters every 10 minutes (flush-zero-reports in CELERY_BEAT_SCHEDULE).
+ZERO_REPORT_INGESTION_MODE = "row"
+
 try:
     from .local import *
 except ImportError:
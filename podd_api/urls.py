@@ -21,11 +21,40 @@ from django.views.decorators.csrf import csrf_exempt
 from graphene_file_upload.django import FileUploadGraphQLView
 from graphql_jwt.decorators import jwt_cookie
 from graphql_playground.views import GraphQLPlaygroundView
+import cases.views
+import common.views
+import reports.views
 import tenants.views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/servers/", tenants.views.tenants),
+    path(
+        "api/report-type-definitions/<str:definition_hash>/",
+        reports.views.report_type_definition,
+    ),
+    path("api/image-uploads/", reports.views.image_upload_start),
+    path("api/image-uploads/<uuid:upload_id>/", reports.views.image_upload_chunk),
+    path(
+        "api/image-uploads/<uuid:upload_id>/finalize/",
+        reports.views.image_upload_finalize,
+    ),
+    path("api/report-images/export/", reports.views.report_images_export),
+    path(
+        "api/cases/<uuid:case_id>/images/export/",
+        cases.views.case_images_export,
+    ),
+    path(
+        "api/direct-uploads/<str:token>/",
+        common.views.direct_upload,
+        name="direct_upload",
+    ),
+    path(
+        "api/image-variants/<str:kind>/<str:pk>/<int:size>/<str:signature>/",
+        common.views.image_variant,
+        name="image_variant",
+    ),
+    path("api/metrics/websockets/", common.views.websocket_metrics),
     path(
         "graphql/",
         jwt_cookie(csrf_exempt(FileUploadGraphQLView.as_view(graphiql=settings.DEBUG))),
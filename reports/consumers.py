@@ -1,43 +1,149 @@
+from channels.db import database_sync_to_async
 from channels.exceptions import DenyConnection
+from django.conf import settings
 
-from common.consumers import TenantConsumers
+from common.consumers import Stream, TenantConsumers, in_schema, register_stream
+from common.subscriptions import SubscriptionField, register_subscription
 from common.utils import extract_jwt_payload_from_asgi_scope
 
 
+AUTHORITY_BROADCAST = "authority"
+TENANT_BROADCAST = "tenant"
+
+
 def new_report_group_name(schema_name, authority_id):
     return f"rp_{schema_name}_{authority_id}"
 
 
+def tenant_report_group_name(schema_name):
+    return f"rp_{schema_name}"
+
+
+def report_group_name(schema_name, authority_id):
+    """
+    the group a client following the reports of `authority_id` joins. In the
+    "tenant" REPORT_BROADCAST_MODE, every client of the tenant joins the same
+    group and ignores the reports whose `authority_ids` do not include its own.
+    """
+    if settings.REPORT_BROADCAST_MODE == TENANT_BROADCAST:
+        return tenant_report_group_name(schema_name)
+    return new_report_group_name(schema_name, authority_id)
+
+
+def report_targets(message):
+    return message["authority_ids"]
+
+
+def replay_new_reports(authority_id, last_event_id):
+    from reports.models import ReportEvent
+
+    # the authority ids of the log are ints, stream ids are strings
+    events = ReportEvent.replay(int(authority_id), last_event_id)
+    if events is None:
+        return None
+    return [(str(event.report_id), event.text) for event in events]
+
+
+def can_follow_authority_reports(user, authority_id):
+    """the same rule as the incidentReports query."""
+    authority_id = int(authority_id)
+    if not user.is_authority_user:
+        return True
+    authorities = user.authorityuser.authority.all_inherits_down()
+    return any(authority.id == authority_id for authority in authorities)
+
+
+register_stream(
+    Stream(
+        name="reports",
+        event_type="new.report",
+        group_name=report_group_name,
+        authorize=can_follow_authority_reports,
+        # a report is sent to the group of each ancestor authority
+        dedupe_field="report_id",
+        replay=replay_new_reports,
+        targets=report_targets,
+    )
+)
+
+
+def load_new_report(message):
+    from reports.models import IncidentReport
+
+    return list(
+        IncidentReport.objects.select_related(
+            "report_type", "report_type__category", "reported_by"
+        )
+        .prefetch_related("images", "relevant_authorities", "followups")
+        .filter(pk=message["report_id"])
+    )
+
+
+register_subscription(
+    SubscriptionField(
+        field_name="newIncidentReport",
+        argument="authority_id",
+        event_type="new.report",
+        group_name=report_group_name,
+        targets=report_targets,
+        event_key=lambda message: message["report_id"],
+        load=load_new_report,
+        authorize=can_follow_authority_reports,
+    )
+)
+
+
 class NewReportConsumers(TenantConsumers):
     def __init__(self, *args, **kwargs):
         super().__init__(args, kwargs)
         self.username = None
         self.authority_id = None
         self.group_name = None
+        self.replayed = set()
 
     async def connect(self):
         self.authority_id = self.scope["url_route"]["kwargs"]["authority_id"]
-        await self.get_tenant()
-        self.group_name = new_report_group_name(
-            self.tenant.schema_name, self.authority_id
-        )
+        try:
+            await self.get_tenant()
+        except ValueError:
+            raise DenyConnection("domain not found")
+        self.group_name = report_group_name(self.tenant.schema_name, self.authority_id)
         payload = extract_jwt_payload_from_asgi_scope(self.scope)
         self.username = payload["username"]
 
         if self.username:
-            await self.channel_layer.group_add(
-                self.group_name,
-                self.channel_name,
-            )
+            await self.group_add(self.group_name)
             await self.accept()
+            await self.replay()
         else:
             raise DenyConnection("invalid token")
 
-    async def disconnect(self, code):
-        await self.channel_layer.group_discard(
-            self.group_name,
-            self.channel_name,
+    async def replay(self):
+        """send the events missed since ?last_event_id=, or a resync message."""
+        try:
+            authority_id = int(self.authority_id)
+            last_event_id = int(self.query_param("last_event_id"))
+        except (TypeError, ValueError):
+            return
+        events = await database_sync_to_async(in_schema)(
+            self.tenant, replay_new_reports, authority_id, last_event_id
         )
+        if events is None:
+            await self.send_event(self.resync_message)
+            return
+        for report_id, text in events:
+            self.replayed.add(report_id)
+            await self.send_event(text)
+
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.group_discard(self.group_name)
 
     async def new_report(self, event):
-        await self.send(text_data=event["text"])
+        # sent by the replay already, the event was recorded while connecting
+        if event.get("report_id") in self.replayed:
+            return
+        targets = {str(target) for target in report_targets(event)}
+        if str(self.authority_id) not in targets:
+            return
+        await self.send_event(event["text"])
@@ -0,0 +1,73 @@
+import io
+import multiprocessing
+import resource
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from PIL import Image as PILImage
+
+from common.images import normalize_image
+
+
+def make_photo(width, height) -> bytes:
+    """a noisy JPEG, close to a camera photo for the decoder and encoder."""
+    img = PILImage.effect_noise((width, height), 48).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=92)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = "measure throughput and peak memory of the image ingest normalization"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=20)
+        parser.add_argument("--width", type=int, default=4032)
+        parser.add_argument("--height", type=int, default=3024)
+        parser.add_argument(
+            "--max-dimension", type=int, default=settings.IMAGE_NORMALIZE_MAX_DIMENSION
+        )
+        parser.add_argument("--format", default=settings.IMAGE_NORMALIZE_FORMAT)
+        parser.add_argument(
+            "--quality", type=int, default=settings.IMAGE_NORMALIZE_QUALITY
+        )
+
+    def handle(self, *args, **options):
+        # the full size sample is built in a child process, so that its bitmap
+        # does not count in the peak memory of this one
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            original = pool.apply(make_photo, (options["width"], options["height"]))
+        rss_before = self.peak_rss()
+
+        output_size = 0
+        start = time.perf_counter()
+        for _ in range(options["count"]):
+            normalized = normalize_image(
+                ContentFile(original, name="photo.jpg"),
+                max_dimension=options["max_dimension"],
+                image_format=options["format"],
+                quality=options["quality"],
+            )
+            output_size = normalized.size if normalized else len(original)
+        elapsed = time.perf_counter() - start
+
+        count = options["count"]
+        self.stdout.write(
+            f"{count} images of {options['width']}x{options['height']}"
+            f" ({len(original) / 1024:.0f} KB) -> max {options['max_dimension']}px"
+            f" {options['format']} q{options['quality']} ({output_size / 1024:.0f} KB)"
+        )
+        self.stdout.write(
+            f"{count / elapsed:.2f} images/s, {elapsed / count * 1000:.1f} ms/image"
+        )
+        self.stdout.write(
+            f"peak rss {self.peak_rss() / 1024:.1f} MB"
+            f" (+{(self.peak_rss() - rss_before) / 1024:.1f} MB while ingesting)"
+        )
+
+    @staticmethod
+    def peak_rss() -> int:
+        # kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import random
+import resource
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django_tenants.utils import get_public_schema_name
+from graphql_jwt.utils import jwt_encode
+
+from common.consumers import send_queue_stats
+from common.utils import group_send_many
+from reports.consumers import report_group_name
+from tenants.models import Domain
+from threads.consumers import new_comment_group_name
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Client:
+    """a simulated dashboard, connected to the report or comment feed."""
+
+    def __init__(self, application, host, schema_name, kind, target, token):
+        self.schema_name = schema_name
+        self.kind = kind
+        self.target = target
+        self.communicator = WebsocketCommunicator(
+            application,
+            f"/ws/{kind}/{target}/",
+            headers=[(b"host", host.encode()), (b"cookie", f"JWT={token}".encode())],
+        )
+        self.latencies = []
+        self.reader = None
+
+    async def connect(self, timeout):
+        connected, _ = await self.communicator.connect(timeout)
+        if connected:
+            self.reader = asyncio.ensure_future(self.read())
+        return connected
+
+    async def read(self):
+        while True:
+            message = await self.communicator.output_queue.get()
+            if message["type"] != "websocket.send":
+                return
+            sent_at = json.loads(message["text"]).get("sent_at")
+            if sent_at:
+                self.latencies.append(time.perf_counter() - sent_at)
+
+    async def disconnect(self):
+        if self.reader:
+            self.reader.cancel()
+        await self.communicator.disconnect()
+
+
+class Command(BaseCommand):
+    help = (
+        "measure how many report and comment websocket clients one ASGI worker can"
+        " hold: connect rate, event fan-out latency and memory per connection"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=1000)
+        parser.add_argument(
+            "--hosts",
+            nargs="*",
+            help="tenant domains to connect to, every domain by default",
+        )
+        parser.add_argument(
+            "--comment-share",
+            type=float,
+            default=0.2,
+            help="part of the clients following a comment thread",
+        )
+        parser.add_argument("--authorities", type=int, default=50)
+        parser.add_argument("--threads", type=int, default=200)
+        parser.add_argument("--events", type=int, default=200)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=50,
+            help="events per second, 0 sends them as fast as possible",
+        )
+        parser.add_argument(
+            "--fanout",
+            type=int,
+            default=3,
+            help="authority groups a report is sent to (the authority and ancestors)",
+        )
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--timeout", type=float, default=10)
+        parser.add_argument(
+            "--redis", help="host:port of a redis channel layer, in memory by default"
+        )
+        parser.add_argument(
+            "--broadcast-mode",
+            choices=("authority", "tenant"),
+            default=settings.REPORT_BROADCAST_MODE,
+        )
+
+    def handle(self, *args, **options):
+        if options["rate"] < 0:
+            raise CommandError("--rate must be positive, or 0 for no throttling")
+        if options["redis"]:
+            host, port = options["redis"].split(":")
+            layer = {
+                "BACKEND": "channels_redis.core.RedisChannelLayer",
+                "CONFIG": {"hosts": [(host, int(port))]},
+            }
+        else:
+            layer = {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+
+        tenants = {
+            domain.domain: domain.tenant.schema_name
+            for domain in Domain.objects.select_related("tenant").exclude(
+                tenant__schema_name=get_public_schema_name()
+            )
+            if not options["hosts"] or domain.domain in options["hosts"]
+        }
+        if not tenants:
+            raise CommandError("no tenant domain to connect to")
+
+        with override_settings(
+            CHANNEL_LAYERS={"default": layer},
+            REPORT_BROADCAST_MODE=options["broadcast_mode"],
+        ):
+            async_to_sync(self.run)(tenants, options)
+
+    async def run(self, tenants, options):
+        from podd_api.asgi import application
+
+        rss_before = self.peak_rss()
+        clients = self.make_clients(application, tenants, options)
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def connect(client):
+            async with semaphore:
+                try:
+                    return await client.connect(options["timeout"])
+                except asyncio.TimeoutError:
+                    return False
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(connect(client) for client in clients))
+        connect_time = time.perf_counter() - start
+        connected = [client for client, ok in zip(clients, results) if ok]
+        rss_connected = self.peak_rss()
+
+        sent, expected = await self.drive_events(connected, options)
+        await self.wait_deliveries(connected, expected, options["timeout"])
+        latencies = [value for client in connected for value in client.latencies]
+        await asyncio.gather(*(client.disconnect() for client in connected))
+
+        count = len(clients)
+        self.stdout.write(
+            f"{len(connected)}/{count} clients on {len(tenants)} tenants connected"
+            f" in {connect_time:.2f}s ({len(connected) / connect_time:.0f}/s)"
+        )
+        self.stdout.write(
+            f"{sent} events, {len(latencies)}/{expected} deliveries,"
+            f" {send_queue_stats.dropped} dropped by the send queues"
+        )
+        self.stdout.write(
+            "fan-out latency "
+            + ", ".join(
+                f"p{p} {percentile(latencies, p) * 1000:.1f} ms" for p in (50, 90, 99)
+            )
+            + f", max {max(latencies, default=0) * 1000:.1f} ms"
+        )
+        if connected:
+            # includes the client side of the connections simulated here
+            per_connection = (rss_connected - rss_before) / len(connected)
+            self.stdout.write(
+                f"peak rss {self.peak_rss() / 1024:.1f} MB,"
+                f" {per_connection:.1f} KB per connection"
+            )
+
+    @staticmethod
+    def make_clients(application, tenants, options):
+        hosts = list(tenants.items())
+        clients = []
+        for i in range(options["clients"]):
+            host, schema_name = hosts[i % len(hosts)]
+            token = jwt_encode(
+                {"username": f"loadtest{i}", "exp": int(time.time()) + 3600}
+            )
+            if random.random() < options["comment_share"]:
+                kind, target = "comments", random.randrange(options["threads"])
+            else:
+                kind, target = "reports", random.randrange(options["authorities"])
+            clients.append(
+                Client(application, host, schema_name, kind, target, token)
+            )
+        return clients
+
+    async def drive_events(self, clients, options):
+        """
+        publish report and comment events with the same shape as the signals,
+        at `rate` per second. Returns (events sent, deliveries expected).
+        """
+        subscribers = {}
+        for client in clients:
+            key = (client.schema_name, client.kind, client.target)
+            subscribers[key] = subscribers.get(key, 0) + 1
+        schema_names = sorted({client.schema_name for client in clients})
+        channel_layer = get_channel_layer()
+        expected = 0
+        interval = 1 / options["rate"] if options["rate"] else 0
+
+        for i in range(options["events"]):
+            schema_name = random.choice(schema_names)
+            text = json.dumps({"sent_at": time.perf_counter()})
+            if random.random() < options["comment_share"]:
+                thread_id = random.randrange(options["threads"])
+                expected += subscribers.get((schema_name, "comments", thread_id), 0)
+                await channel_layer.group_send(
+                    new_comment_group_name(schema_name, thread_id),
+                    {
+                        "type": "update.comment",
+                        "event_id": uuid.uuid4().hex,
+                        "thread_id": thread_id,
+                        "comment_ids": [i],
+                        "created_ids": [i],
+                        "text": text,
+                    },
+                )
+            else:
+                authority_ids = random.sample(
+                    range(options["authorities"]),
+                    min(options["fanout"], options["authorities"]),
+                )
+                expected += sum(
+                    subscribers.get((schema_name, "reports", authority_id), 0)
+                    for authority_id in authority_ids
+                )
+                await group_send_many(
+                    channel_layer,
+                    {report_group_name(schema_name, a) for a in authority_ids},
+                    {
+                        "type": "new.report",
+                        "report_id": str(uuid.uuid4()),
+                        "authority_ids": authority_ids,
+                        "text": text,
+                    },
+                )
+            await asyncio.sleep(interval)
+        return options["events"], expected
+
+    @staticmethod
+    async def wait_deliveries(clients, expected, timeout):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if sum(len(client.latencies) for client in clients) >= expected:
+                return
+            await asyncio.sleep(0.05)
+
+    @staticmethod
+    def peak_rss() -> int:
+        # kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
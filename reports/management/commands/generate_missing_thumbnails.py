@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from common.tasks import generate_thumbnails
+from common.thumbnails import thumbnail_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "queue the thumbnail generation of every stored file whose thumbnails are"
+        " not ready, in the current schema (run it with all_tenants_command)"
+    )
+
+    def handle(self, *args, **options):
+        for model, spec in thumbnail_fields.items():
+            pks = (
+                model._base_manager.filter(**{spec.ready_field: False})
+                .exclude(Q(**{spec.field_name: ""}) | Q(**{spec.field_name: None}))
+                .values_list("pk", flat=True)
+            )
+            count = 0
+            for pk in pks.iterator():
+                generate_thumbnails.delay(
+                    model._meta.label,
+                    str(pk),
+                    spec.field_name,
+                    spec.ready_field,
+                    spec.names_field,
+                )
+                count += 1
+            self.stdout.write(f"{model._meta.label}: {count} queued")
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.12 on 2026-10-19 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_passwordresettoken'),
+        ('reports', '0015_auto_20220825_0827'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "create sequence if not exists reports_sync_version_seq;",
+            "drop sequence if exists reports_sync_version_seq;",
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='sync_version',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='reporttype',
+            name='sync_version',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.CreateModel(
+            name='ReportTypeSyncState',
+            fields=[
+                ('authority', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='report_type_sync_state', serialize=False, to='accounts.authority')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.12 on 2026-10-19 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_passwordresettoken'),
+        ('reports', '0016_report_type_sync_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZeroReportDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('count', models.IntegerField(default=0)),
+                ('last_reported_at', models.DateTimeField()),
+                ('authority', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zero_report_counts', to='accounts.authority')),
+                ('reporter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zero_report_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='zeroreportdailycount',
+            constraint=models.UniqueConstraint(fields=('reporter', 'authority', 'day'), name='zero_report_daily_count_unique'),
+        ),
+    ]
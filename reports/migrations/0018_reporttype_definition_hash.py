@@ -0,0 +1,35 @@
+# Generated by Django 3.2.12 on 2026-10-19 10:00
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def compute_definition_hash(apps, schema_editor):
+    ReportType = apps.get_model("reports", "ReportType")
+    for report_type in ReportType.objects.all():
+        content = json.dumps(
+            report_type.definition,
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode("utf-8")
+        report_type.definition_hash = hashlib.sha256(content).hexdigest()
+        report_type.save(update_fields=["definition_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0017_zeroreportdailycount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporttype',
+            name='definition_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.RunPython(compute_definition_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.12 on 2026-10-19 16:00
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0022_image_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('report_id', models.UUIDField()),
+                ('authority_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None)),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reportevent',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['authority_ids'], name='reports_rep_authori_2030f9_gin'),
+        ),
+    ]
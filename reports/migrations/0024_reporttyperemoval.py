@@ -0,0 +1,24 @@
+# Generated by Django 3.2.12 on 2026-10-19 18:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_passwordresettoken'),
+        ('reports', '0023_reportevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportTypeRemoval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type_id', models.UUIDField()),
+                ('version', models.BigIntegerField(db_index=True)),
+                ('authority', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.authority')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.12 on 2026-10-19 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_user_pending_avatar_thumbnails'),
+        ('reports', '0025_image_pending_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumedUpload',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('consumed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        # moved from accounts, keep the consumed names and when they were consumed
+        migrations.RunSQL(
+            'INSERT INTO reports_consumedupload (name, consumed_at) '
+            'SELECT name, consumed_at FROM accounts_consumedupload',
+            migrations.RunSQL.noop,
+        ),
+    ]
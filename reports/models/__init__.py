@@ -1,4 +1,14 @@
+from .sync_state import ReportTypeSyncState, ReportTypeRemoval
 from .category import Category
 from .report_type import ReportType
-from .report import BaseReport, ZeroReport, IncidentReport, FollowUpReport, Image
+from .report import (
+    BaseReport,
+    ZeroReport,
+    ZeroReportDailyCount,
+    IncidentReport,
+    FollowUpReport,
+    Image,
+)
 from .reporter_notification import ReporterNotification
+from .image_upload import ImageUpload, ConsumedUpload
+from .report_event import ReportEvent
@@ -1,6 +1,7 @@
 from django.contrib.gis.db import models
 
 from accounts.models import BaseModel, BaseModelManager
+from .sync_state import next_sync_version
 
 
 class Category(BaseModel):
@@ -12,6 +13,13 @@ class Category(BaseModel):
     name = models.CharField(max_length=255, unique=True)
     icon = models.ImageField(upload_to="icons", blank=True, null=True)
     ordering = models.IntegerField(default=0)
+    sync_version = models.BigIntegerField(default=0, db_index=True)
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        self.sync_version = next_sync_version()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "sync_version"}
+        super().save(*args, **kwargs)
@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from django.conf import settings
+from django.contrib.gis.db import models
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils.timezone import now
+
+from accounts.models import BaseModel, BaseModelManager, User
+from common.media_gc import delete_files
+from .report import Image
+
+CHUNK_READ_SIZE = 64 * 1024
+
+
+class ImageUpload(BaseModel):
+    """
+    A resumable, chunked upload of a report image.
+
+    Each chunk is spooled to a local temporary file while it is read from the
+    request, so the whole image is never held in memory, then stored in the
+    media storage under IMAGE_UPLOAD_CHUNK_DIR, named after its offset. Any host
+    can take the next chunk or the finalize of an upload. When all bytes are
+    received, `finalize` joins the chunks and stores them as an `Image` of the
+    report. Uploads untouched for IMAGE_UPLOAD_EXPIRES seconds are removed by
+    `expire`.
+    """
+
+    class OffsetMismatch(Exception):
+        pass
+
+    class TooLarge(Exception):
+        pass
+
+    objects = BaseModelManager()
+    objects_original = models.Manager()
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report_id = models.UUIDField()
+    image_id = models.UUIDField(blank=True, null=True)
+    is_cover = models.BooleanField(default=False, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(blank=True, null=True)
+    offset = models.BigIntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_image = models.ForeignKey(
+        Image, blank=True, null=True, on_delete=models.SET_NULL
+    )
+
+    @property
+    def chunk_dir(self) -> str:
+        return f"{settings.IMAGE_UPLOAD_CHUNK_DIR}/{self.id}"
+
+    def chunk_name(self, offset: int) -> str:
+        # zero padded, the names sort in the order of the offsets
+        return f"{self.chunk_dir}/{offset:012d}.part"
+
+    def chunk_names(self) -> List[str]:
+        try:
+            _, files = default_storage.listdir(self.chunk_dir)
+        except FileNotFoundError:
+            return []
+        return [f"{self.chunk_dir}/{name}" for name in sorted(files)]
+
+    @property
+    def is_complete(self):
+        return self.size is not None and self.offset >= self.size
+
+    @property
+    def max_size(self) -> int:
+        if self.size is None:
+            return settings.IMAGE_UPLOAD_MAX_SIZE
+        return min(self.size, settings.IMAGE_UPLOAD_MAX_SIZE)
+
+    def append_chunk(self, stream, offset: int):
+        """
+        append `stream` at `offset`, which must be the current offset. A chunk
+        going past the declared size, or IMAGE_UPLOAD_MAX_SIZE, is rejected as a
+        whole.
+        """
+        if offset != self.offset:
+            raise ImageUpload.OffsetMismatch(self.offset)
+
+        with tempfile.TemporaryFile() as f:
+            written = self.offset
+            while chunk := stream.read(CHUNK_READ_SIZE):
+                written += len(chunk)
+                if written > self.max_size:
+                    raise ImageUpload.TooLarge(self.max_size)
+                f.write(chunk)
+            if written == self.offset:
+                return
+            f.seek(0)
+            name = self.chunk_name(self.offset)
+            # left over by an attempt whose offset was not saved
+            default_storage.delete(name)
+            default_storage.save(name, File(f))
+
+        self.offset = written
+        self.save(update_fields=("offset", "updated_at"))
+
+    def finalize(self) -> Image:
+        if self.created_image_id:
+            return self.created_image
+        if self.size is not None and self.offset != self.size:
+            raise ImageUpload.OffsetMismatch(self.offset)
+        names = self.chunk_names()
+        if not names:
+            # nothing received, or the chunks were lost
+            raise ImageUpload.OffsetMismatch(self.offset)
+
+        with tempfile.TemporaryFile() as f:
+            for name in names:
+                with default_storage.open(name) as chunk:
+                    shutil.copyfileobj(chunk, f, CHUNK_READ_SIZE)
+            if f.tell() != self.offset:
+                raise ImageUpload.OffsetMismatch(self.offset)
+            f.seek(0)
+            self.created_image = Image.create_for_report(
+                self.report_id,
+                File(f, name=self.filename),
+                self.image_id,
+                self.is_cover,
+            )
+        self.save(update_fields=("created_image", "updated_at"))
+        self.remove_chunks()
+        return self.created_image
+
+    def remove_chunks(self):
+        delete_files(default_storage, self.chunk_names())
+
+    @staticmethod
+    def expire(before: datetime = None) -> int:
+        """
+        remove the uploads (and their chunks) not updated since `before`,
+        IMAGE_UPLOAD_EXPIRES ago by default. Returns the number of uploads removed.
+        """
+        if before is None:
+            before = now() - timedelta(seconds=settings.IMAGE_UPLOAD_EXPIRES)
+        expired = ImageUpload.objects_original.filter(updated_at__lt=before)
+        for upload in expired.only("id").iterator():
+            upload.remove_chunks()
+        count, _ = expired.delete()
+        return count
+
+
+class ConsumedUpload(models.Model):
+    """storage names of confirmed direct uploads, a token is only used once."""
+
+    name = models.CharField(max_length=255, primary_key=True)
+    consumed_at = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -1,12 +1,21 @@
+import hashlib
+import os
 import uuid
+from datetime import date, datetime
+from typing import Dict, Tuple
 
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.gis.db import models
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils.timezone import localdate, now
 from easy_thumbnails.fields import ThumbnailerImageField
 
 from accounts.models import BaseModel, User, Authority, BaseModelManager
 from common.eval import build_eval_obj
+from common.images import normalize_image
 from threads.models import Thread
 from . import ReportType
 
@@ -46,6 +55,9 @@ class Image(BaseModel):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     file = ThumbnailerImageField(upload_to="reports")
+    thumbnail_ready = models.BooleanField(default=False)
+    thumbnails = models.JSONField(default=dict, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
     report_type = models.ForeignKey(
         ContentType,
         limit_choices_to={
@@ -56,6 +68,83 @@ class Image(BaseModel):
     report_id = models.UUIDField()
     report = GenericForeignKey("report_type", "report_id")
 
+    @staticmethod
+    def hash_file(file) -> str:
+        """sha256 of an uploaded file, read chunk by chunk."""
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
+
+    @staticmethod
+    def expired_media(cutoff):
+        """images deleted, or of a report deleted, before `cutoff`."""
+        return Image._base_manager.filter(
+            models.Q(deleted_at__lt=cutoff)
+            | models.Q(
+                report_id__in=IncidentReport._base_manager.filter(
+                    deleted_at__lt=cutoff
+                ).values("id")
+            )
+            | models.Q(
+                report_id__in=FollowUpReport._base_manager.filter(
+                    deleted_at__lt=cutoff
+                ).values("id")
+            )
+        )
+
+    @staticmethod
+    def get_report(report_id):
+        try:
+            return IncidentReport.objects.get(pk=report_id)
+        except IncidentReport.DoesNotExist:
+            return FollowUpReport.objects.get(pk=report_id)
+
+    @staticmethod
+    def create_for_report(report_id, file, image_id=None, is_cover=False):
+        """attach an image to an incident or a followup report."""
+        report = Image.get_report(report_id)
+        content_hash = Image.hash_file(file)
+        existing = (
+            Image.objects.filter(content_hash=content_hash).exclude(file="").first()
+        )
+        if existing:
+            # same content in this tenant, share the stored file and thumbnails
+            image = Image.objects.create(
+                report=report,
+                id=image_id,
+                file=existing.file.name,
+                content_hash=content_hash,
+                thumbnail_ready=existing.thumbnail_ready,
+                thumbnails=existing.thumbnails,
+            )
+        else:
+            file = normalize_image(file) or file
+            _, ext = os.path.splitext(file.name or "")
+            file.name = f"{content_hash}{ext.lower()}"
+            image = Image.objects.create(
+                report=report, id=image_id, file=file, content_hash=content_hash
+            )
+
+        if is_cover:
+            report.cover_image_id = image.id
+            report.save(update_fields=("cover_image",))
+        return image
+
+    @staticmethod
+    def register_for_report(report_id, name, image_id=None, is_cover=False):
+        """
+        attach a file that was uploaded straight to the storage as `name`. It goes
+        through `create_for_report` like any upload, the uploaded file is removed
+        once the image is committed.
+        """
+        with default_storage.open(name) as file:
+            image = Image.create_for_report(report_id, file, image_id, is_cover)
+        if image.file.name != name:
+            transaction.on_commit(lambda: default_storage.delete(name))
+        return image
+
 
 class AbstractIncidentReport(BaseReport):
     class Meta:
@@ -147,6 +236,108 @@ class ZeroReport(BaseReport):
     pass
 
 
+class ZeroReportDailyCount(models.Model):
+    """
+    zero reports aggregated per (reporter, authority, day), used instead of one
+    ZeroReport row per "nothing to report" ping.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["reporter", "authority", "day"],
+                name="zero_report_daily_count_unique",
+            )
+        ]
+
+    reporter = models.ForeignKey(
+        User, related_name="zero_report_counts", on_delete=models.CASCADE
+    )
+    authority = models.ForeignKey(
+        Authority, related_name="zero_report_counts", on_delete=models.CASCADE
+    )
+    day = models.DateField(db_index=True)
+    count = models.IntegerField(default=0)
+    last_reported_at = models.DateTimeField()
+
+    UPSERT_CONFLICT = """
+        on conflict (reporter_id, authority_id, day) do update
+        set count = reports_zeroreportdailycount.count + excluded.count,
+            last_reported_at = greatest(
+                reports_zeroreportdailycount.last_reported_at,
+                excluded.last_reported_at
+            )
+    """
+
+    @staticmethod
+    def bulk_increment(
+        counts: Dict[Tuple[int, int, date], int], reported_at: datetime = None
+    ):
+        """counts: {(reporter_id, authority_id, day): number of zero reports}"""
+        if not counts:
+            return
+        reported_at = reported_at or now()
+        keys = list(counts.keys())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                insert into reports_zeroreportdailycount
+                    (reporter_id, authority_id, day, count, last_reported_at)
+                select reporter_id, authority_id, day, count, %s
+                from unnest(%s::bigint[], %s::bigint[], %s::date[], %s::int[])
+                    as t(reporter_id, authority_id, day, count)
+                {ZeroReportDailyCount.UPSERT_CONFLICT}
+                """,
+                [
+                    reported_at,
+                    [key[0] for key in keys],
+                    [key[1] for key in keys],
+                    [key[2] for key in keys],
+                    [counts[key] for key in keys],
+                ],
+            )
+
+    @staticmethod
+    def increment(reporter_id: int, authority_id: int, reported_at: datetime = None):
+        reported_at = reported_at or now()
+        day = localdate(reported_at)
+        ZeroReportDailyCount.bulk_increment(
+            {(reporter_id, authority_id, day): 1}, reported_at
+        )
+
+    @staticmethod
+    def flush_zero_reports(before: datetime = None) -> int:
+        """
+        fold raw ZeroReport rows of authority users created before `before` into
+        the daily counters and remove them, in a single statement.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                with flushed as (
+                    delete from reports_zeroreport z
+                    using accounts_authorityuser au
+                    where z.reported_by_id = au.user_ptr_id
+                      and z.deleted_at is null
+                      and z.created_at < %s
+                    returning z.reported_by_id, au.authority_id, z.created_at
+                )
+                insert into reports_zeroreportdailycount
+                    (reporter_id, authority_id, day, count, last_reported_at)
+                select reported_by_id,
+                       authority_id,
+                       (created_at at time zone %s)::date,
+                       count(*),
+                       max(created_at)
+                from flushed
+                group by 1, 2, 3
+                {ZeroReportDailyCount.UPSERT_CONFLICT}
+                """,
+                [before or now(), settings.TIME_ZONE],
+            )
+            return cursor.rowcount
+
+
 class FollowUpReport(AbstractIncidentReport):
     incident = models.ForeignKey(
         IncidentReport, on_delete=models.CASCADE, related_name="followups"
@@ -0,0 +1,97 @@
+"""
+Bounded log of the new report events sent to websocket clients.
+
+Each event is stored once, with the authorities it was sent to. Its id comes
+from the table sequence, so ids only increase within a tenant. A client that
+reconnects with the last id it received gets the events it missed, when the
+log still holds them. The log keeps the last REPORT_EVENT_LOG_SIZE events of
+the tenant, and the last REPORT_EVENT_AUTHORITY_LOG_SIZE events of every
+authority, so a quiet authority is not pushed out by busy ones. Older events
+are removed by `trim`, run periodically and by every REPORT_EVENT_TRIM_EVERY-th
+recorded event, so the log stays bounded when the periodic task does not run.
+"""
+
+import json
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connection, models
+
+
+class ReportEvent(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    report_id = models.UUIDField()
+    authority_ids = ArrayField(models.BigIntegerField())
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["authority_ids"])]
+
+    @property
+    def text(self) -> str:
+        return json.dumps({"event_id": self.id, **self.data})
+
+    @staticmethod
+    def record(report_id, authority_ids: Iterable[int], context: dict) -> "ReportEvent":
+        event = ReportEvent.objects.create(
+            report_id=report_id,
+            authority_ids=list(authority_ids),
+            # the json types of the websocket message
+            data=json.loads(json.dumps(context, default=str)),
+        )
+        trim_every = settings.REPORT_EVENT_TRIM_EVERY
+        if trim_every and event.id % trim_every == 0:
+            ReportEvent.trim()
+        return event
+
+    @staticmethod
+    def trim() -> int:
+        """remove the events out of both bounds of the log, returns their number."""
+        latest_id = ReportEvent.objects.aggregate(models.Max("id"))["id__max"]
+        if latest_id is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"delete from {ReportEvent._meta.db_table} where id <= %s"
+                " and id not in (select id from ("
+                "  select e.id, row_number() over ("
+                "   partition by a.id order by e.id desc) as n"
+                f"  from {ReportEvent._meta.db_table} e,"
+                "   unnest(e.authority_ids) as a(id)"
+                " ) ranked where n <= %s)",
+                [
+                    latest_id - settings.REPORT_EVENT_LOG_SIZE,
+                    settings.REPORT_EVENT_AUTHORITY_LOG_SIZE,
+                ],
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def replay(authority_id, last_event_id: int) -> Optional[List["ReportEvent"]]:
+        """
+        events of `authority_id` after `last_event_id`, oldest first. None when
+        some may be missing (removed from the log, or more than the replay
+        limit), the client has to reload its data instead.
+        """
+        limit = settings.REPORT_EVENT_REPLAY_LIMIT
+        events = list(
+            ReportEvent.objects.filter(
+                id__gt=last_event_id, authority_ids__contains=[authority_id]
+            ).order_by("id")[: limit + 1]
+        )
+        if len(events) > limit:
+            return None
+        latest_id = ReportEvent.objects.aggregate(models.Max("id"))["id__max"]
+        tenant_bound = (latest_id or 0) - settings.REPORT_EVENT_LOG_SIZE
+        if last_event_id >= tenant_bound:
+            # never removed by the tenant bound
+            return events
+        # the events kept of an authority are always its newest ones, none is
+        # missing when one at or before `last_event_id` is still there
+        kept = ReportEvent.objects.filter(
+            id__lte=last_event_id, authority_ids__contains=[authority_id]
+        ).exists()
+        return events if kept else None
@@ -1,15 +1,22 @@
+import hashlib
+import json
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from django.contrib.gis.db import models
+from django.core.cache import cache
+from django.db import connection
 from django.db.models import Q
 from django.template import Template, Context
 from django.template.defaultfilters import striptags
 
 from accounts.models import BaseModel, Authority, BaseModelManager
 from . import Category
+from .sync_state import ReportTypeRemoval, ReportTypeSyncState, next_sync_version
+
+MY_REPORT_TYPES_CACHE_TIMEOUT = 60 * 60 * 24
 
 
 class ReportType(BaseModel):
@@ -18,12 +25,22 @@ class ReportType(BaseModel):
         id: uuid.UUID
         updated_at: datetime
 
+    @dataclass
+    class SyncDelta:
+        sync_token: int
+        unchanged: bool
+        updated_list: list = field(default_factory=list)
+        removed_ids: list = field(default_factory=list)
+        category_list: list = field(default_factory=list)
+
     objects = BaseModelManager()
+    objects_original = models.Manager()
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255, unique=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     definition = models.JSONField()
+    definition_hash = models.CharField(max_length=64, blank=True, db_index=True)
     followup_definition = models.JSONField(null=True, blank=True)
     authorities = models.ManyToManyField(
         Authority,
@@ -38,6 +55,7 @@ class ReportType(BaseModel):
         null=True,
         on_delete=models.SET_NULL,
     )
+    sync_version = models.BigIntegerField(default=0, db_index=True)
 
     @staticmethod
     def filter_by_authority(authority: Authority):
@@ -45,39 +63,113 @@ class ReportType(BaseModel):
             Q(authorities__in=authority.all_inherits_up()) | Q(authorities__isnull=True)
         )
 
+    @staticmethod
+    def cached_filter_by_authority(authority_id) -> List["ReportType"]:
+        """
+        same as filter_by_authority but cached per (tenant, authority) and keyed
+        by the ReportTypeSyncState version, which every change to a report type,
+        category or the authority hierarchy bumps. The version is read from the
+        database, so the change is seen by every process.
+        """
+        version = ReportTypeSyncState.current_version(Authority(id=authority_id))
+        key = f"my_report_types_{connection.schema_name}_{authority_id}_{version}"
+        report_types = cache.get(key)
+        if report_types is None:
+            report_types = list(
+                ReportType.filter_by_authority(Authority(id=authority_id))
+                .select_related("category")
+                .distinct()
+            )
+            cache.set(key, report_types, MY_REPORT_TYPES_CACHE_TIMEOUT)
+        return report_types
+
     @staticmethod
     def check_updated_report_types_by_authority(
         authority: Authority,
         own_report_types: List[ReportTypeData],
     ):
-        existing_items = ReportType.filter_by_authority(authority)
-        updated_list = []
-        removed_list = []
-        for report_type in existing_items:
-            found = False
-            for item in own_report_types:
-                if report_type.id == item.id:
-                    found = True
-                    if report_type.updated_at != item.updated_at:
-                        updated_list.append(report_type)
-            if not found:
-                updated_list.append(report_type)
-        for item in own_report_types:
-            found = False
-            for report_type in existing_items:
-                if report_type.id == item.id:
-                    found = True
-            if not found:
-                removed_list.append(report_type)
+        existing_items = {
+            report_type.id: report_type
+            for report_type in ReportType.filter_by_authority(authority)
+        }
+        own_items = {item.id: item for item in own_report_types}
+        updated_list = [
+            report_type
+            for report_type in existing_items.values()
+            if report_type.id not in own_items
+            or report_type.updated_at != own_items[report_type.id].updated_at
+        ]
+        removed_list = [
+            item for item in own_report_types if item.id not in existing_items
+        ]
 
         return {
             "updated_list": updated_list,
             "removed_list": removed_list,
         }
 
+    @staticmethod
+    def sync_delta_by_authority(
+        authority: Authority, sync_token: Optional[int]
+    ) -> "ReportType.SyncDelta":
+        """
+        sync_token is the version returned by the previous sync (None on the first
+        sync). Answers "unchanged" with a single lookup on ReportTypeSyncState,
+        otherwise only report types and categories changed after that version.
+        """
+        current_version = ReportTypeSyncState.current_version(authority)
+        if sync_token is not None and sync_token >= current_version:
+            return ReportType.SyncDelta(sync_token=current_version, unchanged=True)
+
+        updated = ReportType.filter_by_authority(authority)
+        categories = Category.objects.all()
+        removed_ids = []
+        if sync_token is not None:
+            # rows older than the sync versioning keep version 0, so a first
+            # sync takes everything instead of filtering on the version.
+            updated = updated.filter(sync_version__gt=sync_token)
+            categories = categories.filter(sync_version__gt=sync_token)
+        updated_list = list(updated.distinct())
+        if sync_token is not None:
+            visible_ids = {report_type.id for report_type in updated_list}
+            removed_ids = [
+                id
+                for id in ReportTypeRemoval.removed_ids(authority, sync_token)
+                if id not in visible_ids
+            ]
+        return ReportType.SyncDelta(
+            sync_token=current_version,
+            unchanged=False,
+            updated_list=updated_list,
+            removed_ids=removed_ids,
+            category_list=list(categories),
+        )
+
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.sync_version = next_sync_version()
+        self.definition_hash = ReportType.hash_definition(self.definition)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {
+                *kwargs["update_fields"],
+                "sync_version",
+                "definition_hash",
+            }
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def serialize_definition(definition) -> bytes:
+        """canonical json of a definition, the content behind definition_hash"""
+        return json.dumps(
+            definition, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+
+    @staticmethod
+    def hash_definition(definition) -> str:
+        return hashlib.sha256(ReportType.serialize_definition(definition)).hexdigest()
+
     def to_data(self):
         return ReportType.ReportTypeData(id=self.id, updated_at=self.updated_at)
 
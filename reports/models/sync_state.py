@@ -0,0 +1,107 @@
+"""
+Versioning used by the report type delta sync.
+
+Every change to a report type or category takes a new number from a per
+tenant sequence and stores it in the row's `sync_version`. The same number is
+written into `ReportTypeSyncState` for every authority that can see the change,
+so "has anything changed for me since version N" is a single primary key lookup.
+"""
+
+from typing import Iterable, Optional
+
+from django.db import connection, models
+
+from accounts.models import Authority
+
+
+SYNC_VERSION_SEQUENCE = "reports_sync_version_seq"
+
+
+def next_sync_version() -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(f"select nextval('{SYNC_VERSION_SEQUENCE}')")
+        return cursor.fetchone()[0]
+
+
+class ReportTypeSyncState(models.Model):
+    authority = models.OneToOneField(
+        Authority,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="report_type_sync_state",
+    )
+    version = models.BigIntegerField(default=0)
+
+    @staticmethod
+    def current_version(authority: Authority) -> int:
+        state = ReportTypeSyncState.objects.filter(authority_id=authority.id).first()
+        return state.version if state else 0
+
+    @staticmethod
+    def bump(version: int, authority_ids: Optional[Iterable[int]] = None):
+        """
+        mark `version` as the latest change seen by the given authorities and all
+        of their child authorities. `authority_ids=None` means every authority.
+        """
+        if authority_ids is None:
+            source = "select id from accounts_authority"
+            params = [version]
+        else:
+            source = (
+                "select distinct d.id from unnest(%s::bigint[]) as a(id),"
+                " inherit_authority_down(a.id) d"
+            )
+            params = [version, list(authority_ids)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                insert into reports_reporttypesyncstate (authority_id, version)
+                select s.id, %s from ({source}) s
+                on conflict (authority_id) do update
+                set version = greatest(
+                    reports_reporttypesyncstate.version, excluded.version
+                )
+                """,
+                params,
+            )
+
+
+class ReportTypeRemoval(models.Model):
+    """
+    a report type that stopped being visible to an authority (and its children)
+    at `version`: deleted, unassigned or lost through the authority hierarchy.
+    `authority=None` means it was visible to every authority before.
+    """
+
+    report_type_id = models.UUIDField()
+    authority = models.ForeignKey(
+        Authority, null=True, blank=True, on_delete=models.CASCADE
+    )
+    version = models.BigIntegerField(db_index=True)
+
+    @staticmethod
+    def record(version: int, report_type_ids, authority_ids):
+        """one row per (report type, authority), `authority_ids` may hold None."""
+        ReportTypeRemoval.objects.bulk_create(
+            [
+                ReportTypeRemoval(
+                    report_type_id=report_type_id,
+                    authority_id=authority_id,
+                    version=version,
+                )
+                for report_type_id in report_type_ids
+                for authority_id in authority_ids
+            ]
+        )
+
+    @staticmethod
+    def removed_ids(authority: Authority, since: int):
+        """report types removed after `since` that `authority` could see."""
+        return set(
+            ReportTypeRemoval.objects.filter(version__gt=since)
+            .filter(
+                models.Q(authority__isnull=True)
+                | models.Q(authority_id__in=[a.id for a in authority.all_inherits_up()])
+            )
+            .values_list("report_type_id", flat=True)
+        )
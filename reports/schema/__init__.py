@@ -1,2 +1,3 @@
 from .query import Query
 from .mutation import Mutation
+from .subscription import Subscription
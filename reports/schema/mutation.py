@@ -5,6 +5,8 @@ from .mutations import (
     SubmitIncidentReport,
     SubmitFollowupReport,
     SubmitImage,
+    RequestImageUploadMutation,
+    ConfirmImageUploadMutation,
     AdminCategoryCreateMutation,
     AdminCategoryUpdateMutation,
     AdminCategoryDeleteMutation,
@@ -22,6 +24,8 @@ class Mutation(graphene.ObjectType):
     submit_incident_report = SubmitIncidentReport.Field()
     submit_followup_report = SubmitFollowupReport.Field()
     submit_image = SubmitImage.Field()
+    request_image_upload = RequestImageUploadMutation.Field()
+    confirm_image_upload = ConfirmImageUploadMutation.Field()
     admin_category_create = AdminCategoryCreateMutation.Field()
     admin_category_update = AdminCategoryUpdateMutation.Field()
     admin_category_delete = AdminCategoryDeleteMutation.Field()
@@ -8,6 +8,7 @@ from .admin_reporter_notification_create_mutation import *
 from .admin_reporter_notification_update_mutation import *
 from .admin_reporter_notification_delete_mutation import *
 from .submit_image_mutation import *
+from .direct_image_upload_mutation import *
 from .submit_incident_report_mutation import *
 from .submit_zero_report_mutation import *
 from .submit_followup_report_mutation import *
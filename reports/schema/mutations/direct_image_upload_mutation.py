@@ -0,0 +1,59 @@
+import graphene
+from graphql import GraphQLError
+from graphql_jwt.decorators import login_required
+
+from common.direct_upload import InvalidUpload, confirm_upload, issue_upload
+from common.thumbnails import thumbnail_url
+from common.types import DirectUploadType
+from reports.models.report import Image
+
+
+class RequestImageUploadMutation(graphene.Mutation):
+    class Arguments:
+        report_id = graphene.UUID(required=True)
+        filename = graphene.String(required=True)
+
+    upload = graphene.Field(DirectUploadType)
+
+    @staticmethod
+    @login_required
+    def mutate(root, info, report_id, filename):
+        Image.get_report(report_id)
+        upload = issue_upload(
+            "reports",
+            filename,
+            report_id=str(report_id),
+            user_id=info.context.user.id,
+        )
+        return RequestImageUploadMutation(upload=upload)
+
+
+class ConfirmImageUploadMutation(graphene.Mutation):
+    class Arguments:
+        report_id = graphene.UUID(required=True)
+        token = graphene.String(required=True)
+        is_cover = graphene.Boolean(required=False)
+        image_id = graphene.UUID(required=False)
+
+    id = graphene.UUID()
+    file = graphene.String()
+    thumbnail = graphene.String()
+    # False while the thumbnail is generated, `thumbnail` is null until then
+    thumbnail_ready = graphene.Boolean()
+
+    @staticmethod
+    @login_required
+    def mutate(root, info, report_id, token, is_cover=False, image_id=None):
+        try:
+            name = confirm_upload(
+                token, report_id=str(report_id), user_id=info.context.user.id
+            )
+        except InvalidUpload as e:
+            raise GraphQLError(str(e))
+        image = Image.register_for_report(report_id, name, image_id, is_cover)
+        return ConfirmImageUploadMutation(
+            id=image.id,
+            file=image.file.url,
+            thumbnail=thumbnail_url(image),
+            thumbnail_ready=image.thumbnail_ready,
+        )
@@ -1,9 +1,9 @@
 import graphene
-from easy_thumbnails.files import get_thumbnailer
 from graphql_jwt.decorators import login_required
 from graphene_file_upload.scalars import Upload
 
-from reports.models.report import FollowUpReport, Image, IncidentReport
+from common.thumbnails import thumbnail_url
+from reports.models.report import Image
 
 
 class SubmitImage(graphene.Mutation):
@@ -18,26 +18,16 @@ class SubmitImage(graphene.Mutation):
     id = graphene.UUID()
     file = graphene.String()
     thumbnail = graphene.String()
+    # False while the thumbnail is generated, `thumbnail` is null until then
+    thumbnail_ready = graphene.Boolean()
 
     @staticmethod
     @login_required
     def mutate(root, info, report_id, image, is_cover, image_id):
-        try:
-            report = IncidentReport.objects.get(pk=report_id)
-        except IncidentReport.DoesNotExist:
-            report = FollowUpReport.objects.get(pk=report_id)
-
-        image = Image.objects.create(
-            report=report,
-            file=image,
-            id=image_id,
-        )
-
-        if is_cover:
-            report.cover_image_id = image.id
-            report.save(update_fields=("cover_image_id"))
+        image = Image.create_for_report(report_id, image, image_id, is_cover)
         return SubmitImage(
             id=image.id,
             file=image.file.url,
-            thumbnail=get_thumbnailer(image.file)["thumbnail"].url,
+            thumbnail=thumbnail_url(image),
+            thumbnail_ready=image.thumbnail_ready,
         )
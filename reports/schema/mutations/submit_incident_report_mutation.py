@@ -2,12 +2,11 @@ import graphene
 from graphql_jwt.decorators import login_required
 from graphene.types.generic import GenericScalar
 
-from cases.tasks import evaluate_case_definition
+from cases.tasks import evaluate_report_rules
 from reports.models.report import IncidentReport
 from django.contrib.gis.geos import Point
 from reports.models.report_type import ReportType
 from reports.schema.types import IncidentReportType
-from reports.tasks import evaluate_reporter_notification
 from threads.models import Thread
 
 
@@ -61,7 +60,6 @@ class SubmitIncidentReport(graphene.Mutation):
         else:
             report.resolve_relevant_authorities_by_area()
 
-        evaluate_reporter_notification.delay(report.id)
-        evaluate_case_definition.delay(report.id)
+        evaluate_report_rules.delay(report.id)
 
         return SubmitIncidentReport(result=report)
@@ -1,7 +1,8 @@
 import graphene
+from django.conf import settings
 from graphql_jwt.decorators import login_required
 
-from reports.models.report import ZeroReport
+from reports.models.report import ZeroReport, ZeroReportDailyCount
 
 
 class SubmitZeroReportMutation(graphene.Mutation):
@@ -11,5 +12,9 @@ class SubmitZeroReportMutation(graphene.Mutation):
     @login_required
     def mutate(root, info):
         user = info.context.user
+        if settings.ZERO_REPORT_INGESTION_MODE == "counter" and user.is_authority_user:
+            ZeroReportDailyCount.increment(user.id, user.authorityuser.authority_id)
+            return SubmitZeroReportMutation(id=None)
+
         report = ZeroReport.objects.create(reported_by=user)
         return SubmitZeroReportMutation(id=report.id)
@@ -13,6 +13,7 @@ from .types import (
     AdminReporterNotificationQueryType,
     CategoryType,
     IncidentReportType,
+    ReportTypeDeltaSyncOutputType,
     ReportTypeSyncInputType,
     ReportTypeSyncOutputType,
     ReportTypeType,
@@ -31,6 +32,9 @@ class Query(graphene.ObjectType):
             )
         },
     )
+    sync_report_types_delta = graphene.Field(
+        ReportTypeDeltaSyncOutputType, sync_token=graphene.String(required=False)
+    )
     category = graphene.Field(CategoryType, id=graphene.ID(required=True))
     report_type = graphene.Field(ReportTypeType, id=graphene.ID(required=True))
     incident_reports = DjangoPaginationConnectionField(IncidentReportType)
@@ -55,8 +59,7 @@ class Query(graphene.ObjectType):
     @login_required
     def resolve_my_report_types(root, info):
         user = info.context.user
-        authority = user.authorityuser.authority
-        return ReportType.filter_by_authority(authority)
+        return ReportType.cached_filter_by_authority(user.authorityuser.authority_id)
 
     @staticmethod
     @login_required
@@ -73,6 +76,17 @@ class Query(graphene.ObjectType):
             category_list=Category.objects.all(),
         )
 
+    @staticmethod
+    @login_required
+    def resolve_sync_report_types_delta(root, info, sync_token=None):
+        user = info.context.user
+        authority = user.authorityuser.authority
+        try:
+            version = int(sync_token) if sync_token else None
+        except ValueError:
+            version = None
+        return ReportType.sync_delta_by_authority(authority, version)
+
     @staticmethod
     @login_required
     def resolve_category(root, info, id):
@@ -0,0 +1,16 @@
+import graphene
+from graphql_jwt.decorators import login_required
+
+from .types import IncidentReportType
+
+
+class Subscription(graphene.ObjectType):
+    new_incident_report = graphene.Field(
+        IncidentReportType, authority_id=graphene.ID(required=True)
+    )
+
+    @staticmethod
+    @login_required
+    def resolve_new_incident_report(root, info, authority_id):
+        # root is the report of the event, see common.subscriptions
+        return root
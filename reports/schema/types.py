@@ -1,17 +1,27 @@
 import graphene
 import django_filters
-from easy_thumbnails.files import get_thumbnailer
 from graphene.types.generic import GenericScalar
 from graphene_django import DjangoObjectType
 from django.db.models import Q
 
 from accounts.schema.types import UserType
+from common.thumbnails import thumbnail_url
 from common.types import AdminValidationProblem
+from common.variants import variant_url
 
 from reports.models import ReportType, Category, IncidentReport, ReporterNotification
 from reports.models.report import Image, FollowUpReport
 
 
+INCIDENT_REPORT_FILTER_FIELDS = {
+    "created_at": ["lte", "gte"],
+    "incident_date": ["lte", "gte"],
+    "relevant_authorities__name": ["istartswith", "exact"],
+    "relevant_authorities__id": ["in"],
+    "report_type__id": ["in"],
+}
+
+
 class CategoryType(DjangoObjectType):
     class Meta:
         model = Category
@@ -39,12 +49,17 @@ class ReportTypeType(DjangoObjectType):
 
 class ImageType(DjangoObjectType):
     thumbnail = graphene.String()
+    variant = graphene.String(size=graphene.Int(required=True))
 
     class Meta:
         model = Image
 
     def resolve_thumbnail(self, info):
-        return get_thumbnailer(self.file)["thumbnail"].url
+        return thumbnail_url(self)
+
+    def resolve_variant(self, info, size):
+        url = variant_url(self, size)
+        return info.context.build_absolute_uri(url) if url else None
 
 
 class FollowupType(DjangoObjectType):
@@ -96,13 +111,7 @@ class IncidentReportType(DjangoObjectType):
             "thread_id",
             "followups",
         ]
-        filter_fields = {
-            "created_at": ["lte", "gte"],
-            "incident_date": ["lte", "gte"],
-            "relevant_authorities__name": ["istartswith", "exact"],
-            "relevant_authorities__id": ["in"],
-            "report_type__id": ["in"],
-        }
+        filter_fields = INCIDENT_REPORT_FILTER_FIELDS
 
     def resolve_gps_location(self, info):
         return self.gps_location_str
@@ -161,6 +170,17 @@ class ReportTypeSyncOutputType(graphene.ObjectType):
     category_list = graphene.List(CategoryType, required=False)
 
 
+class ReportTypeDeltaSyncOutputType(graphene.ObjectType):
+    sync_token = graphene.String(required=True)
+    unchanged = graphene.Boolean(required=True)
+    updated_list = graphene.List(graphene.NonNull(ReportTypeType), required=True)
+    removed_ids = graphene.List(graphene.NonNull(graphene.UUID), required=True)
+    category_list = graphene.List(graphene.NonNull(CategoryType), required=True)
+
+    def resolve_sync_token(self, info):
+        return str(self.sync_token)
+
+
 class AdminCategoryQueryType(DjangoObjectType):
     class Meta:
         model = Category
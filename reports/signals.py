@@ -1,14 +1,38 @@
-import json
+import threading
+import weakref
 
 import channels
 from asgiref.sync import async_to_sync
-from django.db.models.signals import m2m_changed
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver
 
 from accounts.models import Authority
-from reports.consumers import new_report_group_name
-from reports.models import IncidentReport
-from django.db import connection
+from common.media_gc import register_media_owner
+from common.thumbnails import register_thumbnail_field
+from common.utils import group_send_many
+from common.variants import register_variant_model
+from reports.consumers import (
+    TENANT_BROADCAST,
+    new_report_group_name,
+    tenant_report_group_name,
+)
+from reports.models import (
+    Category,
+    Image,
+    IncidentReport,
+    ReportEvent,
+    ReportType,
+    ReportTypeRemoval,
+    ReportTypeSyncState,
+)
+from reports.models.sync_state import next_sync_version
+
+register_thumbnail_field(Image)
+register_variant_model(Image, "report-image")
+register_media_owner(Image, expired=Image.expired_media)
 
 
 @receiver(
@@ -17,16 +41,192 @@ from django.db import connection
     dispatch_uid="report_signal_to_ws",
 )
 def on_create_report(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action != "post_add" or reverse or not pk_set:
+        return
+    # authorities added several times in a transaction are sent in one batch
+    batches = _pending_new_report_batches()
+    batch = batches.get(instance.id)
+    if batch is not None and batch[0]() is not None:
+        batch[1].update(pk_set)
+        return
+    pending = set(pk_set)
+    schema_name = connection.schema_name
+    report_id = instance.id
+
+    def send():
+        if batches.get(report_id, (None, None))[1] is pending:
+            del batches[report_id]
+        broadcast_new_report(schema_name, report_id, pending)
+
+    batches[report_id] = (weakref.ref(send), pending)
+    transaction.on_commit(send)
+
+
+# batches of new report authorities waiting for a commit, per thread like the
+# connections. A batch only holds a weak reference to its on_commit callback:
+# once a rollback has discarded the callback, the reference is dead and the
+# batch is stale.
+_new_report_batches = threading.local()
+
+
+def _pending_new_report_batches():
+    batches = getattr(_new_report_batches, "batches", None)
+    if batches is None:
+        batches = _new_report_batches.batches = {}
+    for report_id in [key for key, (ref, _) in batches.items() if ref() is None]:
+        del batches[report_id]
+    return batches
+
+
+def broadcast_new_report(schema_name, report_id, authority_ids):
+    """
+    send the report once to each of the authorities and their ancestors. The
+    ancestors are resolved in one query and the payload is serialized once.
+    The event is recorded first, for clients that reconnect later.
+    """
+    report = IncidentReport.objects.select_related(
+        "report_type", "report_type__category"
+    ).get(pk=report_id)
+    target_ids = Authority.inherits_up_ids(authority_ids)
+    event = ReportEvent.record(report.id, target_ids, report.template_context())
+    message = {
+        "type": "new.report",
+        "report_id": str(report.id),
+        "event_id": event.id,
+        "authority_ids": target_ids,
+        "text": event.text,
+    }
+    if settings.REPORT_BROADCAST_MODE == TENANT_BROADCAST:
+        # once for the tenant, the consumers keep the reports of their authority
+        group_names = [tenant_report_group_name(schema_name)]
+    else:
+        group_names = [
+            new_report_group_name(schema_name, authority_id)
+            for authority_id in target_ids
+        ]
+    channel_layer = channels.layers.get_channel_layer()
+    async_to_sync(group_send_many)(channel_layer, group_names, message)
+
+
+@receiver(post_save, sender=ReportType, dispatch_uid="report_type_sync_version")
+def on_report_type_saved(sender, instance, **kwargs):
+    authority_ids = list(instance.authorities.values_list("id", flat=True))
+    if instance.deleted_at:
+        ReportTypeRemoval.record(
+            instance.sync_version, [instance.pk], authority_ids or [None]
+        )
+    ReportTypeSyncState.bump(instance.sync_version, authority_ids or None)
+
+
+@receiver(pre_delete, sender=ReportType, dispatch_uid="report_type_deleted_sync")
+def on_report_type_deleted(sender, instance, **kwargs):
+    authority_ids = list(instance.authorities.values_list("id", flat=True))
+    version = next_sync_version()
+    ReportTypeRemoval.record(version, [instance.pk], authority_ids or [None])
+    ReportTypeSyncState.bump(version, authority_ids or None)
+
+
+@receiver(post_save, sender=Category, dispatch_uid="category_sync_version")
+def on_category_saved(sender, instance, **kwargs):
+    ReportTypeSyncState.bump(instance.sync_version)
+
+
+@receiver(
+    m2m_changed,
+    sender=ReportType.authorities.through,
+    dispatch_uid="report_type_authorities_sync_version",
+)
+def on_report_type_authorities_changed(
+    sender, instance, action, reverse, model, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    version = next_sync_version()
+    if reverse:
+        report_type_ids = (
+            pk_set
+            if pk_set is not None
+            else set(instance.reportTypes.values_list("id", flat=True))
+        )
+        # rarely used path (authority.reportTypes.add()), notify every authority
+        visible_to_all = True
+        if action in ("post_remove", "pre_clear"):
+            ReportTypeRemoval.record(version, report_type_ids, [instance.pk])
+        elif action == "post_add":
+            # report types that had no authority before were visible to everyone
+            ReportTypeRemoval.record(
+                version,
+                ReportType.objects_original.filter(pk__in=report_type_ids)
+                .annotate(authority_count=Count("authorities"))
+                .filter(authority_count=1)
+                .values_list("id", flat=True),
+                [None],
+            )
+    else:
+        report_type_ids = {instance.pk}
+        # a report type without authorities is visible to everyone, so a change
+        # from or to that state concerns every authority.
+        visible_to_all = (
+            action == "pre_clear"
+            or not instance.authorities.exclude(pk__in=pk_set).exists()
+        )
+        if action == "post_remove":
+            ReportTypeRemoval.record(version, report_type_ids, pk_set)
+        elif action == "pre_clear":
+            ReportTypeRemoval.record(
+                version,
+                report_type_ids,
+                list(instance.authorities.values_list("id", flat=True)),
+            )
+        elif action == "post_add" and visible_to_all:
+            ReportTypeRemoval.record(version, report_type_ids, [None])
+
+    ReportType.objects_original.filter(pk__in=report_type_ids).update(
+        sync_version=version
+    )
+    ReportTypeSyncState.bump(version, None if visible_to_all else pk_set)
+
+
+@receiver(
+    m2m_changed,
+    sender=Authority.inherits.through,
+    dispatch_uid="authority_inherits_sync_version",
+)
+def on_authority_hierarchy_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+    if reverse:
+        parent_ids = [instance.pk]
+        child_ids = (
+            pk_set
+            if pk_set is not None
+            else instance.authority_inherits.values_list("id", flat=True)
+        )
+    else:
+        parent_ids = (
+            pk_set
+            if pk_set is not None
+            else instance.inherits.values_list("id", flat=True)
+        )
+        child_ids = [instance.pk]
+    parent_ids, child_ids = list(parent_ids), list(child_ids)
+    if not parent_ids or not child_ids:
+        return
+
+    # the child authorities (and theirs) gain or lose the report types of the
+    # parents and their ancestors, the rest of the tenant is not concerned
+    report_type_ids = (
+        ReportType.objects_original.filter(
+            authorities__in=Authority.inherits_up_ids(parent_ids)
+        )
+        .distinct()
+        .values_list("id", flat=True)
+    )
+    version = next_sync_version()
     if action == "post_add":
-        schema_name = connection.schema_name
-        for authority_id in pk_set:
-            for authority in Authority.objects.get(pk=authority_id).all_inherits_up():
-                group_name = new_report_group_name(schema_name, authority.id)
-                channel_layer = channels.layers.get_channel_layer()
-                async_to_sync(channel_layer.group_send)(
-                    group_name,
-                    {
-                        "type": "new.report",
-                        "text": json.dumps(instance.template_context(), default=str),
-                    },
-                )
+        ReportType.objects_original.filter(pk__in=list(report_type_ids)).update(
+            sync_version=version
+        )
+    else:
+        ReportTypeRemoval.record(version, report_type_ids, child_ids)
+    ReportTypeSyncState.bump(version, child_ids)
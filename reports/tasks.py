@@ -1,18 +1,17 @@
 from podd_api.celery import app
-from reports.models import IncidentReport, ReporterNotification
+from reports.models import ImageUpload, ReportEvent, ZeroReportDailyCount
 
 
 @app.task
-def evaluate_reporter_notification(report_id):
-    report = IncidentReport.objects.get(pk=report_id)
-    eval_context = report.evaluate_context()
-    for definition in ReporterNotification.objects.filter(
-        report_type=report.report_type
-    ):
-        try:
-            should_send_msg = eval_context.eval(definition.condition)
-        except:
-            should_send_msg = False
-        if should_send_msg:
-            definition.send_message(report.template_context(), report.reported_by)
-            return
+def flush_zero_reports():
+    return ZeroReportDailyCount.flush_zero_reports()
+
+
+@app.task
+def expire_image_uploads():
+    return ImageUpload.expire()
+
+
+@app.task
+def trim_report_events():
+    return ReportEvent.trim()
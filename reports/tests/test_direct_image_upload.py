@@ -0,0 +1,132 @@
+import uuid
+from urllib.parse import urlparse
+
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils.timezone import now
+from graphql_jwt.testcases import JSONWebTokenClient
+
+from common.direct_upload import TOKEN_SALT
+from reports.models import IncidentReport, Image
+from reports.tests.base_testcase import BaseTestCase
+
+
+class DirectImageUploadTestCase(BaseTestCase):
+    client_class = JSONWebTokenClient
+
+    request_query = """
+        mutation requestImageUpload($reportId: UUID!, $filename: String!) {
+            requestImageUpload(reportId: $reportId, filename: $filename) {
+                upload {
+                    url
+                    fields
+                    token
+                }
+            }
+        }
+    """
+
+    confirm_query = """
+        mutation confirmImageUpload($reportId: UUID!, $token: String!) {
+            confirmImageUpload(reportId: $reportId, token: $token, isCover: true) {
+                id
+                file
+            }
+        }
+    """
+
+    def setUp(self):
+        super(DirectImageUploadTestCase, self).setUp()
+        self.report = IncidentReport.objects.create(
+            id=uuid.uuid4(),
+            data={},
+            reported_by=self.user,
+            incident_date=now(),
+            report_type=self.mers_report_type,
+        )
+        self.small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04"
+            b"\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02"
+            b"\x02\x4c\x01\x00\x3b"
+        )
+        self.client.authenticate(self.user)
+
+    def request_upload(self):
+        result = self.client.execute(
+            self.request_query,
+            {"reportId": str(self.report.id), "filename": "small.gif"},
+        )
+        self.assertIsNone(result.errors, msg=result.errors)
+        return result.data["requestImageUpload"]["upload"]
+
+    def confirm(self, token):
+        return self.client.execute(
+            self.confirm_query, {"reportId": str(self.report.id), "token": token}
+        )
+
+    def test_upload_then_confirm(self):
+        upload = self.request_upload()
+        response = self.client.post(
+            urlparse(upload["url"]).path,
+            {
+                **upload["fields"],
+                "file": SimpleUploadedFile("small.gif", self.small_gif),
+            },
+        )
+        self.assertEqual(204, response.status_code)
+
+        result = self.confirm(upload["token"])
+        self.assertIsNone(result.errors, msg=result.errors)
+        image = Image.objects.get(pk=result.data["confirmImageUpload"]["id"])
+        self.assertEqual(self.report.id, image.report_id)
+        self.assertEqual(self.small_gif, image.file.read())
+        self.report.refresh_from_db()
+        self.assertEqual(image.id, self.report.cover_image_id)
+
+    def test_confirmed_upload_is_deduplicated(self):
+        existing = Image.create_for_report(
+            self.report.id, SimpleUploadedFile("small.gif", self.small_gif)
+        )
+        upload = self.request_upload()
+        file = SimpleUploadedFile("small.gif", self.small_gif)
+        path = urlparse(upload["url"]).path
+        self.client.post(path, {**upload["fields"], "file": file})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.confirm(upload["token"])
+        self.assertIsNone(result.errors, msg=result.errors)
+        image = Image.objects.get(pk=result.data["confirmImageUpload"]["id"])
+        self.assertEqual(existing.content_hash, image.content_hash)
+        self.assertEqual(existing.file.name, image.file.name)
+        name = signing.loads(upload["token"], salt=TOKEN_SALT)["name"]
+        self.assertFalse(default_storage.exists(name))
+
+    def test_token_can_be_confirmed_once(self):
+        upload = self.request_upload()
+        file = SimpleUploadedFile("small.gif", self.small_gif)
+        path = urlparse(upload["url"]).path
+        self.client.post(path, {**upload["fields"], "file": file})
+
+        self.assertIsNone(self.confirm(upload["token"]).errors)
+        self.assertIsNotNone(self.confirm(upload["token"]).errors)
+        self.assertEqual(1, Image.objects.filter(report_id=self.report.id).count())
+
+    def test_confirm_before_upload(self):
+        upload = self.request_upload()
+        result = self.confirm(upload["token"])
+        self.assertIsNotNone(result.errors)
+        self.assertEqual(0, Image.objects.count())
+
+    def test_confirm_with_tampered_token(self):
+        upload = self.request_upload()
+        result = self.confirm(upload["token"] + "x")
+        self.assertIsNotNone(result.errors)
+
+    def test_upload_url_can_be_used_once(self):
+        upload = self.request_upload()
+        path = urlparse(upload["url"]).path
+        file = SimpleUploadedFile("small.gif", self.small_gif)
+        self.assertEqual(204, self.client.post(path, {"file": file}).status_code)
+        file = SimpleUploadedFile("small.gif", self.small_gif)
+        self.assertEqual(409, self.client.post(path, {"file": file}).status_code)
@@ -0,0 +1,137 @@
+import json
+import uuid
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils.timezone import now
+from graphql_jwt.shortcuts import get_token
+
+from reports.models import Image, ImageUpload, IncidentReport
+from reports.tests.base_testcase import BaseTestCase
+
+small_gif = (
+    b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04"
+    b"\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02"
+    b"\x02\x4c\x01\x00\x3b"
+)
+
+
+class ImageUploadTestCase(BaseTestCase):
+    def setUp(self):
+        super(ImageUploadTestCase, self).setUp()
+        self.report = IncidentReport.objects.create(
+            id=uuid.uuid4(),
+            data={"symptom": "cough", "number_of_sick": 1},
+            reported_by=self.user,
+            incident_date=now(),
+            report_type=self.mers_report_type,
+        )
+        self.auth = {"HTTP_AUTHORIZATION": f"JWT {get_token(self.user)}"}
+
+    def start(self, **params):
+        response = self.client.post(
+            "/api/image-uploads/",
+            json.dumps(
+                {
+                    "reportId": str(self.report.id),
+                    "filename": "small.gif",
+                    "size": len(small_gif),
+                    **params,
+                }
+            ),
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(201, response.status_code)
+        return response.json()["uploadId"]
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.put(
+            f"/api/image-uploads/{upload_id}/?offset={offset}",
+            data,
+            content_type="application/octet-stream",
+            **self.auth,
+        )
+
+    def test_chunked_upload(self):
+        upload_id = self.start(isCover=True)
+        self.assertEqual(200, self.put_chunk(upload_id, 0, small_gif[:10]).status_code)
+        response = self.client.get(f"/api/image-uploads/{upload_id}/", **self.auth)
+        self.assertEqual(10, response.json()["offset"])
+
+        self.put_chunk(upload_id, 10, small_gif[10:])
+        response = self.client.post(
+            f"/api/image-uploads/{upload_id}/finalize/", **self.auth
+        )
+        self.assertEqual(200, response.status_code)
+
+        image = Image.objects.get(pk=response.json()["id"])
+        self.assertEqual(small_gif, image.file.read())
+        self.report.refresh_from_db()
+        self.assertEqual(image.id, self.report.cover_image_id)
+        self.assertEqual([], ImageUpload.objects.get(pk=upload_id).chunk_names())
+
+    def test_resume_with_wrong_offset(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, small_gif[:10])
+        response = self.put_chunk(upload_id, 0, small_gif[:10])
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(10, response.json()["offset"])
+
+    def test_finalize_incomplete_upload(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, small_gif[:10])
+        response = self.client.post(
+            f"/api/image-uploads/{upload_id}/finalize/", **self.auth
+        )
+        self.assertEqual(409, response.status_code)
+
+    def test_finalize_without_data(self):
+        upload_id = self.start(size=None)
+        response = self.client.post(
+            f"/api/image-uploads/{upload_id}/finalize/", **self.auth
+        )
+        self.assertEqual(409, response.status_code)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=10)
+    def test_too_large(self):
+        upload_id = self.start(size=None)
+        self.assertEqual(413, self.put_chunk(upload_id, 0, small_gif).status_code)
+
+    def test_chunk_past_declared_size(self):
+        upload_id = self.start()
+        response = self.put_chunk(upload_id, 0, small_gif + b"\x00")
+        self.assertEqual(413, response.status_code)
+        self.assertEqual(0, ImageUpload.objects.get(pk=upload_id).offset)
+
+        self.put_chunk(upload_id, 0, small_gif)
+        response = self.client.post(
+            f"/api/image-uploads/{upload_id}/finalize/", **self.auth
+        )
+        self.assertEqual(200, response.status_code)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=10)
+    def test_declared_size_too_large(self):
+        response = self.client.post(
+            "/api/image-uploads/",
+            json.dumps(
+                {"reportId": str(self.report.id), "filename": "a.gif", "size": 11}
+            ),
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(413, response.status_code)
+
+    def test_expire(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, small_gif[:10])
+        upload = ImageUpload.objects.get(pk=upload_id)
+        self.assertEqual(0, ImageUpload.expire(now() - timedelta(hours=1)))
+
+        self.assertEqual(1, ImageUpload.expire(now() + timedelta(seconds=1)))
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+        self.assertEqual([], upload.chunk_names())
+
+    def test_authentication_required(self):
+        response = self.client.post("/api/image-uploads/", "{}", "application/json")
+        self.assertEqual(401, response.status_code)
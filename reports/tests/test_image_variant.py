@@ -0,0 +1,124 @@
+import io
+import os
+import tempfile
+import time
+import uuid
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils.timezone import now
+from graphql_jwt.shortcuts import get_token
+from PIL import Image as PILImage
+
+from common import variants
+from common.variants import evict_variants, variant_url
+from reports.models import IncidentReport, Image
+from reports.tests.base_testcase import BaseTestCase
+
+
+class ImageVariantTestCase(BaseTestCase):
+    def setUp(self):
+        super(ImageVariantTestCase, self).setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            IMAGE_VARIANT_CACHE_DIR=self.cache_dir.name,
+            IMAGE_VARIANT_SIZES=[160, 320],
+        )
+        self.settings_override.enable()
+        self.report = IncidentReport.objects.create(
+            id=uuid.uuid4(),
+            data={},
+            reported_by=self.user,
+            incident_date=now(),
+            report_type=self.mers_report_type,
+        )
+        buffer = io.BytesIO()
+        PILImage.new("RGB", (800, 600)).save(buffer, "JPEG")
+        self.image = Image.objects.create(
+            report=self.report,
+            file=SimpleUploadedFile("photo.jpg", buffer.getvalue()),
+        )
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"JWT {get_token(self.user)}"
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.cache_dir.cleanup()
+        super(ImageVariantTestCase, self).tearDown()
+
+    def read(self, response):
+        return PILImage.open(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_serve_variant(self):
+        response = self.client.get(variant_url(self.image, 320))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/jpeg", response["Content-Type"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept", response["Vary"])
+        self.assertEqual((320, 240), self.read(response).size)
+
+    def test_serve_webp_when_accepted(self):
+        response = self.client.get(
+            variant_url(self.image, 160), HTTP_ACCEPT="image/webp,*/*"
+        )
+        self.assertEqual("image/webp", response["Content-Type"])
+        self.assertEqual("WEBP", self.read(response).format)
+
+    def test_size_must_be_allowed(self):
+        self.assertIsNone(variant_url(self.image, 200))
+        url = variant_url(self.image, 160).replace("/160/", "/200/")
+        self.assertEqual(404, self.client.get(url).status_code)
+
+    def test_invalid_signature(self):
+        url = variant_url(self.image, 160)
+        self.assertEqual(404, self.client.get(url[:-2] + "x/").status_code)
+
+    def test_authentication_required(self):
+        del self.client.defaults["HTTP_AUTHORIZATION"]
+        response = self.client.get(variant_url(self.image, 160))
+        self.assertEqual(401, response.status_code)
+
+    def test_small_original_is_served(self):
+        buffer = io.BytesIO()
+        PILImage.new("RGB", (100, 100)).save(buffer, "JPEG")
+        small = Image.objects.create(
+            report=self.report,
+            file=SimpleUploadedFile("small.jpg", buffer.getvalue()),
+        )
+        response = self.client.get(variant_url(small, 160))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/jpeg", response["Content-Type"])
+        self.assertEqual((100, 100), self.read(response).size)
+
+    def test_evict_least_recently_served(self):
+        self.client.get(variant_url(self.image, 160))
+        self.client.get(variant_url(self.image, 320))
+        files = {
+            name: os.path.join(root, name)
+            for root, _, names in os.walk(self.cache_dir.name)
+            for name in names
+        }
+        small_variant = next(p for n, p in files.items() if "_160" in n)
+        large_variant = next(p for n, p in files.items() if "_320" in n)
+        old = time.time() - 60
+        os.utime(large_variant, (old, old))
+
+        evict_variants(max_size=os.path.getsize(small_variant))
+
+        self.assertTrue(os.path.exists(small_variant))
+        self.assertFalse(os.path.exists(large_variant))
+
+    def test_cache_is_scanned_once_until_over_the_limit(self):
+        with patch.object(
+            variants, "evict_variants", wraps=variants.evict_variants
+        ) as mock_evict:
+            self.client.get(variant_url(self.image, 160))
+            self.client.get(variant_url(self.image, 320))
+            self.assertEqual(1, mock_evict.call_count)
+
+            with override_settings(IMAGE_VARIANT_CACHE_MAX_SIZE=1):
+                self.client.get(
+                    variant_url(self.image, 160), HTTP_ACCEPT="image/webp,*/*"
+                )
+            self.assertEqual(2, mock_evict.call_count)
@@ -0,0 +1,98 @@
+import uuid
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils.timezone import now
+
+from common.media_gc import collect_media
+from reports.models import IncidentReport, Image
+from reports.tests.base_testcase import BaseTestCase
+from threads.models import Comment, CommentAttachment, Thread
+
+
+class MediaGarbageCollectionTestCase(BaseTestCase):
+    def setUp(self):
+        super(MediaGarbageCollectionTestCase, self).setUp()
+        self.report = IncidentReport.objects.create(
+            id=uuid.uuid4(),
+            data={},
+            reported_by=self.user,
+            incident_date=now(),
+            report_type=self.mers_report_type,
+        )
+        self.small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04"
+            b"\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02"
+            b"\x02\x4c\x01\x00\x3b"
+        )
+        self.cutoff = now() - timedelta(days=30)
+        self.long_ago = self.cutoff - timedelta(days=1)
+
+    def create_image(self, name="small.gif", **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(
+                report=self.report,
+                file=SimpleUploadedFile(name, self.small_gif),
+                **kwargs,
+            )
+        image.refresh_from_db()
+        return image
+
+    def assertCollected(self, image):
+        storage = image.file.storage
+        self.assertFalse(Image._base_manager.filter(pk=image.pk).exists())
+        self.assertFalse(storage.exists(image.file.name))
+        for name in image.thumbnails.values():
+            self.assertFalse(image.file.thumbnail_storage.exists(name))
+
+    def test_collect_expired_image(self):
+        image = self.create_image(deleted_at=self.long_ago)
+        self.assertTrue(image.thumbnails)
+
+        self.assertEqual(1, collect_media(self.cutoff))
+        self.assertCollected(image)
+
+    def test_recently_deleted_image_is_kept(self):
+        image = self.create_image(deleted_at=now())
+        self.assertEqual(0, collect_media(self.cutoff))
+        self.assertTrue(image.file.storage.exists(image.file.name))
+
+    def test_images_of_deleted_report(self):
+        image = self.create_image()
+        IncidentReport.objects.filter(pk=self.report.id).update(
+            deleted_at=self.long_ago
+        )
+        self.assertEqual(1, collect_media(self.cutoff))
+        self.assertCollected(image)
+
+    def test_shared_file_is_kept_until_last_row(self):
+        image = self.create_image(deleted_at=self.long_ago)
+        duplicate = Image.objects.create(report=self.report, file=image.file.name)
+
+        self.assertEqual(1, collect_media(self.cutoff))
+        self.assertFalse(Image._base_manager.filter(pk=image.pk).exists())
+        self.assertTrue(image.file.storage.exists(image.file.name))
+
+        Image.objects.filter(pk=duplicate.pk).update(deleted_at=self.long_ago)
+        self.assertEqual(1, collect_media(self.cutoff))
+        self.assertFalse(image.file.storage.exists(image.file.name))
+
+    def test_resume_in_batches(self):
+        images = [self.create_image(deleted_at=self.long_ago) for _ in range(3)]
+        self.assertEqual(2, collect_media(self.cutoff, batch_size=1, max_batches=2))
+        self.assertEqual(1, collect_media(self.cutoff, batch_size=1))
+        for image in images:
+            self.assertCollected(image)
+
+    def test_collect_expired_comment_attachment(self):
+        comment = Comment.objects.create(
+            thread=Thread.objects.create(), body="body", created_by=self.user
+        )
+        attachment = CommentAttachment.objects.create(
+            comment=comment,
+            file=SimpleUploadedFile("small.gif", self.small_gif),
+            deleted_at=self.long_ago,
+        )
+        self.assertEqual(1, collect_media(self.cutoff))
+        self.assertFalse(CommentAttachment._base_manager.exists())
+        self.assertFalse(attachment.file.storage.exists(attachment.file.name))
@@ -0,0 +1,54 @@
+from graphql_jwt.testcases import JSONWebTokenClient
+
+from reports.models import ReportType
+from reports.tests.base_testcase import BaseTestCase
+
+query = """
+        query myReportTypes {
+          myReportTypes {
+            id
+            name
+            definition
+            category {
+              name
+            }
+          }
+        }
+        """
+
+
+class MyReportTypesTestCase(BaseTestCase):
+    client_class = JSONWebTokenClient
+
+    def test_query(self):
+        self.client.authenticate(self.jatujak_reporter)
+        result = self.client.execute(query)
+        self.assertIsNone(result.errors)
+        self.assertEqual(3, len(result.data["myReportTypes"]))
+
+    def test_result_is_cached(self):
+        ReportType.cached_filter_by_authority(self.cm.id)
+        # only the version lookup
+        with self.assertNumQueries(1):
+            report_types = ReportType.cached_filter_by_authority(self.cm.id)
+            categories = [report_type.category.name for report_type in report_types]
+            self.assertIn("environment", categories)
+        self.assertEqual(4, len(report_types))
+
+    def test_invalidate_on_report_type_change(self):
+        ReportType.cached_filter_by_authority(self.cm.id)
+        self.wildfire_report_type.delete()
+        self.assertEqual(3, len(ReportType.cached_filter_by_authority(self.cm.id)))
+
+    def test_invalidate_on_category_change(self):
+        ReportType.cached_filter_by_authority(self.cm.id)
+        self.env_category.name = "env"
+        self.env_category.save()
+        report_types = ReportType.cached_filter_by_authority(self.cm.id)
+        categories = [report_type.category.name for report_type in report_types]
+        self.assertIn("env", categories)
+
+    def test_invalidate_on_hierarchy_change(self):
+        self.assertEqual(3, len(ReportType.cached_filter_by_authority(self.bkk.id)))
+        self.bkk.inherits.add(self.cm)
+        self.assertEqual(4, len(ReportType.cached_filter_by_authority(self.bkk.id)))
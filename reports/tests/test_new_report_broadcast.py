@@ -0,0 +1,91 @@
+import json
+import uuid
+from unittest.mock import AsyncMock, patch
+
+from django.db import transaction
+from django.test import override_settings
+from django.utils.timezone import now
+
+from reports.consumers import new_report_group_name, tenant_report_group_name
+from reports.models import IncidentReport
+from reports.tests.base_testcase import BaseTestCase
+
+
+class NewReportBroadcastTestCase(BaseTestCase):
+    def setUp(self):
+        super(NewReportBroadcastTestCase, self).setUp()
+        patcher = patch("reports.signals.channels.layers.get_channel_layer")
+        self.channel_layer = patcher.start().return_value
+        self.channel_layer.group_send = AsyncMock()
+        self.addCleanup(patcher.stop)
+
+    def create_report(self):
+        return IncidentReport.objects.create(
+            id=uuid.uuid4(),
+            data={"symptom": "cough"},
+            reported_by=self.user,
+            incident_date=now(),
+            report_type=self.mers_report_type,
+        )
+
+    def sent_groups(self):
+        return [c.args[0] for c in self.channel_layer.group_send.call_args_list]
+
+    def test_send_once_per_ancestor_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self.create_report()
+            report.relevant_authorities.add(self.jatujak)
+            report.relevant_authorities.add(self.cm, self.bkk)
+            self.channel_layer.group_send.assert_not_called()
+
+        schema = "public"
+        self.assertCountEqual(
+            [
+                new_report_group_name(schema, authority.id)
+                for authority in (self.thailand, self.bkk, self.jatujak, self.cm)
+            ],
+            self.sent_groups(),
+        )
+        messages = [c.args[1] for c in self.channel_layer.group_send.call_args_list]
+        self.assertTrue(all(message is messages[0] for message in messages))
+        self.assertEqual(str(report.id), json.loads(messages[0]["text"])["report_id"])
+
+    @override_settings(REPORT_BROADCAST_MODE="tenant")
+    def test_send_once_per_tenant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self.create_report()
+            report.relevant_authorities.add(self.jatujak, self.cm)
+
+        self.assertEqual([tenant_report_group_name("public")], self.sent_groups())
+        message = self.channel_layer.group_send.call_args.args[1]
+        self.assertCountEqual(
+            [self.thailand.id, self.bkk.id, self.jatujak.id, self.cm.id],
+            message["authority_ids"],
+        )
+
+    def test_nothing_sent_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            report = self.create_report()
+            report.relevant_authorities.add(self.jatujak)
+        self.assertEqual(1, len(callbacks))
+        self.channel_layer.group_send.assert_not_called()
+
+    def test_batch_is_not_reused_after_rollback(self):
+        report = self.create_report()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    report.relevant_authorities.add(self.jatujak)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            report.relevant_authorities.add(self.cm)
+
+        self.assertEqual(1, len(callbacks))
+        self.assertCountEqual(
+            [
+                new_report_group_name("public", authority.id)
+                for authority in (self.thailand, self.cm)
+            ],
+            self.sent_groups(),
+        )
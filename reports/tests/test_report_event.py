@@ -0,0 +1,64 @@
+import uuid
+
+from django.test import override_settings
+
+from reports.consumers import replay_new_reports
+from reports.models import ReportEvent
+from reports.tests.base_testcase import BaseTestCase
+
+
+@override_settings(
+    REPORT_EVENT_LOG_SIZE=3,
+    REPORT_EVENT_AUTHORITY_LOG_SIZE=1,
+    REPORT_EVENT_REPLAY_LIMIT=2,
+    REPORT_EVENT_TRIM_EVERY=0,
+)
+class ReportEventTestCase(BaseTestCase):
+    def record(self, *authorities):
+        return ReportEvent.record(
+            uuid.uuid4(),
+            [authority.id for authority in authorities],
+            {"report_id": uuid.uuid4()},
+        )
+
+    def test_replay_events_of_an_authority(self):
+        first = self.record(self.thailand, self.bkk)
+        self.record(self.thailand, self.cm)
+        third = self.record(self.thailand, self.bkk)
+
+        self.assertEqual([third], ReportEvent.replay(self.bkk.id, first.id))
+        self.assertEqual([], ReportEvent.replay(self.bkk.id, third.id))
+        # more events than the replay limit
+        self.assertIsNone(ReportEvent.replay(self.thailand.id, first.id - 1))
+
+        [(report_id, text)] = replay_new_reports(self.bkk.id, first.id)
+        self.assertEqual(str(third.report_id), report_id)
+        self.assertIn(f'"event_id": {third.id}', text)
+
+    @override_settings(REPORT_EVENT_REPLAY_LIMIT=10)
+    def test_log_is_bounded(self):
+        first = self.record(self.bkk)
+        events = [self.record(self.bkk) for _ in range(3)]
+        self.assertEqual(1, ReportEvent.trim())
+
+        self.assertFalse(ReportEvent.objects.filter(pk=first.pk).exists())
+        self.assertEqual(events, ReportEvent.replay(self.bkk.id, first.id))
+        # `first` was removed from the log, the client may have missed it
+        self.assertIsNone(ReportEvent.replay(self.bkk.id, first.id - 1))
+
+    @override_settings(REPORT_EVENT_TRIM_EVERY=1)
+    def test_log_is_trimmed_while_recording(self):
+        events = [self.record(self.bkk) for _ in range(6)]
+        self.assertEqual(events[-3:], list(ReportEvent.objects.order_by("id")))
+
+    @override_settings(REPORT_EVENT_AUTHORITY_LOG_SIZE=2, REPORT_EVENT_REPLAY_LIMIT=10)
+    def test_newest_events_of_an_authority_are_kept(self):
+        first, second = self.record(self.cm), self.record(self.cm)
+        bkk_events = [self.record(self.bkk) for _ in range(4)]
+        # out of the tenant bound, only the oldest event of bkk is not kept
+        self.assertEqual(1, ReportEvent.trim())
+
+        kept = ReportEvent.objects.order_by("id")
+        self.assertEqual([first, second, *bkk_events[1:]], list(kept))
+        self.assertEqual([second], ReportEvent.replay(self.cm.id, first.id))
+        self.assertIsNone(ReportEvent.replay(self.bkk.id, first.id))
@@ -1,9 +1,14 @@
+import io
 import uuid
+from unittest.mock import patch
 
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.utils.timezone import now
 from graphql_jwt.testcases import JSONWebTokenClient
 
+from common.thumbnails import thumbnail_url
+
 from reports.models import IncidentReport, Image
 from reports.tests.base_testcase import BaseTestCase
 
@@ -57,6 +62,8 @@ class ReportImageTestCase(BaseTestCase):
                             image: $image) {
                     id
                     file
+                    thumbnail
+                    thumbnailReady
                 }
             }
         """
@@ -70,6 +77,9 @@ class ReportImageTestCase(BaseTestCase):
         self.assertIsNone(result.errors, msg=result.errors)
         imgs = Image.objects.filter(report_id=self.report.id)
         self.assertEqual(1, len(imgs))
+        # generated after commit
+        self.assertIsNone(result.data["submitImage"]["thumbnail"])
+        self.assertFalse(result.data["submitImage"]["thumbnailReady"])
 
     def test_mutation_with_client_assigned_id(self):
         self.client.authenticate(self.user)
@@ -98,3 +108,58 @@ class ReportImageTestCase(BaseTestCase):
         imgs = Image.objects.filter(report_id=self.report.id)
         self.assertEqual(1, len(imgs))
         self.assertEqual(str(image_id), str(imgs[0].id))
+
+    def test_thumbnail_is_generated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            img = Image.objects.create(file=self.file, report=self.report)
+            img.refresh_from_db()
+            self.assertFalse(img.thumbnail_ready)
+        self.assertEqual(1, len(callbacks))
+        img.refresh_from_db()
+        self.assertTrue(img.thumbnail_ready)
+        self.assertIn("thumbnail", img.thumbnails)
+
+    def test_thumbnail_url_is_none_until_generated(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            img = Image.objects.create(file=self.file, report=self.report)
+        self.assertIsNone(thumbnail_url(img))
+
+    def test_thumbnail_url_does_not_touch_thumbnailer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            img = Image.objects.create(file=self.file, report=self.report)
+        img.refresh_from_db()
+        with patch("common.thumbnails.get_thumbnailer") as mock_get_thumbnailer:
+            url = thumbnail_url(img)
+            mock_get_thumbnailer.assert_not_called()
+        self.assertTrue(url.endswith(img.thumbnails["thumbnail"]))
+
+    def test_legacy_image_thumbnails_are_generated_by_the_command(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            img = Image.objects.create(file=self.file, report=self.report)
+        with patch("common.thumbnails.get_thumbnailer") as mock_get_thumbnailer:
+            self.assertIsNone(thumbnail_url(img))
+            mock_get_thumbnailer.assert_not_called()
+
+        call_command("generate_missing_thumbnails", stdout=io.StringIO())
+        img.refresh_from_db()
+        self.assertTrue(img.thumbnail_ready)
+        self.assertTrue(thumbnail_url(img).endswith(img.thumbnails["thumbnail"]))
+
+    def test_duplicate_upload_reuses_stored_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            img1 = Image.create_for_report(self.report.id, self.file)
+        img1.refresh_from_db()
+        self.assertEqual(64, len(img1.content_hash))
+        self.assertTrue(img1.thumbnail_ready)
+
+        duplicate = SimpleUploadedFile(
+            "copy.gif", self.small_gif, content_type="image/gif"
+        )
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            img2 = Image.create_for_report(self.report.id, duplicate)
+        self.assertEqual(0, len(callbacks))
+        self.assertNotEqual(img1.id, img2.id)
+        self.assertEqual(img1.file.name, img2.file.name)
+        self.assertEqual(img1.content_hash, img2.content_hash)
+        self.assertTrue(img2.thumbnail_ready)
+        self.assertEqual(img1.thumbnails, img2.thumbnails)
@@ -0,0 +1,108 @@
+import csv
+import io
+import uuid
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils.timezone import now
+from graphql_jwt.shortcuts import get_token
+
+from reports.models import FollowUpReport, Image, IncidentReport
+from reports.tests.base_testcase import BaseTestCase
+
+small_gif = (
+    b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04"
+    b"\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02"
+    b"\x02\x4c\x01\x00\x3b"
+)
+
+
+class ReportImageExportTestCase(BaseTestCase):
+    def setUp(self):
+        super(ReportImageExportTestCase, self).setUp()
+        self.report = self.create_report(self.mers_report_type)
+        self.followup = FollowUpReport.objects.create(
+            incident=self.report,
+            data={},
+            reported_by=self.user,
+            report_type=self.mers_report_type,
+        )
+        self.other_report = self.create_report(self.dengue_report_type)
+        self.report_image = self.create_image(self.report)
+        self.followup_image = self.create_image(self.followup)
+        self.other_image = self.create_image(self.other_report)
+        self.auth = {"HTTP_AUTHORIZATION": f"JWT {get_token(self.user)}"}
+
+    def create_report(self, report_type):
+        report = IncidentReport.objects.create(
+            id=uuid.uuid4(),
+            data={},
+            reported_by=self.user,
+            incident_date=now(),
+            report_type=report_type,
+        )
+        report.relevant_authorities.add(self.thailand)
+        return report
+
+    def create_image(self, report):
+        return Image.objects.create(
+            report=report, file=SimpleUploadedFile("small.gif", small_gif)
+        )
+
+    def download(self, url):
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("application/zip", response["Content-Type"])
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_export_report_images(self):
+        archive = self.download(f"/api/report-images/export/?reportId={self.report.id}")
+
+        manifest = archive.read("manifest.csv").decode()
+        manifest = list(csv.DictReader(io.StringIO(manifest)))
+        self.assertEqual(2, len(manifest))
+        by_image = {row["image_id"]: row for row in manifest}
+        followup_row = by_image[str(self.followup_image.id)]
+        self.assertEqual(str(self.followup.id), followup_row["report_id"])
+        self.assertEqual(str(self.report.id), followup_row["incident_id"])
+        self.assertEqual("followup", followup_row["report_kind"])
+        self.assertEqual("incident", by_image[str(self.report_image.id)]["report_kind"])
+
+        for row in manifest:
+            self.assertEqual(small_gif, archive.read(row["file"]))
+        self.assertEqual(3, len(archive.namelist()))
+
+    def test_missing_file_is_left_out(self):
+        Image.objects.filter(pk=self.followup_image.pk).update(
+            file="reports/missing.gif"
+        )
+        archive = self.download(f"/api/report-images/export/?reportId={self.report.id}")
+
+        manifest = archive.read("manifest.csv").decode()
+        self.assertIn(str(self.report_image.id), manifest)
+        self.assertNotIn(str(self.followup_image.id), manifest)
+        self.assertEqual(2, len(archive.namelist()))
+
+    def test_export_filtered_reports(self):
+        archive = self.download(
+            "/api/report-images/export/"
+            f"?report_type__id__in={self.dengue_report_type.id}"
+        )
+        manifest = archive.read("manifest.csv").decode()
+        self.assertIn(str(self.other_image.id), manifest)
+        self.assertNotIn(str(self.report_image.id), manifest)
+
+    def test_reports_outside_authority_are_not_exported(self):
+        self.auth = {"HTTP_AUTHORIZATION": f"JWT {get_token(self.jatujak_reporter)}"}
+        archive = self.download(f"/api/report-images/export/?reportId={self.report.id}")
+        self.assertEqual(["manifest.csv"], archive.namelist())
+
+    def test_filter_is_required(self):
+        response = self.client.get("/api/report-images/export/", **self.auth)
+        self.assertEqual(400, response.status_code)
+
+    def test_authentication_is_required(self):
+        response = self.client.get(
+            f"/api/report-images/export/?reportId={self.report.id}"
+        )
+        self.assertEqual(401, response.status_code)
@@ -0,0 +1,48 @@
+import gzip
+import json
+
+from reports.models import ReportType
+from reports.tests.base_testcase import BaseTestCase
+
+
+class ReportTypeDefinitionTestCase(BaseTestCase):
+    def setUp(self):
+        super(ReportTypeDefinitionTestCase, self).setUp()
+        self.mers_report_type.definition = {"sections": [{"label": "ไข้"}]}
+        self.mers_report_type.save()
+        self.url = (
+            f"/api/report-type-definitions/{self.mers_report_type.definition_hash}/"
+        )
+
+    def test_definition_hash(self):
+        self.assertEqual(
+            ReportType.hash_definition({"sections": [{"label": "ไข้"}]}),
+            self.mers_report_type.definition_hash,
+        )
+        self.assertNotEqual(
+            self.mers_report_type.definition_hash,
+            self.dengue_report_type.definition_hash,
+        )
+
+    def test_get_definition(self):
+        response = self.client.get(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.mers_report_type.definition, json.loads(response.content))
+        self.assertEqual(f'"{self.mers_report_type.definition_hash}"', response["ETag"])
+
+    def test_get_gzipped_definition(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual("gzip", response["Content-Encoding"])
+        self.assertEqual(
+            self.mers_report_type.definition,
+            json.loads(gzip.decompress(response.content)),
+        )
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+
+    def test_not_found(self):
+        response = self.client.get("/api/report-type-definitions/unknown/")
+        self.assertEqual(404, response.status_code)
@@ -0,0 +1,42 @@
+import uuid
+
+from django.utils.timezone import now
+
+from accounts.models import User
+from reports.consumers import can_follow_authority_reports
+from reports.models import IncidentReport
+from reports.tests.base_testcase import BaseTestCase
+from threads.consumers import can_follow_thread
+from threads.models import Thread
+
+
+class SubscriptionPermissionTestCase(BaseTestCase):
+    def setUp(self):
+        super(SubscriptionPermissionTestCase, self).setUp()
+        self.reporter = User.objects.get(pk=self.jatujak_reporter.pk)
+        self.thread = Thread.objects.create()
+        self.report = IncidentReport.objects.create(
+            id=uuid.uuid4(),
+            data={"symptom": "cough"},
+            reported_by=self.user,
+            incident_date=now(),
+            report_type=self.mers_report_type,
+            thread=self.thread,
+        )
+
+    def test_follow_authority_reports(self):
+        self.assertTrue(
+            can_follow_authority_reports(self.reporter, str(self.jatujak.id))
+        )
+        self.assertFalse(can_follow_authority_reports(self.reporter, str(self.bkk.id)))
+        self.assertFalse(can_follow_authority_reports(self.reporter, str(self.cm.id)))
+
+    def test_follow_thread_of_relevant_report(self):
+        self.assertFalse(can_follow_thread(self.reporter, str(self.thread.id)))
+        self.report.relevant_authorities.add(self.jatujak)
+        self.assertTrue(can_follow_thread(self.reporter, str(self.thread.id)))
+
+    def test_follow_thread_of_own_report(self):
+        self.report.reported_by = self.jatujak_reporter
+        self.report.save()
+        self.assertTrue(can_follow_thread(self.reporter, str(self.thread.id)))
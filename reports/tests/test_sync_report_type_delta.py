@@ -0,0 +1,153 @@
+from graphql_jwt.testcases import JSONWebTokenClient
+
+from reports.models import ReportType, ReportTypeSyncState
+from reports.tests.base_testcase import BaseTestCase
+
+query = """
+        query syncDelta($syncToken: String) {
+          syncReportTypesDelta(syncToken: $syncToken) {
+            syncToken
+            unchanged
+            updatedList {
+              id
+            }
+            removedIds
+            categoryList {
+              id
+            }
+          }
+        }
+        """
+
+
+class SyncReportTypeDeltaTestCase(BaseTestCase):
+    client_class = JSONWebTokenClient
+
+    def setUp(self):
+        super(SyncReportTypeDeltaTestCase, self).setUp()
+        self.sync_token = ReportType.sync_delta_by_authority(
+            self.thailand, None
+        ).sync_token
+
+    def test_first_sync(self):
+        result = ReportType.sync_delta_by_authority(self.thailand, None)
+        self.assertFalse(result.unchanged)
+        self.assertEqual(3, len(result.updated_list))
+        self.assertEqual(0, len(result.removed_ids))
+        self.assertEqual(3, len(result.category_list))
+
+    def test_first_sync_of_rows_older_than_versioning(self):
+        ReportType.objects_original.update(sync_version=0)
+        ReportTypeSyncState.objects.all().delete()
+
+        result = ReportType.sync_delta_by_authority(self.thailand, None)
+        self.assertEqual(3, len(result.updated_list))
+        self.assertEqual(3, len(result.category_list))
+        result = ReportType.sync_delta_by_authority(self.thailand, result.sync_token)
+        self.assertTrue(result.unchanged)
+
+    def test_no_change_found(self):
+        result = ReportType.sync_delta_by_authority(self.thailand, self.sync_token)
+        self.assertTrue(result.unchanged)
+        self.assertEqual(self.sync_token, result.sync_token)
+
+    def test_something_changed(self):
+        self.mers_report_type.definition = {"changeme": True}
+        self.mers_report_type.save()
+
+        result = ReportType.sync_delta_by_authority(self.thailand, self.sync_token)
+        self.assertFalse(result.unchanged)
+        self.assertEqual([self.mers_report_type], result.updated_list)
+        self.assertEqual(0, len(result.removed_ids))
+        self.assertGreater(result.sync_token, self.sync_token)
+
+    def test_change_in_other_authority_is_not_visible(self):
+        self.wildfire_report_type.definition = {"changeme": True}
+        self.wildfire_report_type.save()
+
+        result = ReportType.sync_delta_by_authority(self.bkk, self.sync_token)
+        self.assertTrue(result.unchanged)
+
+    def test_change_is_visible_to_child_authority(self):
+        token = ReportType.sync_delta_by_authority(self.jatujak, None).sync_token
+        self.dengue_report_type.definition = {"changeme": True}
+        self.dengue_report_type.save()
+
+        result = ReportType.sync_delta_by_authority(self.jatujak, token)
+        self.assertEqual([self.dengue_report_type], result.updated_list)
+
+    def test_something_has_removed(self):
+        self.mers_report_type.delete()
+        result = ReportType.sync_delta_by_authority(self.thailand, self.sync_token)
+        self.assertEqual(0, len(result.updated_list))
+        self.assertEqual([self.mers_report_type.id], result.removed_ids)
+
+    def test_authority_has_been_unassigned(self):
+        token = ReportType.sync_delta_by_authority(self.cm, None).sync_token
+        self.wildfire_report_type.authorities.remove(self.cm)
+        self.wildfire_report_type.authorities.add(self.bkk)
+
+        result = ReportType.sync_delta_by_authority(self.cm, token)
+        self.assertEqual([self.wildfire_report_type.id], result.removed_ids)
+
+    def test_removal_in_other_authority_is_not_listed(self):
+        self.wildfire_report_type.authorities.add(self.jatujak)
+        token = ReportType.sync_delta_by_authority(self.bkk, None).sync_token
+        self.wildfire_report_type.authorities.remove(self.cm)
+        self.mers_report_type.save()
+
+        result = ReportType.sync_delta_by_authority(self.bkk, token)
+        self.assertEqual([self.mers_report_type], result.updated_list)
+        self.assertEqual([], result.removed_ids)
+
+    def test_authority_has_left_its_parent(self):
+        token = ReportType.sync_delta_by_authority(self.cm, None).sync_token
+        self.cm.inherits.remove(self.thailand)
+
+        result = ReportType.sync_delta_by_authority(self.cm, token)
+        self.assertFalse(result.unchanged)
+        self.assertEqual([], result.updated_list)
+        self.assertCountEqual(
+            [
+                self.dengue_report_type.id,
+                self.mers_report_type.id,
+                self.animal_sick_death_report_type.id,
+            ],
+            result.removed_ids,
+        )
+
+    def test_query(self):
+        self.client.authenticate(self.user)
+        result = self.client.execute(query, {"syncToken": None})
+        self.assertIsNone(result.errors)
+        data = result.data["syncReportTypesDelta"]
+        self.assertEqual(3, len(data["updatedList"]))
+
+        result = self.client.execute(query, {"syncToken": data["syncToken"]})
+        self.assertIsNone(result.errors)
+        self.assertTrue(result.data["syncReportTypesDelta"]["unchanged"])
+
+    def test_authority_report_types_cleared(self):
+        self.wildfire_report_type.authorities.add(self.bkk)
+        token = ReportType.sync_delta_by_authority(self.cm, None).sync_token
+        self.cm.reportTypes.clear()
+
+        result = ReportType.sync_delta_by_authority(self.cm, token)
+        self.assertEqual([self.wildfire_report_type.id], result.removed_ids)
+
+    def test_hierarchy_change_concerns_the_subtree_only(self):
+        thailand_token = ReportType.sync_delta_by_authority(
+            self.thailand, None
+        ).sync_token
+        bkk_token = ReportType.sync_delta_by_authority(self.bkk, None).sync_token
+        token = ReportType.sync_delta_by_authority(self.jatujak, None).sync_token
+        self.jatujak.inherits.add(self.cm)
+
+        result = ReportType.sync_delta_by_authority(self.jatujak, token)
+        self.assertIn(self.wildfire_report_type, result.updated_list)
+        for authority, authority_token in (
+            (self.thailand, thailand_token),
+            (self.bkk, bkk_token),
+        ):
+            result = ReportType.sync_delta_by_authority(authority, authority_token)
+            self.assertTrue(result.unchanged)
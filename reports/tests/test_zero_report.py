@@ -1,6 +1,8 @@
+from django.test import override_settings
+from django.utils.timezone import localdate
 from graphql_jwt.testcases import JSONWebTokenClient
 
-from reports.models import ZeroReport
+from reports.models import ZeroReport, ZeroReportDailyCount
 from reports.tests.base_testcase import BaseTestCase
 
 query = """
@@ -27,3 +29,30 @@ class ZeroReportTestCase(BaseTestCase):
         self.assertIsNotNone(instance)
         self.assertIsNotNone(instance.created_at)
         self.assertEqual(instance.reported_by.id, self.user.id)
+
+    @override_settings(ZERO_REPORT_INGESTION_MODE="counter")
+    def test_create_zero_report_in_counter_mode(self):
+        self.client.execute(query)
+        result = self.client.execute(query)
+        self.assertIsNone(result.errors)
+        self.assertFalse(ZeroReport.objects.filter(reported_by=self.user).exists())
+        counter = ZeroReportDailyCount.objects.get(reporter=self.user)
+        self.assertEqual(2, counter.count)
+        self.assertEqual(self.thailand.id, counter.authority_id)
+        self.assertEqual(localdate(), counter.day)
+
+    def test_flush_zero_reports(self):
+        ZeroReport.objects.create(reported_by=self.user)
+        ZeroReport.objects.create(reported_by=self.user)
+        ZeroReport.objects.create(reported_by=self.jatujak_reporter)
+        ZeroReportDailyCount.increment(self.user.id, self.thailand.id)
+
+        ZeroReportDailyCount.flush_zero_reports()
+
+        self.assertFalse(ZeroReport.objects.exists())
+        self.assertEqual(
+            3, ZeroReportDailyCount.objects.get(reporter=self.user).count
+        )
+        self.assertEqual(
+            1, ZeroReportDailyCount.objects.get(reporter=self.jatujak_reporter).count
+        )
@@ -1,3 +1,306 @@
-from django.shortcuts import render
+import csv
+import gzip
+import io
+import json
+import os
+import uuid
 
-# Create your views here.
+import django_filters
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import (
+    require_GET,
+    require_http_methods,
+    require_POST,
+)
+
+from common.thumbnails import thumbnail_url
+from common.utils import jwt_login_required
+from common.zipstream import CHUNK_SIZE, read_chunks, stream_zip
+from reports.models import (
+    FollowUpReport,
+    Image,
+    ImageUpload,
+    IncidentReport,
+    ReportType,
+)
+from reports.schema.types import INCIDENT_REPORT_FILTER_FIELDS
+
+DEFINITION_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _load_definition(definition_hash):
+    """
+    returns (raw, gzipped) bytes of a definition. The content never changes for a
+    given hash, so it is cached without any invalidation.
+    """
+    key = f"report_type_definition_{connection.schema_name}_{definition_hash}"
+    content = cache.get(key)
+    if content is None:
+        report_type = (
+            ReportType.objects_original.filter(definition_hash=definition_hash)
+            .only("definition")
+            .first()
+        )
+        if report_type is None:
+            return None
+        raw = ReportType.serialize_definition(report_type.definition)
+        content = (raw, gzip.compress(raw))
+        cache.set(key, content, DEFINITION_CACHE_TIMEOUT)
+    return content
+
+
+@require_GET
+def report_type_definition(request, definition_hash):
+    """
+    serve a report type definition by its content hash (ReportType.definition_hash).
+    responses are immutable, so clients and proxies can keep them forever.
+    """
+    content = _load_definition(definition_hash)
+    if content is None:
+        raise Http404("definition not found")
+
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = f'"{definition_hash}-gz"' if use_gzip else f'"{definition_hash}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        raw, gzipped = content
+        response = HttpResponse(
+            gzipped if use_gzip else raw, content_type="application/json"
+        )
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+def _upload_status(upload: ImageUpload):
+    return {
+        "uploadId": str(upload.id),
+        "offset": upload.offset,
+        "size": upload.size,
+    }
+
+
+@csrf_exempt
+@require_POST
+@jwt_login_required
+def image_upload_start(request):
+    """
+    start a resumable image upload.
+    body: {"reportId", "filename", "size"?, "imageId"?, "isCover"?}
+    """
+    try:
+        params = json.loads(request.body)
+        size = params.get("size")
+        if size is not None:
+            size = int(size)
+            if size < 0:
+                raise ValueError(size)
+            if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+                return JsonResponse({"error": "file too large"}, status=413)
+        upload = ImageUpload.objects.create(
+            report_id=uuid.UUID(params["reportId"]),
+            image_id=uuid.UUID(params["imageId"]) if params.get("imageId") else None,
+            is_cover=bool(params.get("isCover")),
+            filename=os.path.basename(params["filename"]),
+            size=size,
+            created_by=request.user,
+        )
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "invalid parameters"}, status=400)
+    return JsonResponse(_upload_status(upload), status=201)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "PUT"])
+@jwt_login_required
+def image_upload_chunk(request, upload_id):
+    """
+    GET returns the current offset to resume from.
+    PUT ?offset=<n> appends the request body as the next chunk of the upload.
+    Concurrent PUTs of an upload wait for each other, the later ones get a 409.
+    """
+    uploads = ImageUpload.objects.filter(created_by=request.user, created_image=None)
+    if request.method == "GET":
+        return JsonResponse(_upload_status(get_object_or_404(uploads, pk=upload_id)))
+
+    try:
+        offset = int(request.GET.get("offset", ""))
+    except ValueError:
+        return JsonResponse({"error": "offset is required"}, status=400)
+    with transaction.atomic():
+        upload = get_object_or_404(uploads.select_for_update(), pk=upload_id)
+        try:
+            upload.append_chunk(request, offset)
+        except ImageUpload.OffsetMismatch:
+            return JsonResponse(_upload_status(upload), status=409)
+        except ImageUpload.TooLarge:
+            return JsonResponse({"error": "file too large"}, status=413)
+    return JsonResponse(_upload_status(upload))
+
+
+@csrf_exempt
+@require_POST
+@jwt_login_required
+def image_upload_finalize(request, upload_id):
+    with transaction.atomic():
+        upload = get_object_or_404(
+            ImageUpload.objects.select_for_update(),
+            pk=upload_id,
+            created_by=request.user,
+        )
+        try:
+            image = upload.finalize()
+        except ImageUpload.OffsetMismatch:
+            return JsonResponse(_upload_status(upload), status=409)
+        except ObjectDoesNotExist:
+            return JsonResponse({"error": "report not found"}, status=404)
+    return JsonResponse(
+        {
+            "id": str(image.id),
+            "file": image.file.url,
+            "thumbnail": thumbnail_url(image),
+        }
+    )
+
+
+class IncidentReportExportFilter(django_filters.FilterSet):
+    class Meta:
+        model = IncidentReport
+        fields = INCIDENT_REPORT_FILTER_FIELDS
+
+
+MANIFEST_COLUMNS = [
+    "file",
+    "report_id",
+    "incident_id",
+    "report_kind",
+    "image_id",
+    "created_at",
+]
+
+
+def visible_incident_reports(user):
+    query = IncidentReport.objects.all()
+    if user.is_authority_user:
+        child_authorities = user.authorityuser.authority.all_inherits_down()
+        query = query.filter(relevant_authorities__in=child_authorities).distinct()
+    return query
+
+
+def _images_of(incidents):
+    """images of `incidents` and of their followups, annotated with incident_id"""
+    followups = FollowUpReport.objects.filter(incident__in=incidents.values("id"))
+    return (
+        Image.objects.filter(
+            Q(report_id__in=incidents.values("id"))
+            | Q(report_id__in=followups.values("id"))
+        )
+        .annotate(
+            incident_id=Coalesce(
+                Subquery(
+                    FollowUpReport.objects.filter(pk=OuterRef("report_id")).values(
+                        "incident_id"
+                    )
+                ),
+                F("report_id"),
+            )
+        )
+        .order_by("incident_id", "report_id", "created_at")
+    )
+
+
+def _archive_name(incident_id, image_id, file_name):
+    _, ext = os.path.splitext(file_name)
+    return f"{incident_id}/{image_id}{ext.lower()}"
+
+
+def _manifest(images, written):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(MANIFEST_COLUMNS)
+    rows = images.values_list("id", "file", "report_id", "incident_id", "created_at")
+    for image_id, file_name, report_id, incident_id, created_at in rows.iterator():
+        name = _archive_name(incident_id, image_id, file_name)
+        if name not in written:
+            continue
+        writer.writerow(
+            [
+                name,
+                report_id,
+                incident_id,
+                "incident" if report_id == incident_id else "followup",
+                image_id,
+                created_at.isoformat(),
+            ]
+        )
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _zip_entries(images, written):
+    for image in images.iterator():
+        name = _archive_name(image.incident_id, image.id, image.file.name)
+        yield name, read_chunks(image.file)
+    # last, so that the files skipped as missing are left out
+    yield "manifest.csv", _manifest(images, written)
+
+
+def images_zip_response(incidents, filename):
+    """
+    stream a ZIP of every image of `incidents` (and of their followups), with a
+    manifest.csv linking each file to its report.
+    """
+    written = set()
+    response = StreamingHttpResponse(
+        stream_zip(_zip_entries(_images_of(incidents), written), written),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@require_GET
+@jwt_login_required
+def report_images_export(request):
+    """
+    ?reportId=<id> for the images of one report, or the filters of the
+    incidentReports query (e.g. ?incident_date__gte=2022-01-01&report_type__id__in=..)
+    """
+    incidents = visible_incident_reports(request.user)
+    if report_id := request.GET.get("reportId"):
+        try:
+            incidents = incidents.filter(pk=uuid.UUID(report_id))
+        except ValueError:
+            return JsonResponse({"error": "invalid reportId"}, status=400)
+        filename = f"report-{report_id}-images.zip"
+    else:
+        report_filter = IncidentReportExportFilter(request.GET, queryset=incidents)
+        has_filter = set(request.GET) & set(report_filter.filters)
+        if not has_filter or not report_filter.is_valid():
+            return JsonResponse(
+                {"error": "a reportId or a filter is required"}, status=400
+            )
+        incidents = report_filter.qs
+        filename = "report-images.zip"
+    return images_zip_response(incidents, filename)
@@ -2,7 +2,7 @@ from datetime import timedelta
 
 import graphene
 from django.db.models.functions import TruncDay
-from django.db.models import Count
+from django.db.models import Count, Sum
 from django.utils.timezone import now
 from graphql import GraphQLError
 from graphql_jwt.decorators import login_required
@@ -10,7 +10,7 @@ from graphql_jwt.decorators import login_required
 from accounts.models import Authority, AuthorityUser
 from cases.models import Case
 from cases.schema import CaseType
-from reports.models import IncidentReport
+from reports.models import IncidentReport, ZeroReportDailyCount
 from reports.schema.types import IncidentReportType
 from django.db.models import F
 
@@ -33,6 +33,12 @@ class SummaryByCategoryType(graphene.ObjectType):
     total = graphene.Int(required=True)
 
 
+class SummaryZeroReportType(graphene.ObjectType):
+    day = graphene.Date(required=True)
+    reporter_count = graphene.Int(required=True)
+    total = graphene.Int(required=True)
+
+
 class Query(graphene.ObjectType):
     stat_query = graphene.Field(StatType, authority_id=graphene.Int(required=True))
     events_query = graphene.Field(EventType, authority_id=graphene.Int(required=True))
@@ -48,6 +54,12 @@ class Query(graphene.ObjectType):
         from_date=graphene.DateTime(required=False),
         to_date=graphene.DateTime(required=False),
     )
+    summary_zero_report_query = graphene.List(
+        graphene.NonNull(SummaryZeroReportType),
+        authority_id=graphene.Int(required=True),
+        from_date=graphene.Date(required=False),
+        to_date=graphene.Date(required=False),
+    )
 
     @staticmethod
     @login_required
@@ -184,3 +196,34 @@ class Query(graphene.ObjectType):
             return q
         else:
             raise GraphQLError("Permission denied.")
+
+    @staticmethod
+    @login_required
+    def resolve_summary_zero_report_query(
+        root, info, authority_id, from_date=None, to_date=None
+    ):
+        user = info.context.user
+        authority = Authority.objects.get(pk=authority_id)
+        if (
+            user.is_authority_user
+            and user.authorityuser.has_summary_view_permission_on(authority_id)
+        ):
+            sub_authorities = authority.all_inherits_down()
+            q = (
+                ZeroReportDailyCount.objects.filter(authority__in=sub_authorities)
+                .values("day")
+                .annotate(
+                    reporter_count=Count("reporter", distinct=True),
+                    total=Sum("count"),
+                )
+                .order_by("day")
+            )
+            if from_date:
+                q = q.filter(day__gte=from_date)
+
+            if to_date:
+                q = q.filter(day__lte=to_date)
+
+            return q
+        else:
+            raise GraphQLError("Permission denied.")
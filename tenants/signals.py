@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from common.consumers import invalidate_tenant_cache
+from tenants.models import Client, Domain
+
+
+@receiver(post_save, sender=Domain, dispatch_uid="tenant_cache_domain_saved")
+@receiver(post_delete, sender=Domain, dispatch_uid="tenant_cache_domain_deleted")
+@receiver(post_save, sender=Client, dispatch_uid="tenant_cache_client_saved")
+@receiver(post_delete, sender=Client, dispatch_uid="tenant_cache_client_deleted")
+def on_tenant_changed(sender, **kwargs):
+    invalidate_tenant_cache()
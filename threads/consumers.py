@@ -1,8 +1,10 @@
 import json
 
 from channels.exceptions import DenyConnection
+from django.db.models import Q
 
-from common.consumers import TenantConsumers
+from common.consumers import Stream, TenantConsumers, register_stream
+from common.subscriptions import SubscriptionField, register_subscription
 from common.utils import extract_jwt_payload_from_asgi_scope
 
 
@@ -10,6 +12,65 @@ def new_comment_group_name(schema_name, thread_id):
     return f"cm_{schema_name}_{thread_id}"
 
 
+def load_added_comment(message):
+    from threads.models import Comment
+
+    if not message["created_ids"]:
+        return []
+    return list(
+        Comment.objects.select_related("created_by")
+        .prefetch_related("attachments")
+        .filter(pk__in=message["created_ids"])
+        .order_by("created_at")
+    )
+
+
+def can_follow_thread(user, thread_id):
+    """
+    a thread is followed by the users who can read its report or case: the
+    reporter and the users of a relevant authority or one of its ancestors.
+    """
+    from cases.models import Case
+    from reports.models import IncidentReport
+
+    if not user.is_authority_user:
+        return True
+    authorities = list(user.authorityuser.authority.all_inherits_down())
+    reports = IncidentReport.objects.filter(thread_id=thread_id)
+    return (
+        reports.filter(
+            Q(reported_by=user) | Q(relevant_authorities__in=authorities)
+        ).exists()
+        or Case.objects.filter(
+            thread_id=thread_id, authorities__in=authorities
+        ).exists()
+    )
+
+
+register_stream(
+    Stream(
+        name="comments",
+        event_type="update.comment",
+        group_name=new_comment_group_name,
+        authorize=can_follow_thread,
+    )
+)
+
+
+register_subscription(
+    SubscriptionField(
+        field_name="commentAdded",
+        argument="thread_id",
+        event_type="update.comment",
+        group_name=new_comment_group_name,
+        targets=lambda message: [message["thread_id"]],
+        event_key=lambda message: message["event_id"],
+        load=load_added_comment,
+        authorize=can_follow_thread,
+    )
+)
+
+
 class NewCommentConsumers(TenantConsumers):
     def __init__(self, *args, **kwargs):
         self.username = None
@@ -29,19 +90,14 @@ class NewCommentConsumers(TenantConsumers):
         self.group_name = new_comment_group_name(self.tenant.schema_name, thread_id)
 
         if self.username:
-            await self.channel_layer.group_add(
-                self.group_name,
-                self.channel_name,
-            )
+            await self.group_add(self.group_name)
             await self.accept()
         else:
             raise DenyConnection("invalid token")
 
     async def disconnect(self, code):
-        await self.channel_layer.group_discard(
-            self.group_name,
-            self.channel_name,
-        )
+        if self.group_name:
+            await self.group_discard(self.group_name)
 
     async def update_comment(self, event):
-        await self.send(text_data=event["text"])
+        await self.send_event(event["text"])
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.12 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0003_commentattachment_thumbnail_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentattachment',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.12 on 2026-10-19 20:00
+
+from django.db import migrations
+
+
+def mark_pending(apps, schema_editor):
+    # rows stored before thumbnail names were kept, their thumbnails are queued
+    # by `manage.py generate_missing_thumbnails`
+    CommentAttachment = apps.get_model("threads", "CommentAttachment")
+    CommentAttachment.objects.filter(thumbnail_ready=True, thumbnails={}).exclude(
+        file=""
+    ).update(thumbnail_ready=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0004_commentattachment_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_pending, migrations.RunPython.noop),
+    ]
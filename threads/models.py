@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
 from django.db import models
 from easy_thumbnails.fields import ThumbnailerField
 
@@ -35,3 +38,46 @@ class CommentAttachment(BaseModel):
         Comment, on_delete=models.CASCADE, related_name="attachments"
     )
     file = ThumbnailerField(upload_to="attachments")
+    thumbnail_ready = models.BooleanField(default=False)
+    thumbnails = models.JSONField(default=dict, blank=True)
+
+    @staticmethod
+    def store_files(files):
+        """
+        write `files` to the storage in parallel, returns their storage names.
+        if one write fails, the files already written are removed.
+        """
+        field = CommentAttachment._meta.get_field("file")
+
+        def store(file):
+            name = field.generate_filename(None, file.name)
+            return field.storage.save(name, file, max_length=field.max_length)
+
+        workers = min(settings.COMMENT_ATTACHMENT_UPLOAD_WORKERS, len(files))
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            futures = [pool.submit(store, file) for file in files]
+        names = [f.result() for f in futures if f.exception() is None]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            CommentAttachment.delete_files(names)
+            raise errors[0]
+        return names
+
+    @staticmethod
+    def delete_files(names):
+        storage = CommentAttachment._meta.get_field("file").storage
+        for name in names:
+            storage.delete(name)
+
+    @staticmethod
+    def bulk_create_for_comment(comment, names):
+        """create the attachments of already stored files in one insert."""
+        from common.thumbnails import schedule_thumbnails
+
+        attachments = CommentAttachment.objects.bulk_create(
+            [CommentAttachment(comment=comment, file=name) for name in names]
+        )
+        # bulk_create does not send post_save
+        for attachment in attachments:
+            schedule_thumbnails(attachment)
+        return attachments
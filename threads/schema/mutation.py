@@ -1,5 +1,9 @@
 import graphene
 
+from threads.schema.mutations.comment_attachment_upload_mutation import (
+    CommentAttachmentUploadConfirmMutation,
+    CommentAttachmentUploadRequestMutation,
+)
 from threads.schema.mutations.comment_create_mutation import CommentCreateMutation
 from threads.schema.mutations.comment_delete_mutation import CommentDeleteMutation
 from threads.schema.mutations.comment_update_mutation import CommentUpdateMutation
@@ -9,3 +13,5 @@ class Mutation(graphene.ObjectType):
     comment_create = CommentCreateMutation.Field()
     comment_update = CommentUpdateMutation.Field()
     comment_delete = CommentDeleteMutation.Field()
+    comment_attachment_upload_request = CommentAttachmentUploadRequestMutation.Field()
+    comment_attachment_upload_confirm = CommentAttachmentUploadConfirmMutation.Field()
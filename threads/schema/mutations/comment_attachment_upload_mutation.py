@@ -0,0 +1,44 @@
+import graphene
+from graphql import GraphQLError
+from graphql_jwt.decorators import login_required
+
+from common.direct_upload import InvalidUpload, confirm_upload, issue_upload
+from common.types import DirectUploadType
+from threads.models import Comment, CommentAttachment
+from threads.schema.types import CommentAttachmentType
+
+
+class CommentAttachmentUploadRequestMutation(graphene.Mutation):
+    class Arguments:
+        filename = graphene.String(required=True)
+
+    upload = graphene.Field(DirectUploadType)
+
+    @staticmethod
+    @login_required
+    def mutate(root, info, filename):
+        upload = issue_upload("attachments", filename, user_id=info.context.user.id)
+        return CommentAttachmentUploadRequestMutation(upload=upload)
+
+
+class CommentAttachmentUploadConfirmMutation(graphene.Mutation):
+    class Arguments:
+        comment_id = graphene.Int(required=True)
+        token = graphene.String(required=True)
+
+    attachment = graphene.Field(CommentAttachmentType)
+
+    @staticmethod
+    @login_required
+    def mutate(root, info, comment_id, token):
+        user = info.context.user
+        try:
+            comment = Comment.objects.get(pk=comment_id, created_by=user)
+        except Comment.DoesNotExist:
+            raise GraphQLError("comment not found")
+        try:
+            name = confirm_upload(token, user_id=user.id)
+        except InvalidUpload as e:
+            raise GraphQLError(str(e))
+        attachment = CommentAttachment.objects.create(comment=comment, file=name)
+        return CommentAttachmentUploadConfirmMutation(attachment=attachment)
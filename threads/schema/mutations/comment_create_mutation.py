@@ -1,4 +1,5 @@
 import graphene
+from django.db import transaction
 from graphene_file_upload.scalars import Upload
 from graphql_jwt.decorators import login_required
 
@@ -28,16 +29,17 @@ class CommentCreateMutation(graphene.Mutation):
         if len(problems) > 0:
             return CommentCreateMutation(result=CommentCreateProblem(fields=problems))
 
-        comment = Comment.objects.create(
-            body=body,
-            thread=thread,
-            created_by=user,
-        )
-        if files:
-            for file in files:
-                attachment = CommentAttachment.objects.create(
-                    comment=comment,
-                    file=file,
+        names = CommentAttachment.store_files(files) if files else []
+        try:
+            with transaction.atomic():
+                comment = Comment.objects.create(
+                    body=body,
+                    thread=thread,
+                    created_by=user,
                 )
+                CommentAttachment.bulk_create_for_comment(comment, names)
+        except Exception:
+            CommentAttachment.delete_files(names)
+            raise
 
         return {"result": comment}
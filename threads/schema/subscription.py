@@ -0,0 +1,14 @@
+import graphene
+from graphql_jwt.decorators import login_required
+
+from threads.schema.types import CommentType
+
+
+class Subscription(graphene.ObjectType):
+    comment_added = graphene.Field(CommentType, thread_id=graphene.ID(required=True))
+
+    @staticmethod
+    @login_required
+    def resolve_comment_added(root, info, thread_id):
+        # root is the comment of the event, see common.subscriptions
+        return root
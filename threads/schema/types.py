@@ -1,19 +1,25 @@
 import graphene
-from easy_thumbnails.files import get_thumbnailer
 from graphene_django import DjangoObjectType
 
+from common.thumbnails import thumbnail_url
 from common.types import AdminValidationProblem
+from common.variants import variant_url
 from threads.models import Comment, CommentAttachment
 
 
 class CommentAttachmentType(DjangoObjectType):
     thumbnail = graphene.String()
+    variant = graphene.String(size=graphene.Int(required=True))
 
     class Meta:
         model = CommentAttachment
 
     def resolve_thumbnail(self, info):
-        return get_thumbnailer(self.file)["thumbnail"].url
+        return thumbnail_url(self)
+
+    def resolve_variant(self, info, size):
+        url = variant_url(self, size)
+        return info.context.build_absolute_uri(url) if url else None
 
 
 class CommentType(DjangoObjectType):
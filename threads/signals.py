@@ -1,29 +1,64 @@
 import json
+import uuid
 
 import channels.layers
 from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from common.broadcast import BroadcastCoalescer
+from common.media_gc import register_media_owner
+from common.thumbnails import register_thumbnail_field
+from common.utils import group_send_many
+from common.variants import register_variant_model
 from threads.consumers import new_comment_group_name
-from threads.models import Comment
-from django.db import connection
+from threads.models import Comment, CommentAttachment
+from django.db import connection, transaction
 
+register_thumbnail_field(CommentAttachment)
+register_variant_model(CommentAttachment, "comment-attachment")
+register_media_owner(CommentAttachment)
 
-@receiver(post_save, sender=Comment, dispatch_uid="comment_signal_to_ws")
-def on_comment_update(sender, instance, **kwargs):
-    schema_name = connection.schema_name
-    thread_id = instance.thread_id
+
+def send_comment_update(key, comment_ids, created_ids):
+    schema_name, thread_id = key
+    comment_ids = sorted(comment_ids)
     group_name = new_comment_group_name(schema_name, thread_id)
     channel_layer = channels.layers.get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        group_name,
+    async_to_sync(group_send_many)(
+        channel_layer,
+        [group_name],
         {
             "type": "update.comment",
+            "event_id": uuid.uuid4().hex,
+            "thread_id": thread_id,
+            "comment_ids": comment_ids,
+            "created_ids": sorted(created_ids),
             "text": json.dumps(
                 {
                     "thread_id": thread_id,
+                    "comment_ids": comment_ids,
                 }
             ),
         },
     )
+
+
+comment_broadcasts = BroadcastCoalescer(
+    send_comment_update, lambda: settings.COMMENT_BROADCAST_DELAY
+)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid="comment_signal_to_ws")
+def on_comment_update(sender, instance, created, **kwargs):
+    key = (connection.schema_name, instance.thread_id)
+    comment_id = instance.id
+
+    # after commit, so that the attachments created with the comment are stored
+    # and rolled back changes are not sent
+    transaction.on_commit(
+        lambda: comment_broadcasts.add(
+            key, [comment_id], [comment_id] if created else []
+        )
+    )
@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock, patch
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from accounts.models import User
+from threads.models import Comment, Thread
+from threads.signals import comment_broadcasts
+
+
+@override_settings(COMMENT_BROADCAST_DELAY=60)
+class CommentBroadcastTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="test")
+        self.thread = Thread.objects.create()
+        self.comment = Comment.objects.create(
+            thread=self.thread, body="line1", created_by=self.user
+        )
+        patcher = patch("threads.signals.channels.layers.get_channel_layer")
+        self.group_send = patcher.start().return_value.group_send = AsyncMock()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(comment_broadcasts.flush)
+
+    def test_changes_of_a_thread_are_sent_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            created = Comment.objects.create(
+                thread=self.thread, body="line2", created_by=self.user
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment.body = "edited"
+            self.comment.save()
+        self.group_send.assert_not_called()
+
+        comment_broadcasts.flush()
+        self.group_send.assert_called_once()
+        group_name, message = self.group_send.call_args.args
+        self.assertTrue(group_name.endswith(f"_{self.thread.id}"))
+        self.assertEqual(sorted([self.comment.id, created.id]), message["comment_ids"])
+        self.assertEqual([created.id], message["created_ids"])
+
+    def test_rolled_back_changes_are_not_sent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.comment.body = "edited"
+                    self.comment.save()
+                    raise ValueError()
+            except ValueError:
+                pass
+        comment_broadcasts.flush()
+        self.group_send.assert_not_called()
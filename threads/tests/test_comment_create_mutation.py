@@ -1,5 +1,9 @@
+from unittest.mock import AsyncMock, patch
+
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
 
+from threads.models import CommentAttachment
 from threads.tests.test_base import BaseTestCase
 
 
@@ -91,3 +95,52 @@ class CommentCreateMutationTests(BaseTestCase):
         self.assertIsNotNone(result.data["commentCreate"]["result"]["id"])
         self.assertEqual(result.data["commentCreate"]["result"]["body"], "test comment")
         self.assertEqual(len(result.data["commentCreate"]["result"]["attachments"]), 2)
+
+    @override_settings(COMMENT_BROADCAST_DELAY=0)
+    def test_comment_event_is_sent_once_after_attachments(self):
+        mutation = """
+        mutation commentCreate($body: String!, $threadId: Int!, $files: [Upload]) {
+            commentCreate(body: $body, threadId: $threadId, files: $files) {
+                result {
+                    __typename
+                }
+            }
+        }
+        """
+        with patch("threads.signals.channels.layers.get_channel_layer") as get_layer:
+            get_layer.return_value.group_send = AsyncMock(
+                side_effect=lambda *args: self.assertEqual(
+                    2, CommentAttachment.objects.count()
+                )
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                result = self.client.execute(
+                    mutation,
+                    {
+                        "body": "test comment",
+                        "threadId": self.thread.id,
+                        "files": [self.file1, self.file2],
+                    },
+                )
+                self.assertIsNone(result.errors, msg=result.errors)
+                get_layer.return_value.group_send.assert_not_called()
+
+        get_layer.return_value.group_send.assert_called_once()
+        for attachment in CommentAttachment.objects.all():
+            self.assertTrue(attachment.thumbnail_ready)
+
+    def test_store_files_failure_removes_written_files(self):
+        storage = CommentAttachment._meta.get_field("file").storage
+        save = storage.save
+
+        def failing_save(name, content, max_length=None):
+            if content.name == "small2.gif":
+                raise OSError("storage is down")
+            return save(name, content, max_length=max_length)
+
+        with patch.object(storage, "save", side_effect=failing_save), patch.object(
+            storage, "delete"
+        ) as delete:
+            with self.assertRaises(OSError):
+                CommentAttachment.store_files([self.file1, self.file2])
+        delete.assert_called_once()